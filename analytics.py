@@ -0,0 +1,251 @@
+"""  python 模組文件名 : analytics.py
+
+analytics.py 在结果行写出的同时增量统计瑕疵分析指标，处理结束后输出汇总报告，不需要重新读取 CSV：
+    - 按 area_name、model_key/version、日期（timestamp 的前 10 个字符）分组
+    - 每组统计推理记录数、瑕疵数与瑕疵率、分数分布（固定区间直方图、最小/最大/平均值）
+    - 每组按笔记本（文件夹）统计 mask_miss 取值出现次数，以及 db_pred 与 db_gt 的混淆矩阵
+
+内存占用只与分组数量（区域、模型、日期的种类）有关，与记录数无关
+
+"""
+
+import json
+import math
+from bisect import bisect_right
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from result_row import ResultRow
+
+# 分数直方图的区间边界，区间为 [edges[i], edges[i+1])，另有低于下限与不低于上限的两个区间
+DEFAULT_SCORE_EDGES: Tuple[float, ...] = tuple(i / 10 for i in range(11))
+
+# 数据库中表示“是/否”的取值（pred / gt 为布尔列，查询结果转换为字符串）
+_POSITIVE = frozenset(("1", "True", "true"))
+_NEGATIVE = frozenset(("0", "False", "false"))
+
+# 没有匹配瑕疵框的记录、无法解析日期的记录所在的分组
+NO_AREA = "(none)"
+UNKNOWN_DAY = "unknown"
+
+DIMENSIONS = ("area", "model", "day")
+
+
+def _binary(value: Optional[str]) -> Optional[int]:
+    if value in _POSITIVE:
+        return 1
+    if value in _NEGATIVE:
+        return 0
+    return None
+
+
+def _day(timestamp: Optional[str]) -> str:
+    """
+    timestamp（如 2021-01-01_00-00-00）对应的日期
+    """
+    if timestamp and len(timestamp) >= 10 and timestamp[4] == '-' and timestamp[7] == '-':
+        return timestamp[:10]
+    return UNKNOWN_DAY
+
+
+class GroupStats:
+    """一个分组的累计统计"""
+
+    __slots__ = ("rows", "defects", "scored", "score_sum", "score_min", "score_max", "histogram",
+                 "laptops", "mask_miss", "confusion")
+
+    def __init__(self, bins: int):
+        self.rows = 0
+        self.defects = 0
+        self.scored = 0
+        self.score_sum = 0.0
+        self.score_min = math.inf
+        self.score_max = -math.inf
+        self.histogram = [0] * bins
+        self.laptops = 0
+        self.mask_miss: Counter = Counter()
+        # (db_pred, db_gt) -> 笔记本数量
+        self.confusion: Counter = Counter()
+
+    def add_row(self, row: ResultRow, bin_index: Optional[int]):
+        self.rows += 1
+        if row.defect:
+            self.defects += 1
+        if bin_index is not None:
+            score = row.score
+            self.scored += 1
+            self.score_sum += score
+            self.score_min = min(self.score_min, score)
+            self.score_max = max(self.score_max, score)
+            self.histogram[bin_index] += 1
+
+    def add_laptop(self, row: ResultRow):
+        self.laptops += 1
+        self.mask_miss.update(row.mask_miss or ())
+        self.confusion[(row.db_pred, row.db_gt)] += 1
+
+    def to_dict(self, edges: Sequence[float]) -> Dict[str, Any]:
+        """
+        分组统计的报告形式
+        """
+        labels = [f"<{edges[0]:g}"] + [f"[{low:g}, {high:g})" for low, high in zip(edges, edges[1:])] + \
+                 [f">={edges[-1]:g}"]
+        tp = fp = fn = tn = 0
+        for (pred, gt), count in self.confusion.items():
+            pred, gt = _binary(pred), _binary(gt)
+            if pred is None or gt is None:
+                continue
+            if pred and gt:
+                tp += count
+            elif pred:
+                fp += count
+            elif gt:
+                fn += count
+            else:
+                tn += count
+        return {
+            "rows": self.rows,
+            "defects": self.defects,
+            "defect_rate": self.defects / self.rows if self.rows else None,
+            "score": {
+                "count": self.scored,
+                "mean": self.score_sum / self.scored if self.scored else None,
+                "min": self.score_min if self.scored else None,
+                "max": self.score_max if self.scored else None,
+                "histogram": dict(zip(labels, self.histogram)),
+            },
+            "laptops": self.laptops,
+            "mask_miss": dict(self.mask_miss.most_common()),
+            "confusion": {
+                "pairs": [{"db_pred": pred, "db_gt": gt, "laptops": count}
+                          for (pred, gt), count in self.confusion.most_common()],
+                "tp": tp, "fp": fp, "fn": fn, "tn": tn,
+                "precision": tp / (tp + fp) if tp + fp else None,
+                "recall": tp / (tp + fn) if tp + fn else None,
+                "accuracy": (tp + tn) / (tp + fp + fn + tn) if tp + fp + fn + tn else None,
+            },
+        }
+
+
+class DefectAnalytics:
+    """
+    结果行的流式统计
+
+    observe_folder 每次接收一个文件夹（一台笔记本）的全部结果行：
+    记录数、瑕疵数与分数按行统计；mask_miss 与 db_pred/db_gt 每个分组每台笔记本只统计一次，
+    避免多次推理的笔记本被重复计数。
+    """
+
+    def __init__(self, score_edges: Sequence[float] = DEFAULT_SCORE_EDGES):
+        """
+        初始化统计
+
+        Args:
+            score_edges (Sequence[float]): 分数直方图的区间边界（升序）
+        """
+        if len(score_edges) < 2 or list(score_edges) != sorted(score_edges):
+            raise ValueError("score_edges 至少需要两个升序排列的边界")
+        self.score_edges = tuple(score_edges)
+        self.overall = GroupStats(self._bins)
+        self.groups: Dict[str, Dict[Any, GroupStats]] = {dimension: {} for dimension in DIMENSIONS}
+
+    @property
+    def _bins(self) -> int:
+        return len(self.score_edges) + 1
+
+    def _group(self, dimension: str, key: Any) -> GroupStats:
+        groups = self.groups[dimension]
+        stats = groups.get(key)
+        if stats is None:
+            stats = groups[key] = GroupStats(self._bins)
+        return stats
+
+    def _bin(self, score: Any) -> Optional[int]:
+        if not isinstance(score, (int, float)) or isinstance(score, bool) or math.isnan(score):
+            return None
+        return bisect_right(self.score_edges, score)
+
+    def observe_folder(self, rows: Sequence[ResultRow]):
+        """
+        统计一个文件夹的结果行
+
+        Args:
+            rows (Sequence[ResultRow]): 同一文件夹的结果行
+        """
+        if not rows:
+            return
+        seen = set()
+        for row in rows:
+            bin_index = self._bin(row.score)
+            keys = (("area", row.area_name or NO_AREA), ("model", (row.model_key, row.version)),
+                    ("day", _day(row.timestamp)))
+            self.overall.add_row(row, bin_index)
+            for dimension, key in keys:
+                stats = self._group(dimension, key)
+                stats.add_row(row, bin_index)
+                if (dimension, key) not in seen:
+                    seen.add((dimension, key))
+                    stats.add_laptop(row)
+        self.overall.add_laptop(rows[0])
+
+    def observe(self, folders: Iterable[Sequence[ResultRow]]):
+        """
+        依次统计多个文件夹的结果行
+        """
+        for rows in folders:
+            self.observe_folder(rows)
+
+    @staticmethod
+    def _group_name(dimension: str, key: Any) -> str:
+        if dimension == "model":
+            model_key, version = key
+            return f"{model_key}/{version}"
+        return str(key)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        汇总报告
+
+        Returns:
+            Dict[str, Any]: overall 与 by_area / by_model / by_day 的统计
+        """
+        report: Dict[str, Any] = {"overall": self.overall.to_dict(self.score_edges)}
+        for dimension in DIMENSIONS:
+            groups = sorted(self.groups[dimension].items(), key=lambda item: self._group_name(dimension, item[0]))
+            report[f"by_{dimension}"] = {self._group_name(dimension, key): stats.to_dict(self.score_edges)
+                                         for key, stats in groups}
+        return report
+
+    def summary_lines(self, top: int = 10) -> List[str]:
+        """
+        日志中输出的汇总表格：整体指标与瑕疵率最高的区域
+
+        Args:
+            top (int): 输出的区域数量
+
+        Returns:
+            List[str]: 文本行
+        """
+        overall = self.overall.to_dict(self.score_edges)
+        confusion = overall["confusion"]
+        lines = [f"瑕疵统计: {overall['rows']} 条推理记录，{overall['laptops']} 台笔记本，"
+                 f"瑕疵率 {overall['defect_rate'] or 0:.2%}",
+                 f"db_pred/db_gt: TP {confusion['tp']} FP {confusion['fp']} FN {confusion['fn']} TN {confusion['tn']}"]
+        areas = [(name, stats) for name, stats in self.groups["area"].items() if name != NO_AREA]
+        areas.sort(key=lambda item: (-item[1].defects / item[1].rows, item[0]))
+        if areas:
+            lines.append(f"{'area_name':<20} {'rows':>8} {'defects':>8} {'rate':>8}")
+            for name, stats in areas[:top]:
+                lines.append(f"{name:<20} {stats.rows:>8} {stats.defects:>8} {stats.defects / stats.rows:>8.2%}")
+        return lines
+
+    def write_report(self, path: Path):
+        """
+        将报告写入 JSON 文件
+
+        Args:
+            path (Path): 报告文件路径
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
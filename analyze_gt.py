@@ -1,10 +1,15 @@
+import argparse
 import sqlite3
 import csv
 import os
 import logging
 import sys
-from datetime import datetime
-from database import DB_ROOT
+from gt_index import iter_gt_rows
+
+# 默认参数，可通过命令行参数覆盖
+DEFAULT_DB_PATH = "test_02.db"
+DEFAULT_CSV_PATH = "analyze_gt.csv"
+DEFAULT_FILTER_DATE = "2025-03-20 00:00:00"
 
 # 设置控制台编码为UTF-8
 if sys.stdout.encoding != 'utf-8':
@@ -21,27 +26,39 @@ class Utf8StreamHandler(logging.StreamHandler):
         super().__init__(sys.stdout)
         self.encoding = 'utf-8'
 
-# 配置日志
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("analyze_gt.log", encoding='utf-8'),
-        Utf8StreamHandler()
-    ]
-)
+def setup_logging():
+    """
+    配置日志（只在作为脚本运行时调用，导入本模块不会修改日志配置）
+    """
+    logging.basicConfig(
+        level=logging.DEBUG,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler("analyze_gt.log", encoding='utf-8'),
+            Utf8StreamHandler()
+        ]
+    )
+
 logger = logging.getLogger("analyze_gt")
 
-def analyze_gt():
+def analyze_gt(db_path: str = DEFAULT_DB_PATH, csv_path: str = DEFAULT_CSV_PATH,
+               filter_date: str = DEFAULT_FILTER_DATE) -> int:
     """
-    从test.db提取数据，筛选2025/3/20及之后创建的笔记本电脑记录，
-    并获取相应的预测结果，保存到analyze_gt.csv
+    从数据库提取数据，筛选 filter_date 及之后创建的笔记本电脑记录，
+    并获取相应的预测结果，保存到 csv_path
+
+    Args:
+        db_path (str): 数据库路径
+        csv_path (str): 输出CSV路径
+        filter_date (str): created_at 下限
+
+    Returns:
+        int: 写入的记录数，出错时返回 0
     """
     logger.info("Start analyzing GT data")
 
     try:
         # 连接到数据库
-        db_path = os.path.join(DB_ROOT, "test_02.db")
         logger.debug(f"Connecting to database: {db_path}")
 
         if not os.path.exists(db_path):
@@ -49,40 +66,16 @@ def analyze_gt():
             return 0
 
         conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row  # 使用字典形式返回结果
-        cursor = conn.cursor()
         logger.debug("Database connection successful")
 
-        # 确定日期过滤条件（2025年3月20日）
-        filter_date = "2025-03-20 00:00:00"
         logger.info(f"Using date filter: {filter_date}")
 
-        # 查询符合条件的笔记本电脑及其预测数据
-        query = """
-        SELECT
-            l.id AS laptop_id,
-            l.laptop_name,
-            p.pred,
-            p.pred_score,
-            p.gt,
-            l.created_at
-        FROM
-            laptops l
-        LEFT JOIN
-            laptop_defect_predictions p ON l.id = p.laptop_id
-        WHERE
-            l.created_at >= ?
-        ORDER BY
-            l.created_at
-        """
-
+        # 查询符合条件的笔记本电脑及其预测数据（与 gt_index 共用同一查询）
         logger.debug(f"Executing SQL query")
-        cursor.execute(query, (filter_date,))
-        results = cursor.fetchall()
+        results = list(iter_gt_rows(conn, filter_date))
         logger.info(f"Found {len(results)} matching records")
 
         # 将结果保存到CSV文件
-        csv_path = "analyze_gt.csv"
         logger.debug(f"Preparing to write CSV file: {csv_path}")
 
         with open(csv_path, 'w', newline='', encoding='utf-8') as csvfile:
@@ -126,12 +119,22 @@ def analyze_gt():
         logger.error(f"Unexpected error: {str(e)}")
         return 0
 
-if __name__ == "__main__":
+def main():
+    parser = argparse.ArgumentParser(description="导出 filter_date 之后创建的笔记本记录及其预测结果")
+    parser.add_argument("db_path", nargs="?", default=DEFAULT_DB_PATH, help="数据库路径")
+    parser.add_argument("-o", "--output", default=DEFAULT_CSV_PATH, help="输出CSV路径")
+    parser.add_argument("--filter-date", default=DEFAULT_FILTER_DATE, help="created_at 下限")
+    args = parser.parse_args()
+
+    setup_logging()
     logger.info("Starting analyze_gt script")
     try:
-        count = analyze_gt()
+        count = analyze_gt(args.db_path, args.output, args.filter_date)
         logger.info(f"Data extraction completed, {count} records processed.")
         print(f"Data extraction completed, {count} records processed.")
     except Exception as e:
         logger.critical(f"Program execution failed: {str(e)}")
-        print(f"Program execution error, see log file for details.")
\ No newline at end of file
+        print(f"Program execution error, see log file for details.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""  python 模組文件名 : archive_io.py
+
+archive_io.py 将 .zip / .tar / .tar.gz (.tgz) 压缩包视为虚拟目录，不需要解压到磁盘：
+
+    - 压缩包中的文件用 “压缩包路径/成员路径” 表示，例如 /mnt/archive/20250223.zip/line0/LASA_.../laptop_infers.json，
+      Path 的 parent / name / relative_to 等操作与普通文件夹相同
+    - 成员列表来自 zip 的中央目录或 tar 的头部，只读取需要的成员（laptop_infers.json、inference_ 日志），跳过图片
+    - .tar.gz 没有索引，无法随机读取：建立列表时顺序解压一次，同时保存需要的成员：小的 laptop_infers.json
+      留在内存中（每个压缩包最多 TAR_MEMORY_BYTES），inference_ 日志等较大的成员写入一个匿名临时文件，读取时按偏移读回；
+      .zip 与未压缩的 .tar 按需读取单个成员
+
+打开的压缩包保存在进程内的缓存中（最多 MAX_OPEN_ARCHIVES 个，最久未使用的先释放），读取成员时加锁，可在多个线程中使用。
+每个压缩包占用的内存有上限，缓存数量可以大于一批中涉及的压缩包数，被释放的 .tar.gz 再次读取时才需要重新解压
+
+"""
+
+import os
+import shutil
+import tarfile
+import tempfile
+import threading
+import zipfile
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, Optional, Tuple
+
+ARCHIVE_SUFFIXES = ('.zip', '.tar', '.tar.gz', '.tgz')
+
+# 打开或读取压缩包时可能出现的错误（损坏、截断的压缩包等）
+ARCHIVE_ERRORS = (OSError, EOFError, zipfile.BadZipFile, tarfile.TarError, zlib.error)
+
+# 同时保持打开的压缩包数量，并行遍历时不应小于遍历线程数；
+# 每个压缩包占用一个文件描述符（.tar.gz 为临时文件）和最多 TAR_MEMORY_BYTES 内存
+MAX_OPEN_ARCHIVES = 64
+
+# 每个 .tar.gz 保存在内存中的成员总大小，超出的成员写入临时文件
+TAR_MEMORY_BYTES = 1024 * 1024
+
+# 大于该值的成员（通常是 inference_ 日志）直接写入临时文件
+TAR_SPILL_MEMBER_BYTES = 64 * 1024
+
+# 与 discovery 中的文件名约定相同（discovery 导入本模块，这里不反向导入）
+_LAPTOP_INFERS_FILE = "laptop_infers.json"
+_QC_RESULT_PREFIX = "qc_result_"
+_INFERENCE_PREFIX = "inference_"
+
+
+def is_archive_name(name: str) -> bool:
+    """
+    文件名是否为支持的压缩包格式
+    """
+    return name.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def _is_needed(member_name: str) -> bool:
+    """
+    处理时需要读取内容的成员（laptop_infers.json 与 inference_ 日志）
+    """
+    name = member_name.rsplit("/", 1)[-1]
+    return name == _LAPTOP_INFERS_FILE or name.startswith(_INFERENCE_PREFIX)
+
+
+def _member_name(name: str) -> str:
+    """
+    tar 成员名去掉开头的 "./" 与 "/"，与 zip 成员名的形式一致
+    """
+    while name.startswith("./"):
+        name = name[2:]
+    return name.lstrip("/")
+
+
+@dataclass(frozen=True)
+class MemberStat:
+    """压缩包成员的大小与修改时间（与 os.stat_result 的同名属性对应）"""
+    st_size: int
+    st_mtime_ns: int
+
+
+class ArchiveReader:
+    """
+    一个压缩包的成员索引与读取
+    """
+
+    def __init__(self, path: Path):
+        """
+        打开压缩包并建立成员索引
+
+        Args:
+            path (Path): 压缩包路径
+
+        Raises:
+            OSError / zipfile.BadZipFile / tarfile.TarError: 压缩包无法打开或已损坏
+        """
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        # 成员路径（POSIX，不以 / 开头）-> 大小与修改时间，按压缩包中的顺序
+        self.members: Dict[str, MemberStat] = {}
+        # .tar.gz 建立索引时读入内存的成员内容
+        self._cache: Dict[str, bytes] = {}
+        self.cached_bytes = 0
+        # .tar.gz 中写入临时文件的成员：成员路径 -> (偏移, 大小)
+        self._spill = None
+        self._spilled: Dict[str, Tuple[int, int]] = {}
+        self._zip: Optional[zipfile.ZipFile] = None
+        self._tar: Optional[tarfile.TarFile] = None
+        self._tar_infos: Dict[str, tarfile.TarInfo] = {}
+        if self.path.name.lower().endswith('.zip'):
+            self._open_zip()
+        else:
+            self._open_tar()
+
+    def _open_zip(self):
+        self._zip = zipfile.ZipFile(self.path)
+        for info in self._zip.infolist():
+            if info.is_dir():
+                continue
+            mtime = int(datetime(*info.date_time).timestamp() * 1e9)
+            self.members[_member_name(info.filename)] = MemberStat(info.file_size, mtime)
+
+    def _open_tar(self):
+        name = self.path.name.lower()
+        if name.endswith('.tar'):
+            # 未压缩的 tar 可以按头部记录的偏移随机读取
+            self._tar = tarfile.open(self.path, mode='r:')
+            for info in self._tar.getmembers():
+                if info.isfile():
+                    member = _member_name(info.name)
+                    self.members[member] = MemberStat(info.size, int(info.mtime * 1e9))
+                    self._tar_infos[member] = info
+            return
+        # 压缩的 tar 只能顺序读取：单次遍历保存需要的成员，其余成员（图片）直接跳过
+        try:
+            with tarfile.open(self.path, mode='r|*') as tar:
+                for info in tar:
+                    if not info.isfile():
+                        continue
+                    member = _member_name(info.name)
+                    self.members[member] = MemberStat(info.size, int(info.mtime * 1e9))
+                    if _is_needed(member):
+                        self._keep_member(member, tar.extractfile(info), info.size)
+        except BaseException:
+            self.close()
+            raise
+
+    def _keep_member(self, member: str, handle, size: int):
+        """
+        保存 .tar.gz 的一个成员：小成员在内存预算内时留在内存中，否则流式复制到临时文件
+
+        Args:
+            member (str): 成员路径
+            handle: tar.extractfile 返回的文件对象（可能为 None）
+            size (int): 成员大小
+        """
+        if handle is None:
+            self._cache[member] = b''
+            return
+        if size <= TAR_SPILL_MEMBER_BYTES and self.cached_bytes + size <= TAR_MEMORY_BYTES:
+            self._cache[member] = handle.read()
+            self.cached_bytes += size
+            return
+        if self._spill is None:
+            self._spill = tempfile.TemporaryFile(prefix="archive_io_")
+        offset = self._spill.seek(0, os.SEEK_END)
+        shutil.copyfileobj(handle, self._spill)
+        self._spilled[member] = (offset, self._spill.tell() - offset)
+
+    def folders(self) -> List[Tuple[str, str, str]]:
+        """
+        包含 laptop_infers.json 的成员目录，以及目录中（按压缩包顺序）第一个 qc_result_ 与 inference_ 文件名
+
+        Returns:
+            List[Tuple[str, str, str]]: (成员目录，压缩包根目录为 ""，qc_result 文件名，inference_ 文件名)，按压缩包中的顺序
+        """
+        folders: Dict[str, List[str]] = {}
+        has_json = set()
+        for member in self.members:
+            directory, _, name = member.rpartition("/")
+            entry = folders.setdefault(directory, ["", ""])
+            if name == _LAPTOP_INFERS_FILE:
+                has_json.add(directory)
+            elif not entry[0] and name.startswith(_QC_RESULT_PREFIX):
+                entry[0] = name
+            elif not entry[1] and name.startswith(_INFERENCE_PREFIX):
+                entry[1] = name
+        return [(directory, qc, inference) for directory, (qc, inference) in folders.items() if directory in has_json]
+
+    def stat(self, member: str) -> MemberStat:
+        """
+        成员的大小与修改时间
+
+        Raises:
+            FileNotFoundError: 压缩包中没有该成员
+        """
+        try:
+            return self.members[member]
+        except KeyError:
+            raise FileNotFoundError(f"{self.path} 中没有 {member}") from None
+
+    def read(self, member: str) -> bytes:
+        """
+        读取成员内容
+
+        Raises:
+            FileNotFoundError: 压缩包中没有该成员
+        """
+        self.stat(member)
+        cached = self._cache.get(member)
+        if cached is not None:
+            return cached
+        with self._lock:
+            if self._zip is not None:
+                return self._zip.read(member)
+            if self._tar is not None:
+                handle = self._tar.extractfile(self._tar_infos[member])
+                return handle.read() if handle is not None else b''
+            spilled = self._spilled.get(member)
+            if spilled is not None and self._spill is not None:
+                offset, size = spilled
+                self._spill.seek(offset)
+                return self._spill.read(size)
+        # .tar.gz 中不需要的成员（例如图片）没有读入内存
+        raise FileNotFoundError(f"{self.path} 中的 {member} 未被缓存（.tar.gz 只缓存 laptop_infers.json 与 inference_ 日志）")
+
+    def close(self):
+        """
+        关闭压缩包文件（.tar.gz 关闭并删除临时文件）
+        """
+        with self._lock:
+            if self._zip is not None:
+                self._zip.close()
+            if self._tar is not None:
+                self._tar.close()
+            if self._spill is not None:
+                self._spill.close()
+                self._spill = None
+
+
+_archives: "OrderedDict[Path, ArchiveReader]" = OrderedDict()
+_archives_lock = threading.Lock()
+
+
+def open_archive(path: Path) -> ArchiveReader:
+    """
+    返回压缩包的 ArchiveReader（已打开时复用），超过 MAX_OPEN_ARCHIVES 时释放最久未使用的压缩包
+
+    被释放的 ArchiveReader 不主动关闭（可能仍有线程在读取），没有引用后由垃圾回收关闭文件
+
+    Args:
+        path (Path): 压缩包路径
+
+    Returns:
+        ArchiveReader: 压缩包
+    """
+    path = Path(path)
+    with _archives_lock:
+        reader = _archives.get(path)
+        if reader is not None:
+            _archives.move_to_end(path)
+            return reader
+    # 建立索引可能较慢（.tar.gz 需要完整解压一次），不持有全局锁
+    reader = ArchiveReader(path)
+    with _archives_lock:
+        existing = _archives.get(path)
+        if existing is not None:
+            return existing
+        _archives[path] = reader
+        while len(_archives) > MAX_OPEN_ARCHIVES:
+            _archives.popitem(last=False)
+    return reader
+
+
+def close_archives():
+    """
+    关闭并清空全部已打开的压缩包
+    """
+    with _archives_lock:
+        readers = list(_archives.values())
+        _archives.clear()
+    for reader in readers:
+        reader.close()
+
+
+def split_archive_path(path: Path) -> Optional[Tuple[Path, str]]:
+    """
+    将虚拟路径拆分为压缩包路径和成员路径
+
+    Args:
+        path (Path): 路径
+
+    Returns:
+        Optional[Tuple[Path, str]]: (压缩包路径, 成员路径)，路径不在压缩包中时返回 None
+    """
+    parts = Path(path).parts
+    for i, part in enumerate(parts[:-1]):
+        if not is_archive_name(part):
+            continue
+        archive = Path(*parts[:i + 1])
+        with _archives_lock:
+            known = archive in _archives
+        if known or archive.is_file():
+            return archive, PurePosixPath(*parts[i + 1:]).as_posix()
+    return None
+
+
+def read_bytes(path: Path) -> bytes:
+    """
+    读取普通文件或压缩包成员的内容
+
+    Raises:
+        OSError: 文件不存在或无法读取
+    """
+    located = split_archive_path(path)
+    if located is None:
+        return Path(path).read_bytes()
+    archive, member = located
+    return open_archive(archive).read(member)
+
+
+def stat(path: Path):
+    """
+    普通文件的 os.stat 结果，或压缩包成员的 MemberStat（提供 st_size 与 st_mtime_ns）
+
+    Raises:
+        OSError: 文件不存在
+    """
+    located = split_archive_path(path)
+    if located is None:
+        return os.stat(path)
+    archive, member = located
+    return open_archive(archive).stat(member)
+
+
+def in_archive(path: Path) -> bool:
+    """
+    路径是否位于压缩包中
+    """
+    return split_archive_path(path) is not None
@@ -0,0 +1,129 @@
+"""  python 模組文件名 : bench_parse.py
+
+bench_parse.py 比较 laptop_infers.json 两种解析方式的单文件耗时：
+    standard: json.loads -> 补充默认值 -> InferenceOutput(**data)
+    fast:     InferenceOutputWithDefaults.model_validate_json(bytes)
+
+--match 改为比较一台笔记本的框匹配耗时：逐条记录的 Python 循环与 match_records 一次展平后的向量化匹配
+（目标分数取每条记录中随机一个框的分数）
+
+用法:
+    python benchmarks/bench_parse.py --areas 20 --boxes 50 --infers 3 --repeat 200
+    python benchmarks/bench_parse.py --match --areas 1 4 16 64 --boxes 8 --infers 4
+
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from box_matching import match_position, match_records  # noqa: E402
+from process_laptop_infers import parse_inference_output, parse_inference_output_json  # noqa: E402
+
+
+def make_laptop_infers(areas: int, boxes: int, infers: int, seed: int = 0) -> bytes:
+    """
+    生成一个合成的 laptop_infers.json 内容（params 中只有 model_version，需要补充默认值）
+
+    Args:
+        areas (int): 每次推理的区域数量
+        boxes (int): 每个区域的框数量
+        infers (int): laptop_infers 数组长度
+        seed (int): 随机种子
+
+    Returns:
+        bytes: JSON 内容
+    """
+    rng = random.Random(seed)
+    laptop_infers = []
+    for i in range(infers):
+        labels = {}
+        for a in range(areas):
+            labels[f"Front_{a:02d}"] = {
+                "boxes": [[rng.uniform(0, 2000) for _ in range(4)] for _ in range(boxes)],
+                "scores": [rng.random() for _ in range(boxes)],
+            }
+        laptop_infers.append({
+            "timestamp": f"2025-02-23_09-47-{i:02d}",
+            "version": "v2.0.0",
+            "status": "success",
+            "params": {"model_version": "G9A"},
+            "results": {"defect": True, "score": 0.9, "labels": labels},
+        })
+    data = {"laptop_key": "LASA_02_BDCTO100DCS2M0AAAK_20250223094734", "laptop_infers": laptop_infers}
+    return json.dumps(data).encode('utf-8')
+
+
+def bench(func, raw: bytes, repeat: int) -> float:
+    """
+    返回单次调用的平均耗时（微秒）
+    """
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(raw)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def standard_parse(raw: bytes):
+    return parse_inference_output(json.loads(raw))
+
+
+def match_targets(raw: bytes, seed: int = 0):
+    """
+    解析合成数据，并为每条记录取随机一个框的分数作为目标分数
+
+    Returns:
+        Tuple[List[Dict[str, Labels]], List[float]]: 各记录的 labels 与目标分数
+    """
+    rng = random.Random(seed)
+    label_sets = [infer.results.labels for infer in parse_inference_output_json(raw).laptop_infers]
+    targets = [rng.choice([score for labels in label_data.values() for score in labels.scores])
+               for label_data in label_sets]
+    return label_sets, targets
+
+
+def bench_match(args):
+    print(f"{'areas':>6} {'boxes':>6} {'infers':>7} {'scores':>7} {'python(us)':>11} {'vectorized(us)':>15} "
+          f"{'speedup':>8}")
+    for areas in args.areas:
+        label_sets, targets = match_targets(make_laptop_infers(areas, args.boxes, args.infers))
+        python_match = lambda _: [match_position(labels, target) for labels, target in zip(label_sets, targets)]
+        vectorized_match = lambda _: match_records(label_sets, targets, min_scores=0)
+        # 两种方式的匹配结果必须一致
+        assert python_match(None) == vectorized_match(None)
+        python_us = bench(python_match, b"", args.repeat)
+        vectorized_us = bench(vectorized_match, b"", args.repeat)
+        print(f"{areas:>6} {args.boxes:>6} {args.infers:>7} {areas * args.boxes * args.infers:>7} {python_us:>11.1f} "
+              f"{vectorized_us:>15.1f} {python_us / vectorized_us:>7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="laptop_infers.json 解析耗时对比")
+    parser.add_argument("--areas", type=int, nargs="+", default=[1, 10, 40])
+    parser.add_argument("--boxes", type=int, default=20)
+    parser.add_argument("--infers", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--match", action="store_true", help="比较框匹配（Python 循环 / 向量化）而不是解析")
+    args = parser.parse_args()
+    if args.match:
+        bench_match(args)
+        return
+
+    print(f"{'areas':>6} {'boxes':>6} {'size(KB)':>9} {'standard(us)':>13} {'fast(us)':>9} {'speedup':>8}")
+    for areas in args.areas:
+        raw = make_laptop_infers(areas, args.boxes, args.infers)
+        # 两种方式的解析结果必须一致
+        assert standard_parse(raw).model_dump() == parse_inference_output_json(raw).model_dump()
+        standard_us = bench(standard_parse, raw, args.repeat)
+        fast_us = bench(parse_inference_output_json, raw, args.repeat)
+        print(f"{areas:>6} {args.boxes:>6} {len(raw) / 1024:>9.1f} {standard_us:>13.1f} {fast_us:>9.1f} "
+              f"{standard_us / fast_us:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""  python 模組文件名 : bench_pipeline.py
+
+bench_pipeline.py 在合成目录树（见 synth_tree.py）上分别计时 LaptopInfersProcessor 的各个步骤：
+    find_json_files / read_inference_file / read_json_file / parse_json_data /
+    get_db_info（逐个查询）/ get_db_info_batch / GroundTruthIndex 建立与查找 / write_to_csv
+以及完整的 process()（在独立子进程中运行，峰值内存互不影响），输出吞吐量（文件夹/s）和峰值 RSS
+
+用法:
+    python benchmarks/bench_pipeline.py --folders 2000 --areas 10 --boxes 5
+    python benchmarks/bench_pipeline.py --tree /tmp/bench_tree --workers 4 --json-out result.json
+
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from queue import Empty
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from synth_tree import DB_FILENAME, add_spec_arguments, generate_tree, spec_from_args  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows 没有 resource 模块
+    resource = None
+
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    当前进程的峰值 RSS（MB），不支持的平台返回 None
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位为 KB，macOS 为字节
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+def timed(results: List[Dict[str, Any]], step: str, items: int, func):
+    """
+    执行 func 并记录耗时、吞吐量和执行后的峰值 RSS
+
+    Args:
+        results (List[Dict[str, Any]]): 结果列表
+        step (str): 步骤名称
+        items (int): 处理的文件夹数量，用于计算吞吐量
+        func: 无参数的被测函数
+
+    Returns:
+        func 的返回值
+    """
+    start = time.perf_counter()
+    value = func()
+    seconds = time.perf_counter() - start
+    results.append({
+        "step": step,
+        "seconds": seconds,
+        "items": items,
+        "folders_per_second": items / seconds if seconds > 0 else None,
+        "peak_rss_mb": peak_rss_mb(),
+    })
+    return value
+
+
+def processor_options(args: argparse.Namespace) -> Dict[str, Any]:
+    return {"workers": args.workers, "worker_mode": args.worker_mode, "parse_mode": args.parse_mode,
+            "db_lookup": args.db_lookup, "execution": args.execution}
+
+
+def bench_steps(root: Path, db_path: Path, workdir: Path, options: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    分别计时各个步骤
+
+    Args:
+        root (Path): 合成目录树根目录
+        db_path (Path): 数据库路径
+        workdir (Path): 输出目录
+        options (Dict[str, Any]): LaptopInfersProcessor 的额外参数
+
+    Returns:
+        List[Dict[str, Any]]: 各步骤的计时结果
+    """
+    from gt_index import GroundTruthIndex
+    from process_laptop_infers import LaptopInfersProcessor, extract_laptop_name, get_db_info, get_db_info_batch
+
+    processor = LaptopInfersProcessor(str(root), str(workdir / "steps.csv"), str(db_path), **options)
+    results: List[Dict[str, Any]] = []
+
+    file_tuples = timed(results, "find_json_files", 0, processor.find_json_files)
+    results[-1]["items"] = len(file_tuples)
+    results[-1]["folders_per_second"] = len(file_tuples) / results[-1]["seconds"]
+    count = len(file_tuples)
+
+    mask_miss = timed(results, "read_inference_file", count, lambda: [
+        processor.read_inference_file(json_file.parent, inference_file)
+        for json_file, _, inference_file in file_tuples])
+    json_datas = timed(results, "read_json_file", count, lambda: [
+        processor.read_json_file(json_file) for json_file, _, _ in file_tuples])
+    outputs = timed(results, "parse_json_data", count, lambda: [
+        processor.parse_json_data(json_data) if json_data else None for json_data in json_datas])
+
+    names = sorted({extract_laptop_name(output.laptop_key) for output in outputs if output is not None})
+    timed(results, "get_db_info", count, lambda: [get_db_info(name, str(db_path)) for name in names])
+    db_infos = timed(results, "get_db_info_batch", count,
+                     lambda: get_db_info_batch(names, str(db_path), created_after=processor.created_after))
+    index = timed(results, "gt_index_load", count,
+                  lambda: GroundTruthIndex.load(str(db_path), processor.created_after))
+    timed(results, "gt_index_lookup", count, lambda: index.lookup(names))
+
+    rows = []
+    for (json_file, qc_result_file, _), areas, output in zip(file_tuples, mask_miss, outputs):
+        if output is not None:
+            db_info = db_infos.get(extract_laptop_name(output.laptop_key))
+            rows.extend(processor.build_results(output, qc_result_file, areas, db_info))
+    timed(results, "write_to_csv", count, lambda: processor.write_to_csv(rows))
+    return results
+
+
+def _end_to_end_child(root: str, db_path: str, output_csv: str, options: Dict[str, Any],
+                      quiet: bool, queue: "multiprocessing.Queue"):
+    """
+    子进程中运行完整的 process()，通过 queue 返回耗时和峰值 RSS
+    """
+    if quiet:
+        logging.basicConfig(level=logging.WARNING)
+    from process_laptop_infers import LaptopInfersProcessor
+
+    processor = LaptopInfersProcessor(root, output_csv, db_path, **options)
+    start = time.perf_counter()
+    processor.process()
+    queue.put((time.perf_counter() - start, peak_rss_mb()))
+
+
+def bench_end_to_end(root: Path, db_path: Path, workdir: Path, folders: int,
+                     options: Dict[str, Any], quiet: bool) -> Dict[str, Any]:
+    """
+    在独立子进程中计时完整的 process()
+
+    Returns:
+        Dict[str, Any]: 计时结果
+    """
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    child = context.Process(target=_end_to_end_child,
+                            args=(str(root), str(db_path), str(workdir / "end_to_end.csv"), options, quiet, queue))
+    child.start()
+    # 子进程异常退出时不会写入 queue：一边等待一边检查子进程是否仍在运行
+    result = None
+    while result is None:
+        try:
+            result = queue.get(timeout=1.0)
+        except Empty:
+            if not child.is_alive():
+                break
+    child.join()
+    if child.exitcode != 0:
+        raise RuntimeError(f"端到端子进程异常退出（exitcode={child.exitcode}）")
+    if result is None:
+        # 子进程在最后一次检查前刚写入结果并退出
+        result = queue.get(timeout=1.0)
+    seconds, rss = result
+    return {
+        "step": "end_to_end",
+        "seconds": seconds,
+        "items": folders,
+        "folders_per_second": folders / seconds if seconds > 0 else None,
+        "peak_rss_mb": rss,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LaptopInfersProcessor 各步骤与端到端基准测试")
+    parser.add_argument("--tree", type=Path, help="使用已有的合成目录树（不重新生成）")
+    add_spec_arguments(parser)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--worker-mode", choices=["thread", "process"], default="thread")
+    parser.add_argument("--parse-mode", choices=["standard", "fast"], default="standard")
+    parser.add_argument("--execution", choices=["batch", "pipeline"], default="batch")
+    parser.add_argument("--db-lookup", choices=["batch", "index"], default="batch")
+    parser.add_argument("--verbose", action="store_true", help="保留处理日志（默认只输出警告）")
+    parser.add_argument("--json-out", type=Path, help="将结果写入 JSON 文件")
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.basicConfig(level=logging.WARNING)
+    options = processor_options(args)
+
+    with tempfile.TemporaryDirectory(prefix="bench_pipeline_") as tmp:
+        workdir = Path(tmp)
+        if args.tree:
+            root = args.tree.resolve()
+        else:
+            spec = spec_from_args(args)
+            start = time.perf_counter()
+            tree = generate_tree(workdir / "tree", spec)
+            root = tree.root
+            print(f"生成 {spec.folders} 个文件夹用时 {time.perf_counter() - start:.2f} s")
+        db_path = root / DB_FILENAME
+        # 日志文件写入临时目录
+        os.chdir(workdir)
+
+        results = bench_steps(root, db_path, workdir, options)
+        folders = results[0]["items"]
+        results.append(bench_end_to_end(root, db_path, workdir, folders, options, not args.verbose))
+
+    print(f"{'step':<20} {'seconds':>9} {'folders/s':>11} {'peak RSS(MB)':>13}")
+    for result in results:
+        rate = result["folders_per_second"]
+        rss = result["peak_rss_mb"]
+        print(f"{result['step']:<20} {result['seconds']:>9.3f} {rate if rate is not None else float('nan'):>11.1f} "
+              f"{rss if rss is not None else float('nan'):>13.1f}")
+
+    if args.json_out:
+        report = {"options": options, "folders": folders, "results": results}
+        args.json_out.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""  python 模組文件名 : bench_rows.py
+
+bench_rows.py 比较结果行两种表示方式的内存占用与构造耗时：
+    dict:       每行一个 13 个键的 dict（原来的表示方式）
+    result_row: ResultRow（NamedTuple，重复字符串经 sys.intern 共享）
+在合成目录树（见 synth_tree.py）上解析一次全部文件夹，再重复生成 --repeat 轮结果行，
+用 tracemalloc 统计保留全部结果行时的内存，并计时 ResultRow 流式写入 CSV/JSON
+
+用法:
+    python benchmarks/bench_rows.py --folders 2000 --infers 3 --repeat 10
+    python benchmarks/bench_rows.py --tree /tmp/bench_tree --repeat 50 --json-out rows.json
+
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from synth_tree import DB_FILENAME, add_spec_arguments, generate_tree, spec_from_args  # noqa: E402
+
+
+def measure(build: Callable[[], List[Any]]) -> Dict[str, Any]:
+    """
+    构造结果行并统计保留这些结果行所需的内存（耗时与内存分两次测量，计时不受 tracemalloc 影响）
+
+    Args:
+        build: 无参数、返回结果行列表的函数
+
+    Returns:
+        Dict[str, Any]: 行数、耗时、内存（MB）和每行字节数
+    """
+    start = time.perf_counter()
+    rows = build()
+    seconds = time.perf_counter() - start
+    del rows
+    tracemalloc.start()
+    rows = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    count = len(rows)
+    del rows
+    return {
+        "rows": count,
+        "seconds": seconds,
+        "memory_mb": current / 1024 / 1024,
+        "bytes_per_row": current / count if count else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="结果行 dict 与 ResultRow 的内存基准测试")
+    parser.add_argument("--tree", type=Path, help="使用已有的合成目录树（不重新生成）")
+    add_spec_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=10, help="重复生成结果行的轮数，模拟更大规模")
+    parser.add_argument("--json-out", type=Path, help="将结果写入 JSON 文件")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    from process_laptop_infers import LaptopInfersProcessor
+    from result_writer import CSV_FIELDNAMES, StreamingResultWriter
+
+    with tempfile.TemporaryDirectory(prefix="bench_rows_") as tmp:
+        workdir = Path(tmp)
+        if args.tree:
+            root = args.tree.resolve()
+        else:
+            root = generate_tree(workdir / "tree", spec_from_args(args)).root
+        # 日志文件写入临时目录
+        os.chdir(workdir)
+        processor = LaptopInfersProcessor(str(root), str(workdir / "rows.csv"), str(root / DB_FILENAME))
+        loads = [processor.load_folder(*file_tuple) for file_tuple in processor.find_json_files()]
+        loads = [load for load in loads if load.inference_output is not None]
+        db_infos = processor.enrich_batch(loads)
+        processor.close_db()
+
+        def build_result_rows() -> List[Any]:
+            rows = []
+            for _ in range(args.repeat):
+                for load in loads:
+                    rows.extend(processor.results_for_load(load, db_infos))
+            return rows
+
+        def build_dicts() -> List[Any]:
+            rows = []
+            for _ in range(args.repeat):
+                for load in loads:
+                    rows.extend(dict(zip(CSV_FIELDNAMES, row)) for row in processor.results_for_load(load, db_infos))
+            return rows
+
+        results = {
+            "dict": measure(build_dicts),
+            "result_row": measure(build_result_rows),
+        }
+
+        rows = build_result_rows()
+        writer = StreamingResultWriter(workdir / "rows.csv")
+        start = time.perf_counter()
+        writer.write_rows(rows)
+        writer.close()
+        results["result_row"]["write_seconds"] = time.perf_counter() - start
+
+    print(f"{len(loads)} 个文件夹 x {args.repeat} 轮")
+    print(f"{'representation':<15} {'rows':>10} {'seconds':>9} {'memory(MB)':>11} {'bytes/row':>10}")
+    for name, result in results.items():
+        print(f"{name:<15} {result['rows']:>10} {result['seconds']:>9.3f} "
+              f"{result['memory_mb']:>11.1f} {result['bytes_per_row'] or float('nan'):>10.0f}")
+    print(f"ResultRow 写入 CSV/JSON: {results['result_row']['write_seconds']:.3f} s")
+
+    if args.json_out:
+        report = {"folders": len(loads), "repeat": args.repeat, "results": results}
+        args.json_out.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+
+
+if __name__ == "__main__":
+    main()
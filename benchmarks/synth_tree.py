@@ -0,0 +1,412 @@
+"""  python 模組文件名 : synth_tree.py
+
+synth_tree.py 生成用于基准测试的合成检测目录树和对应的 SQLite 数据库：
+    <root>/<产线>/<日期>/<laptop_name>_<时间>/
+        laptop_infers.json   推理结果（区域数、每区域框数、推理次数可配置）
+        qc_result_*.json     QC 文件
+        inference_*.log      推理日志（行数可配置，部分区域带 mask_miss 行）
+        *.jpg                图片占位文件（可选，用于模拟文件夹查找的开销）
+    <root>/test_bench.db     按 test_db.dbml 建表的数据库
+
+用法:
+    python benchmarks/synth_tree.py /tmp/bench_tree --folders 2000 --areas 10 --boxes 5
+
+"""
+
+import argparse
+import json
+import random
+import shutil
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# 与 test_db.dbml 一致的表结构
+SCHEMA_SQL = """
+CREATE TABLE users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+    username VARCHAR(50) NOT NULL,
+    email VARCHAR(100) NOT NULL,
+    password_hash VARCHAR(255) NOT NULL,
+    created_at DATETIME,
+    updated_at DATETIME
+);
+CREATE TABLE user_roles (
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    role VARCHAR(50) NOT NULL,
+    created_at DATETIME,
+    PRIMARY KEY (user_id, role)
+);
+CREATE TABLE laptop_profiles (
+    id INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+    name VARCHAR(50) NOT NULL,
+    laptop_component VARCHAR(50) NOT NULL,
+    laptop_profile_metadata JSON,
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    created_at DATETIME,
+    updated_at DATETIME
+);
+CREATE TABLE laptops (
+    id INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+    laptop_profile_id INTEGER NOT NULL REFERENCES laptop_profiles(id),
+    laptop_name VARCHAR(100) NOT NULL,
+    laptop_metadata JSON,
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    created_at DATETIME,
+    updated_at DATETIME
+);
+CREATE TABLE inference_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+    laptop_id INTEGER NOT NULL REFERENCES laptops(id),
+    start_time DATETIME,
+    end_time DATETIME,
+    status VARCHAR(50),
+    results JSON,
+    api_version VARCHAR(50) NOT NULL,
+    inference_parameters JSON,
+    user_id INTEGER NOT NULL REFERENCES users(id)
+);
+CREATE TABLE laptop_defect_predictions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+    inference_event_id INTEGER NOT NULL REFERENCES inference_events(id),
+    laptop_id INTEGER NOT NULL REFERENCES laptops(id),
+    pred BOOLEAN NOT NULL,
+    pred_score FLOAT,
+    gt BOOLEAN,
+    gt_labeler_id INTEGER REFERENCES users(id),
+    created_at DATETIME,
+    updated_at DATETIME
+);
+CREATE TABLE categories (
+    id INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+    name VARCHAR(100) NOT NULL,
+    supercategory VARCHAR(100)
+);
+CREATE TABLE images (
+    id INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+    laptop_id INTEGER NOT NULL REFERENCES laptops(id),
+    image_uri VARCHAR(255) NOT NULL,
+    file_name VARCHAR(50) NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    user_id INTEGER NOT NULL REFERENCES users(id),
+    created_at DATETIME
+);
+CREATE TABLE annotations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT NOT NULL,
+    image_id INTEGER NOT NULL REFERENCES images(id),
+    category_id INTEGER NOT NULL REFERENCES categories(id),
+    bbox VARCHAR(255) NOT NULL,
+    conf FLOAT,
+    is_ground_truth BOOLEAN NOT NULL,
+    inference_event_id INTEGER REFERENCES inference_events(id),
+    user_id INTEGER REFERENCES users(id),
+    created_at DATETIME
+);
+"""
+
+DB_FILENAME = "test_bench.db"
+
+# 图片尺寸，框坐标在该范围内生成
+IMAGE_WIDTH = 2448
+IMAGE_HEIGHT = 2048
+
+
+@dataclass
+class TreeSpec:
+    """合成目录树的规模参数"""
+    folders: int = 1000
+    areas: int = 10
+    boxes: int = 5
+    infers: int = 2
+    log_lines: int = 200
+    images: int = 0
+    lines: int = 3
+    # 区域出现 mask_miss 的比例
+    mask_miss_rate: float = 0.05
+    # laptop_infers.json 损坏（无法解码）的比例
+    bad_json_rate: float = 0.01
+    # 缺少 inference_ 日志的比例
+    missing_log_rate: float = 0.05
+    # 数据库中没有记录的比例
+    missing_db_rate: float = 0.1
+    # 最新一次推理的预测框被写入人工标注框的比例，0 表示不生成标注
+    annotation_rate: float = 0.5
+    seed: int = 0
+
+
+@dataclass
+class SyntheticTree:
+    """生成结果"""
+    root: Path
+    db_path: Path
+    laptop_names: List[str]
+    bytes_json: int = 0
+    bytes_log: int = 0
+
+
+def area_names(count: int) -> List[str]:
+    """
+    生成区域名称，例如 Front_00、Front_01
+
+    Args:
+        count (int): 区域数量
+
+    Returns:
+        List[str]: 区域名称列表
+    """
+    return [f"Front_{i:02d}" for i in range(count)]
+
+
+def make_labels(rng: random.Random, areas: List[str], boxes: int) -> dict:
+    """
+    生成一次推理的 labels，框格式为 [x1, y1, x2, y2]
+    """
+    labels = {}
+    for area in areas:
+        area_boxes = []
+        for _ in range(boxes):
+            x1 = round(rng.uniform(0, IMAGE_WIDTH - 200), 2)
+            y1 = round(rng.uniform(0, IMAGE_HEIGHT - 200), 2)
+            area_boxes.append([x1, y1, round(x1 + rng.uniform(5, 200), 2), round(y1 + rng.uniform(5, 200), 2)])
+        labels[area] = {"boxes": area_boxes, "scores": [round(rng.random(), 6) for _ in range(boxes)]}
+    return labels
+
+
+def make_laptop_infers(rng: random.Random, laptop_key: str, spec: TreeSpec) -> str:
+    """
+    生成 laptop_infers.json 内容
+
+    Args:
+        rng (random.Random): 随机数生成器
+        laptop_key (str): laptop_key
+        spec (TreeSpec): 规模参数
+
+    Returns:
+        str: JSON 文本
+    """
+    return json.dumps(make_laptop_infers_data(rng, laptop_key, spec), indent=2)
+
+
+def make_laptop_infers_data(rng: random.Random, laptop_key: str, spec: TreeSpec) -> dict:
+    """
+    生成 laptop_infers.json 的数据
+    """
+    areas = area_names(spec.areas)
+    laptop_infers = []
+    for i in range(spec.infers):
+        labels = make_labels(rng, areas, spec.boxes)
+        scores = [score for label_data in labels.values() for score in label_data["scores"]]
+        top_score = max(scores) if scores else 0.0
+        laptop_infers.append({
+            "timestamp": f"2025-02-23_09-{i // 60:02d}-{i % 60:02d}",
+            "version": "v2.0.0",
+            "status": "success",
+            "params": {"model_version": "G9A", "score_thr": 0.5, "box_size_thr": 1000},
+            "results": {"defect": top_score > 0.5, "score": top_score, "labels": labels},
+        })
+    return {"laptop_key": laptop_key, "laptop_infers": laptop_infers}
+
+
+def make_inference_log(rng: random.Random, laptop_name: str, spec: TreeSpec) -> str:
+    """
+    生成 inference_ 日志内容，包含普通行、区域耗时行和 mask_miss 行
+    """
+    areas = area_names(spec.areas)
+    prefix = f"[INFO][2025-02-23 09:47:39][inference_v2][{laptop_name}]"
+    lines = [f"{prefix} start inference, areas={len(areas)}"]
+    for area in areas:
+        if rng.random() < spec.mask_miss_rate:
+            lines.append(f"{prefix} {area}: Transformation not possible")
+        lines.append(f"{prefix} {area}: inference time {rng.uniform(0.01, 0.2):.3f}s")
+    while len(lines) < spec.log_lines:
+        lines.append(f"{prefix} heartbeat queue={rng.randint(0, 8)} gpu_mem={rng.randint(1000, 8000)}MB")
+    return "\n".join(lines) + "\n"
+
+
+def make_annotations(rng: random.Random, labels: dict, spec: TreeSpec) -> Dict[str, List[List[float]]]:
+    """
+    由一次推理的 labels 生成人工标注框（[x, y, w, h]）：按 annotation_rate 比例保留预测框并加入少量偏移，
+    另外每个区域以 annotation_rate / 5 的概率加入一个与预测无关的框（漏检）
+
+    Returns:
+        Dict[str, List[List[float]]]: 区域名称 -> 标注框
+    """
+    annotations = {}
+    for area, label_data in labels.items():
+        area_boxes = []
+        for x1, y1, x2, y2 in label_data["boxes"]:
+            if rng.random() < spec.annotation_rate:
+                dx, dy = rng.uniform(-5, 5), rng.uniform(-5, 5)
+                area_boxes.append([round(x1 + dx, 2), round(y1 + dy, 2), round(x2 - x1, 2), round(y2 - y1, 2)])
+        if rng.random() < spec.annotation_rate / 5:
+            x, y = round(rng.uniform(0, IMAGE_WIDTH - 200), 2), round(rng.uniform(0, IMAGE_HEIGHT - 200), 2)
+            area_boxes.append([x, y, round(rng.uniform(5, 200), 2), round(rng.uniform(5, 200), 2)])
+        if area_boxes:
+            annotations[area] = area_boxes
+    return annotations
+
+
+def create_database(db_path: Path, laptop_names: List[str], spec: TreeSpec, rng: random.Random,
+                    annotations: Optional[Dict[str, Dict[str, List[List[float]]]]] = None,
+                    events: Optional[Dict[str, dict]] = None):
+    """
+    按 test_db.dbml 建表并写入笔记本记录、推理事件、预测结果以及人工标注框
+
+    每个笔记本有一条 2025-01-01 之前的旧记录和一条之后的新记录，新记录带推理事件与预测结果，
+    missing_db_rate 比例的笔记本不写入。标注框写入新记录的图片（每个区域一张，file_name 为 区域名称.jpg）。
+    提供 events 时，laptop_infers 中的每条推理记录写入一个推理事件（results / inference_parameters 与 JSON 相同），
+    laptop_key 与 qc_result 文件名写入 laptop_metadata，预测结果关联最后一个事件。
+
+    Args:
+        db_path (Path): 数据库路径
+        laptop_names (List[str]): 笔记本名称列表
+        spec (TreeSpec): 规模参数
+        rng (random.Random): 随机数生成器
+        annotations (Optional[Dict[str, Dict[str, List[List[float]]]]]): laptop_name -> 区域名称 -> 标注框
+        events (Optional[Dict[str, dict]]): laptop_name -> {"laptop_key", "qc_result_file", "laptop_infers"}
+    """
+    annotations = annotations or {}
+    events = events or {}
+    db_path.unlink(missing_ok=True)
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.executescript(SCHEMA_SQL)
+        conn.execute("INSERT INTO users (username, email, password_hash, created_at) "
+                     "VALUES ('bench', 'bench@example.com', '-', '2024-01-01 00:00:00')")
+        conn.execute("INSERT INTO laptop_profiles (name, laptop_component, user_id, created_at) "
+                     "VALUES ('G9A', 'Front', 1, '2024-01-01 00:00:00')")
+        conn.execute("INSERT INTO categories (name) VALUES ('defect')")
+        laptop_id = 0
+        for name in laptop_names:
+            if rng.random() < spec.missing_db_rate:
+                continue
+            conn.execute("INSERT INTO laptops (laptop_profile_id, laptop_name, user_id, created_at) "
+                         "VALUES (1, ?, 1, '2024-12-01 00:00:00')", (name,))
+            event = events.get(name)
+            metadata = json.dumps({"laptop_key": event["laptop_key"], "qc_result_file": event["qc_result_file"]}
+                                  ) if event else None
+            conn.execute("INSERT INTO laptops (laptop_profile_id, laptop_name, laptop_metadata, user_id, created_at) "
+                         "VALUES (1, ?, ?, 1, '2025-02-23 09:47:39')", (name, metadata))
+            laptop_id += 2
+            pred = rng.random() < 0.3
+            if event:
+                for infer in event["laptop_infers"]:
+                    date, _, time = infer["timestamp"].partition("_")
+                    event_id = conn.execute(
+                        "INSERT INTO inference_events (laptop_id, start_time, end_time, status, results, "
+                        "api_version, inference_parameters, user_id) VALUES (?, ?, ?, ?, ?, ?, ?, 1)",
+                        (laptop_id, f"{date} {time.replace('-', ':')}", '2025-02-23 09:47:41', infer["status"],
+                         json.dumps(infer["results"]), infer["version"], json.dumps(infer["params"]))).lastrowid
+            else:
+                event_id = conn.execute(
+                    "INSERT INTO inference_events (laptop_id, start_time, end_time, status, results, "
+                    "api_version, inference_parameters, user_id) VALUES (?, ?, ?, 'success', ?, 'v2', ?, 1)",
+                    (laptop_id, '2025-02-23 09:47:39', '2025-02-23 09:47:41',
+                     json.dumps({"defect": pred}), json.dumps({"model_version": "G9A"}))).lastrowid
+            conn.execute("INSERT INTO laptop_defect_predictions (inference_event_id, laptop_id, pred, "
+                         "pred_score, gt, created_at) VALUES (?, ?, ?, ?, ?, '2025-02-23 09:47:41')",
+                         (event_id, laptop_id, int(pred), round(rng.random(), 4),
+                          int(rng.random() < 0.25)))
+            for area, area_boxes in annotations.get(name, {}).items():
+                image_id = conn.execute(
+                    "INSERT INTO images (laptop_id, image_uri, file_name, width, height, user_id, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, 1, '2025-02-23 09:47:39')",
+                    (laptop_id, f"/images/{name}/{area}.jpg", f"{area}.jpg", IMAGE_WIDTH, IMAGE_HEIGHT)).lastrowid
+                conn.executemany("INSERT INTO annotations (image_id, category_id, bbox, is_ground_truth, user_id, "
+                                 "created_at) VALUES (?, 1, ?, 1, 1, '2025-02-23 10:00:00')",
+                                 [(image_id, json.dumps(box)) for box in area_boxes])
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def generate_tree(root: Path, spec: TreeSpec, clean: bool = True) -> SyntheticTree:
+    """
+    生成合成目录树和数据库
+
+    Args:
+        root (Path): 输出根目录
+        spec (TreeSpec): 规模参数
+        clean (bool): 生成前是否删除已有目录
+
+    Returns:
+        SyntheticTree: 生成结果
+    """
+    root = Path(root)
+    if clean and root.exists():
+        shutil.rmtree(root)
+    root.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(spec.seed)
+    # 标注框使用单独的随机数生成器，不改变其他内容
+    annotation_rng = random.Random(spec.seed + 1)
+    annotations: Dict[str, Dict[str, List[List[float]]]] = {}
+    events: Dict[str, dict] = {}
+    tree = SyntheticTree(root=root, db_path=root / DB_FILENAME, laptop_names=[])
+
+    for i in range(spec.folders):
+        laptop_name = f"LASA_{i % spec.lines:02d}_SN{i:08d}"
+        stamp = f"2025{(i // 1000) % 12 + 1:02d}{(i // 50) % 28 + 1:02d}{i % 240000:06d}"
+        folder = root / f"line_{i % spec.lines:02d}" / stamp[:8] / f"{laptop_name}_{stamp}"
+        folder.mkdir(parents=True, exist_ok=True)
+        tree.laptop_names.append(laptop_name)
+
+        data = make_laptop_infers_data(rng, f"{laptop_name}_{stamp}", spec)
+        content = json.dumps(data, indent=2)
+        events[laptop_name] = {"laptop_key": data["laptop_key"], "qc_result_file": f"qc_result_{stamp}.json",
+                               "laptop_infers": data["laptop_infers"]}
+        if spec.annotation_rate > 0 and data["laptop_infers"]:
+            annotations[laptop_name] = make_annotations(
+                annotation_rng, data["laptop_infers"][-1]["results"]["labels"], spec)
+        if rng.random() < spec.bad_json_rate:
+            content = content[:len(content) // 2]
+        tree.bytes_json += (folder / "laptop_infers.json").write_text(content, encoding='utf-8')
+        (folder / f"qc_result_{stamp}.json").write_text('{"qc": "pass"}', encoding='utf-8')
+        if rng.random() >= spec.missing_log_rate:
+            log = make_inference_log(rng, laptop_name, spec)
+            tree.bytes_log += (folder / f"inference_{stamp}.log").write_text(log, encoding='utf-8')
+        for area in area_names(spec.images):
+            (folder / f"{area}.jpg").write_bytes(b"")
+
+    create_database(tree.db_path, tree.laptop_names, spec, rng, annotations, events)
+    return tree
+
+
+def add_spec_arguments(parser: argparse.ArgumentParser):
+    """
+    向命令行解析器添加 TreeSpec 的参数
+    """
+    defaults = TreeSpec()
+    parser.add_argument("--folders", type=int, default=defaults.folders, help="文件夹数量")
+    parser.add_argument("--areas", type=int, default=defaults.areas, help="每次推理的区域数量")
+    parser.add_argument("--boxes", type=int, default=defaults.boxes, help="每个区域的框数量")
+    parser.add_argument("--infers", type=int, default=defaults.infers, help="laptop_infers 数组长度")
+    parser.add_argument("--log-lines", type=int, default=defaults.log_lines, help="inference_ 日志行数")
+    parser.add_argument("--images", type=int, default=defaults.images, help="每个文件夹的图片占位文件数")
+    parser.add_argument("--annotation-rate", type=float, default=defaults.annotation_rate,
+                        help="预测框写入人工标注框（annotations）的比例，0 表示不生成")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def spec_from_args(args: argparse.Namespace) -> TreeSpec:
+    return TreeSpec(folders=args.folders, areas=args.areas, boxes=args.boxes, infers=args.infers,
+                    log_lines=args.log_lines, images=args.images,
+                    annotation_rate=args.annotation_rate, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成合成检测目录树和数据库")
+    parser.add_argument("root", type=Path, help="输出根目录（已存在时会被删除）")
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+
+    tree = generate_tree(args.root, spec_from_args(args))
+    print(f"已生成 {len(tree.laptop_names)} 个文件夹: {tree.root}")
+    print(f"laptop_infers.json 共 {tree.bytes_json / 1024 / 1024:.1f} MB, "
+          f"inference_ 日志共 {tree.bytes_log / 1024 / 1024:.1f} MB")
+    print(f"数据库: {tree.db_path}")
+
+
+if __name__ == "__main__":
+    main()
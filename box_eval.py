@@ -0,0 +1,475 @@
+"""  python 模組文件名 : box_eval.py
+
+box_eval.py 将 laptop_infers.json 中每个框与数据库 annotations 表中的人工标注框（is_ground_truth = 1）做 IoU 匹配，
+得到框级别的 TP/FP/FN 和每个区域的 AP 与 mAP（laptop 级别的 pred/gt 对比见 analytics.py 与 threshold_sweep.py）
+
+    - 标注在运行开始时一次性读取（annotations → images → laptops），区域名为 images.file_name 去掉扩展名，
+      例如 Front_00.jpg 对应 labels 中的 Front_00；bbox 默认为 [x, y, w, h]，可指定为 [x1, y1, x2, y2]
+    - 每台笔记本的预测框与标注框一次计算完整的 IoU 矩阵（NumPy），不同区域之间的 IoU 记为 -1
+    - 预测框按分数从高到低贪心匹配：每个预测框匹配 IoU 最大、不低于 iou_threshold 且尚未匹配的标注框
+    - 没有任何人工标注框的笔记本不参与评估（计入 unannotated）
+
+numpy 为必需依赖（未安装时处理器跳过框级评估）
+
+"""
+
+import json
+import logging
+import re
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from db_access import GT_ANNOTATIONS_QUERY, connect_readonly
+from schema import InferenceOutput, Labels
+
+BBOX_FORMATS = ("xywh", "xyxy")
+
+_BBOX_SEPARATOR = re.compile(r"[\s,;]+")
+
+
+@dataclass(frozen=True)
+class BoxEvalConfig:
+    """
+    框级评估参数
+
+    Attributes:
+        iou_threshold (float): 预测框与标注框匹配所需的最小 IoU
+        bbox_format (str): annotations.bbox 的坐标格式，"xywh"（左上角与宽高）或 "xyxy"（两个角点）
+        score_threshold (float): 分数低于该值的预测框不参与评估
+    """
+    iou_threshold: float = 0.5
+    bbox_format: str = "xywh"
+    score_threshold: float = 0.0
+
+    def __post_init__(self):
+        if self.bbox_format not in BBOX_FORMATS:
+            raise ValueError(f"不支持的 bbox_format: {self.bbox_format}")
+        if not 0 < self.iou_threshold <= 1:
+            raise ValueError(f"iou_threshold 必须在 (0, 1] 范围内: {self.iou_threshold}")
+
+
+def parse_bbox(text: Any, bbox_format: str = "xywh") -> Optional[Tuple[float, float, float, float]]:
+    """
+    解析 annotations.bbox（JSON 数组 "[x, y, w, h]" 或逗号/空白分隔的四个数值），转换为 (x1, y1, x2, y2)
+
+    Args:
+        text (Any): bbox 字段
+        bbox_format (str): "xywh" 或 "xyxy"
+
+    Returns:
+        Optional[Tuple[float, float, float, float]]: 框坐标，格式不符时返回 None
+    """
+    if text is None:
+        return None
+    parts = [part for part in _BBOX_SEPARATOR.split(str(text).strip().strip("[]()")) if part]
+    if len(parts) != 4:
+        return None
+    try:
+        x1, y1, a, b = (float(part) for part in parts)
+    except ValueError:
+        return None
+    if bbox_format == "xywh":
+        return x1, y1, x1 + a, y1 + b
+    return x1, y1, a, b
+
+
+def area_name_from_file(file_name: str) -> str:
+    """
+    images.file_name 对应的区域名称（文件名去掉目录与扩展名）
+    """
+    return PurePosixPath(str(file_name).replace("\\", "/")).stem
+
+
+def latest_labels(inference_output: InferenceOutput) -> Optional[Dict[str, Labels]]:
+    """
+    最新（laptop_infers 中最后）一条有推理结果的记录的 labels；同一笔记本的多次推理只评估一次，避免标注框被重复计为 FN
+
+    Args:
+        inference_output (InferenceOutput): 推理输出
+
+    Returns:
+        Optional[Dict[str, Labels]]: labels，没有推理结果时返回 None
+    """
+    for infer in reversed(inference_output.laptop_infers):
+        if infer.results:
+            return infer.results.labels
+    return None
+
+
+def iou_matrix(boxes_a: "np.ndarray", boxes_b: "np.ndarray") -> "np.ndarray":
+    """
+    两组 [x1, y1, x2, y2] 框两两之间的 IoU
+
+    Args:
+        boxes_a (np.ndarray): (N, 4)
+        boxes_b (np.ndarray): (M, 4)
+
+    Returns:
+        np.ndarray: (N, M)，面积为 0 的框与任何框的 IoU 为 0
+    """
+    import numpy as np
+
+    x1 = np.maximum(boxes_a[:, None, 0], boxes_b[None, :, 0])
+    y1 = np.maximum(boxes_a[:, None, 1], boxes_b[None, :, 1])
+    x2 = np.minimum(boxes_a[:, None, 2], boxes_b[None, :, 2])
+    y2 = np.minimum(boxes_a[:, None, 3], boxes_b[None, :, 3])
+    intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = np.clip(boxes_a[:, 2] - boxes_a[:, 0], 0, None) * np.clip(boxes_a[:, 3] - boxes_a[:, 1], 0, None)
+    area_b = np.clip(boxes_b[:, 2] - boxes_b[:, 0], 0, None) * np.clip(boxes_b[:, 3] - boxes_b[:, 1], 0, None)
+    union = area_a[:, None] + area_b[None, :] - intersection
+    return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+
+def average_precision(scores: "np.ndarray", matched: "np.ndarray", gt_count: int) -> Optional[float]:
+    """
+    按分数排序的 precision-recall 曲线计算 AP（全点插值：precision 取右侧最大值后对 recall 积分）
+
+    Args:
+        scores (np.ndarray): 预测框分数
+        matched (np.ndarray): 与 scores 对齐的布尔数组，是否匹配到标注框
+        gt_count (int): 标注框数量
+
+    Returns:
+        Optional[float]: AP，没有标注框时为 None
+    """
+    import numpy as np
+
+    if gt_count == 0:
+        return None
+    if scores.size == 0:
+        return 0.0
+    order = np.argsort(-scores, kind='stable')
+    tp = np.cumsum(matched[order])
+    fp = np.cumsum(~matched[order])
+    recall = tp / gt_count
+    precision = tp / (tp + fp)
+    envelope = np.maximum.accumulate(precision[::-1])[::-1]
+    steps = np.diff(np.concatenate(([0.0], recall)))
+    return float(np.sum(steps * envelope))
+
+
+class AnnotationIndex:
+    """
+    laptop_name -> 人工标注框的内存索引
+
+    区域名称映射为整数编号（area_ids），每台笔记本的标注框保存为 (M, 4) 坐标数组与 (M,) 区域编号数组。
+    """
+
+    def __init__(self):
+        self.area_ids: Dict[str, int] = {}
+        self.area_names: List[str] = []
+        self.entries: Dict[str, Tuple["np.ndarray", "np.ndarray"]] = {}
+        # 格式不符、无法解析的 bbox 数量
+        self.invalid = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @property
+    def box_count(self) -> int:
+        return sum(len(areas) for _, areas in self.entries.values())
+
+    def area_id(self, area_name: str) -> int:
+        """
+        区域名称的编号，第一次出现时分配
+        """
+        area_id = self.area_ids.get(area_name)
+        if area_id is None:
+            area_id = self.area_ids[area_name] = len(self.area_names)
+            self.area_names.append(area_name)
+        return area_id
+
+    def get(self, laptop_name: str) -> Optional[Tuple["np.ndarray", "np.ndarray"]]:
+        """
+        一台笔记本的标注框 (boxes, area_ids)，没有标注时返回 None
+        """
+        return self.entries.get(laptop_name)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Tuple[str, int, str, Any]], bbox_format: str = "xywh") -> "AnnotationIndex":
+        """
+        由按 created_at 升序排列的标注记录建立索引，同一 laptop_name 只保留最新笔记本记录（laptop_id）的标注
+
+        Args:
+            rows (Iterable[Tuple[str, int, str, Any]]): (laptop_name, laptop_id, file_name, bbox)
+            bbox_format (str): bbox 的坐标格式
+
+        Returns:
+            AnnotationIndex: 索引
+        """
+        import numpy as np
+
+        index = cls()
+        pending: Dict[str, Tuple[int, List[Tuple[float, float, float, float]], List[int]]] = {}
+        for laptop_name, laptop_id, file_name, bbox in rows:
+            box = parse_bbox(bbox, bbox_format)
+            if box is None:
+                index.invalid += 1
+                continue
+            current = pending.get(laptop_name)
+            if current is None or current[0] != laptop_id:
+                current = pending[laptop_name] = (laptop_id, [], [])
+            current[1].append(box)
+            current[2].append(index.area_id(area_name_from_file(file_name)))
+        for laptop_name, (_, boxes, area_ids) in pending.items():
+            index.entries[laptop_name] = (np.asarray(boxes, dtype=np.float64).reshape(-1, 4),
+                                          np.asarray(area_ids, dtype=np.int32))
+        return index
+
+    @classmethod
+    def load(cls, db_path: str, created_after: str, bbox_format: str = "xywh",
+             conn: Optional[sqlite3.Connection] = None) -> "AnnotationIndex":
+        """
+        一次查询读取 created_after 之后全部笔记本的人工标注框
+
+        Args:
+            db_path (str): 数据库路径
+            created_after (str): laptops.created_at 下限
+            bbox_format (str): bbox 的坐标格式
+            conn (Optional[sqlite3.Connection]): 复用的数据库连接，为 None 时以只读方式打开并关闭
+
+        Returns:
+            AnnotationIndex: 索引
+        """
+        own_conn = conn is None
+        if own_conn:
+            conn = connect_readonly(db_path)
+        try:
+            cursor = conn.execute(GT_ANNOTATIONS_QUERY, (created_after,))
+
+            def rows():
+                while True:
+                    chunk = cursor.fetchmany(10000)
+                    if not chunk:
+                        break
+                    yield from chunk
+
+            return cls.from_rows(rows(), bbox_format)
+        finally:
+            if own_conn:
+                conn.close()
+
+
+class BoxEvaluator:
+    """
+    框级评估的流式统计
+
+    add_laptop 每次接收一台笔记本的 labels（最新一条有结果的推理记录）；
+    每个预测框的区域编号、分数与是否匹配累积在数组中，结束时按区域计算 AP。
+    """
+
+    def __init__(self, annotations: AnnotationIndex, config: Optional[BoxEvalConfig] = None):
+        """
+        初始化评估
+
+        Args:
+            annotations (AnnotationIndex): 人工标注框索引
+            config (Optional[BoxEvalConfig]): 评估参数，为 None 时使用默认参数
+        """
+        self.annotations = annotations
+        self.config = config or BoxEvalConfig()
+        self.laptops = 0
+        self.unannotated = 0
+        # 增量模式下复用缓存、没有 labels 的笔记本
+        self.skipped = 0
+        self._pred_areas: List[Any] = []
+        self._pred_scores: List[Any] = []
+        self._pred_matched: List[Any] = []
+        self._gt_areas: List[Any] = []
+
+    def predictions(self, labels: Dict[str, Labels]) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray"]:
+        """
+        展平一次推理结果中的预测框，去掉格式不符的框和分数低于 score_threshold 的框
+
+        Args:
+            labels (Dict[str, Labels]): 标签数据
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, np.ndarray]: boxes (N, 4)、scores (N,)、区域编号 (N,)
+        """
+        import numpy as np
+
+        from box_matching import LabelArrays
+
+        arrays = LabelArrays(labels)
+        area_ids = np.asarray([self.annotations.area_id(name) for name in arrays.area_names], dtype=np.int32)
+        boxes = arrays.boxes
+        keep = ~np.isnan(boxes).any(axis=1) & (arrays.scores >= self.config.score_threshold)
+        return boxes[keep], arrays.scores[keep], area_ids[arrays.area_index[keep]]
+
+    def match(self, boxes: "np.ndarray", scores: "np.ndarray", areas: "np.ndarray",
+              gt_boxes: "np.ndarray", gt_areas: "np.ndarray") -> "np.ndarray":
+        """
+        按分数从高到低贪心匹配一台笔记本的预测框与标注框
+
+        Args:
+            boxes (np.ndarray): 预测框 (N, 4)
+            scores (np.ndarray): 预测分数 (N,)
+            areas (np.ndarray): 预测框的区域编号 (N,)
+            gt_boxes (np.ndarray): 标注框 (M, 4)
+            gt_areas (np.ndarray): 标注框的区域编号 (M,)
+
+        Returns:
+            np.ndarray: 与 scores 对齐的布尔数组，是否匹配到标注框
+        """
+        import numpy as np
+
+        matched = np.zeros(len(scores), dtype=bool)
+        if not len(scores) or not len(gt_boxes):
+            return matched
+        iou = np.where(areas[:, None] == gt_areas[None, :], iou_matrix(boxes, gt_boxes), -1.0)
+        # 只有 IoU 达到阈值的预测框需要逐个贪心处理
+        candidates = np.flatnonzero((iou >= self.config.iou_threshold).any(axis=1))
+        if not candidates.size:
+            return matched
+        available = np.ones(len(gt_boxes), dtype=bool)
+        for pred in candidates[np.argsort(-scores[candidates], kind='stable')]:
+            row = np.where(available, iou[pred], -1.0)
+            gt = int(np.argmax(row))
+            if row[gt] >= self.config.iou_threshold:
+                matched[pred] = True
+                available[gt] = False
+        return matched
+
+    def add_laptop(self, laptop_name: str, labels: Optional[Dict[str, Labels]]):
+        """
+        评估一台笔记本
+
+        Args:
+            laptop_name (str): laptop_name
+            labels (Optional[Dict[str, Labels]]): 该笔记本最新一条有结果的推理记录的 labels
+        """
+        annotation = self.annotations.get(laptop_name)
+        if annotation is None:
+            self.unannotated += 1
+            return
+        gt_boxes, gt_areas = annotation
+        self.laptops += 1
+        self._gt_areas.append(gt_areas)
+        if not labels:
+            return
+        boxes, scores, areas = self.predictions(labels)
+        self._pred_areas.append(areas)
+        self._pred_scores.append(scores)
+        self._pred_matched.append(self.match(boxes, scores, areas, gt_boxes, gt_areas))
+
+    def skip(self):
+        """
+        记录一台无法参与评估的笔记本（例如复用扫描清单缓存、没有 labels）
+        """
+        self.skipped += 1
+
+    def _collect(self) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray", "np.ndarray"]:
+        """
+        合并累积的数组（合并后只保留一份）
+        """
+        import numpy as np
+
+        parts = []
+        for name, dtype in (("_pred_areas", np.int32), ("_pred_scores", np.float64),
+                            ("_pred_matched", bool), ("_gt_areas", np.int32)):
+            chunks = getattr(self, name)
+            merged = np.concatenate(chunks) if chunks else np.zeros(0, dtype=dtype)
+            setattr(self, name, [merged])
+            parts.append(merged)
+        return tuple(parts)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        评估报告
+
+        Returns:
+            Dict[str, Any]: 参数、笔记本数量、整体与各区域的 TP/FP/FN、precision/recall、AP 以及 mAP
+        """
+        import numpy as np
+
+        pred_areas, scores, matched, gt_areas = self._collect()
+        area_count = len(self.annotations.area_names)
+        predicted = np.bincount(pred_areas, minlength=area_count)
+        true_positive = np.bincount(pred_areas, weights=matched, minlength=area_count).astype(np.int64)
+        gt_counts = np.bincount(gt_areas, minlength=area_count)
+
+        by_area = {}
+        for area_id in np.flatnonzero(predicted + gt_counts):
+            mask = pred_areas == area_id
+            tp, preds, gts = int(true_positive[area_id]), int(predicted[area_id]), int(gt_counts[area_id])
+            by_area[self.annotations.area_names[area_id]] = {
+                **self._counts(tp, preds - tp, gts - tp),
+                "ap": average_precision(scores[mask], matched[mask], gts),
+            }
+        aps = [stats["ap"] for stats in by_area.values() if stats["ap"] is not None]
+        tp = int(matched.sum())
+        return {
+            "config": {"iou_threshold": self.config.iou_threshold, "bbox_format": self.config.bbox_format,
+                       "score_threshold": self.config.score_threshold},
+            "laptops": self.laptops,
+            "unannotated": self.unannotated,
+            "skipped": self.skipped,
+            "overall": self._counts(tp, len(scores) - tp, len(gt_areas) - tp),
+            "map": sum(aps) / len(aps) if aps else None,
+            "by_area": dict(sorted(by_area.items())),
+        }
+
+    @staticmethod
+    def _counts(tp: int, fp: int, fn: int) -> Dict[str, Any]:
+        return {"tp": tp, "fp": fp, "fn": fn,
+                "precision": tp / (tp + fp) if tp + fp else None,
+                "recall": tp / (tp + fn) if tp + fn else None}
+
+    def summary_lines(self, report: Optional[Dict[str, Any]] = None) -> List[str]:
+        """
+        日志中输出的汇总：整体 TP/FP/FN、mAP 与各区域的 AP
+
+        Args:
+            report (Optional[Dict[str, Any]]): to_dict 的结果，为 None 时重新计算
+
+        Returns:
+            List[str]: 文本行
+        """
+        report = report or self.to_dict()
+        overall = report["overall"]
+        map_text = f"{report['map']:.4f}" if report["map"] is not None else "-"
+        lines = [f"框级评估 (IoU >= {self.config.iou_threshold:g}): {report['laptops']} 台笔记本有标注，"
+                 f"无标注 {report['unannotated']} 台，未参与 {report['skipped']} 台",
+                 f"TP {overall['tp']} FP {overall['fp']} FN {overall['fn']}，mAP {map_text}"]
+        if report["by_area"]:
+            lines.append(f"{'area_name':<20} {'tp':>8} {'fp':>8} {'fn':>8} {'AP':>8}")
+            for name, stats in report["by_area"].items():
+                ap_text = f"{stats['ap']:.4f}" if stats["ap"] is not None else "-"
+                lines.append(f"{name:<20} {stats['tp']:>8} {stats['fp']:>8} {stats['fn']:>8} {ap_text:>8}")
+        return lines
+
+    def write_report(self, path: Path, report: Optional[Dict[str, Any]] = None):
+        """
+        将评估报告写入 JSON 文件
+
+        Args:
+            path (Path): 报告文件路径
+            report (Optional[Dict[str, Any]]): to_dict 的结果，为 None 时重新计算
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report or self.to_dict(), f, ensure_ascii=False, indent=2)
+
+
+def load_evaluator(db_path: str, created_after: str, config: BoxEvalConfig) -> BoxEvaluator:
+    """
+    读取标注并创建评估器
+
+    Args:
+        db_path (str): 数据库路径
+        created_after (str): laptops.created_at 下限
+        config (BoxEvalConfig): 评估参数
+
+    Returns:
+        BoxEvaluator: 评估器
+
+    Raises:
+        sqlite3.Error: 数据库无法打开或缺少 annotations / images 表
+    """
+    annotations = AnnotationIndex.load(db_path, created_after, config.bbox_format)
+    logging.getLogger(__name__).info(
+        f"已读取人工标注框: {annotations.box_count} 个，{len(annotations)} 台笔记本"
+        + (f"，{annotations.invalid} 个 bbox 无法解析" if annotations.invalid else ""))
+    return BoxEvaluator(annotations, config)
@@ -0,0 +1,262 @@
+"""  python 模組文件名 : box_matching.py
+
+box_matching.py 将一次推理结果中所有区域的 scores / boxes 展平为 NumPy 数组，
+以向量化方式查找与目标分数匹配的瑕疵框，并提供 top-k、最大面积框和按 box_size_thr 过滤
+
+match_records 把一台笔记本全部推理记录的 scores 一次展平，用一次数组比较为每条记录找到匹配位置；
+分数总数少于 VECTORIZE_MIN_SCORES 时 NumPy 的固定开销大于收益，改为逐个比较（结果相同）
+
+numpy 为可选依赖，未安装时 HAS_NUMPY 为 False，由调用方回退到纯 Python 实现；只有真正使用时才导入
+
+"""
+
+import importlib.util
+from itertools import chain
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from schema import Labels
+
+# numpy 导入较慢，只检测是否安装，第一次构造 LabelArrays 时再导入
+HAS_NUMPY = importlib.util.find_spec("numpy") is not None
+np = None
+
+
+def _import_numpy():
+    """
+    导入 numpy 并设置模块级的 np
+    """
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+    return np
+
+# 分数匹配的容差，与 find_matching_box_info 的纯 Python 实现一致
+SCORE_TOLERANCE = 1e-6
+
+# 一台笔记本全部推理记录的分数总数少于该值时逐个比较（见 benchmarks/bench_parse.py --match）
+VECTORIZE_MIN_SCORES = 1024
+
+BoxInfo = Tuple[str, List[float], float]
+
+# 匹配位置：(区域名称, 区域内序号)
+BoxPosition = Tuple[str, int]
+
+
+def match_position(labels: Dict[str, Labels], target_score: float) -> Optional[BoxPosition]:
+    """
+    逐区域、逐分数查找第一个与目标分数匹配的位置（纯 Python）
+
+    Args:
+        labels (Dict[str, Labels]): 标签数据
+        target_score (float): 目标分数
+
+    Returns:
+        Optional[BoxPosition]: (区域名称, 区域内序号)，未找到返回 None
+    """
+    for area_name, label_data in labels.items():
+        for i, score in enumerate(label_data.scores):
+            if abs(score - target_score) < SCORE_TOLERANCE:
+                return area_name, i
+    return None
+
+
+def match_records(label_sets: Sequence[Dict[str, Labels]], target_scores: Sequence[float],
+                  min_scores: int = VECTORIZE_MIN_SCORES) -> List[Optional[BoxPosition]]:
+    """
+    为一台笔记本的每条推理记录查找第一个与其目标分数匹配的位置，结果与逐条调用 match_position 相同
+
+    全部记录的 scores 展平为一个数组、目标分数按记录长度重复后一次比较，再按记录边界取每条记录的第一个匹配
+
+    Args:
+        label_sets (Sequence[Dict[str, Labels]]): 各推理记录的 labels
+        target_scores (Sequence[float]): 各推理记录的 results.score
+        min_scores (int): 分数总数少于该值（或未安装 numpy）时逐个比较
+
+    Returns:
+        List[Optional[BoxPosition]]: 与 label_sets 对齐的 (区域名称, 区域内序号)，未找到为 None
+    """
+    if not HAS_NUMPY:
+        return [match_position(labels, target) for labels, target in zip(label_sets, target_scores)]
+    # list += 在 C 层复制，比逐个元素的生成器快得多
+    flat_scores: List[float] = []
+    counts: List[int] = []
+    for labels in label_sets:
+        start = len(flat_scores)
+        for label_data in labels.values():
+            flat_scores += label_data.scores
+        counts.append(len(flat_scores) - start)
+    if len(flat_scores) < min_scores:
+        return [match_position(labels, target) for labels, target in zip(label_sets, target_scores)]
+    _import_numpy()
+    # 每个 NumPy 调用都有微秒级的固定开销，这里只做一次比较；匹配数通常与记录数相当，按记录边界归属用 Python 完成
+    targets = np.repeat(np.asarray(target_scores, dtype=np.float64), counts)
+    scores = np.fromiter(flat_scores, dtype=np.float64, count=len(flat_scores))
+    hits = np.flatnonzero(np.abs(scores - targets) < SCORE_TOLERANCE).tolist()
+    positions: List[Optional[BoxPosition]] = [None] * len(label_sets)
+    record, start, end = 0, 0, counts[0] if counts else 0
+    for flat in hits:
+        if flat < end and positions[record] is not None:
+            continue
+        while flat >= end:
+            record += 1
+            start, end = end, end + counts[record]
+        local = flat - start
+        for area_name, label_data in label_sets[record].items():
+            if local < len(label_data.scores):
+                positions[record] = (area_name, local)
+                break
+            local -= len(label_data.scores)
+    return positions
+
+
+class LabelArrays:
+    """
+    一次推理结果中所有区域的展平数组
+
+    scores 按 labels 的区域顺序、区域内的框顺序展平，匹配时取第一个满足条件的位置，
+    因此结果与逐个区域、逐个分数的循环完全一致。返回的 boxes / score 是 labels 中的原始对象。
+    """
+
+    def __init__(self, labels: Dict[str, Labels]):
+        """
+        展平 labels
+
+        Args:
+            labels (Dict[str, Labels]): 标签数据
+        """
+        if not HAS_NUMPY:
+            raise ImportError("LabelArrays 需要安装 numpy")
+        _import_numpy()
+        self.area_names = list(labels.keys())
+        self._labels = list(labels.values())
+        counts = [len(label_data.scores) for label_data in self._labels]
+        total = sum(counts)
+        self.scores = np.fromiter(chain.from_iterable(label_data.scores for label_data in self._labels),
+                                  dtype=np.float64, count=total)
+        # 每个展平位置所属的区域序号，以及在区域内的序号
+        self.area_index = np.repeat(np.arange(len(counts), dtype=np.int32), counts)
+        offsets = np.concatenate(([0], np.cumsum(counts)[:-1])) if counts else np.zeros(0, dtype=np.int64)
+        self.local_index = np.arange(total) - np.repeat(offsets, counts)
+        self._boxes: Optional["np.ndarray"] = None
+
+    @property
+    def boxes(self) -> "np.ndarray":
+        """
+        与 scores 对齐的 (N, 4) 框坐标数组 [x1, y1, x2, y2]，缺失或格式不符的框为 NaN（按需构建）
+        """
+        if self._boxes is None:
+            total = len(self.scores)
+            if all(len(label_data.boxes) == len(label_data.scores) and all(len(box) == 4 for box in label_data.boxes)
+                   for label_data in self._labels):
+                # 常见情况：一次 fromiter 构建
+                coords = chain.from_iterable(chain.from_iterable(label_data.boxes for label_data in self._labels))
+                self._boxes = np.fromiter(coords, dtype=np.float64, count=total * 4).reshape(total, 4)
+            else:
+                # 个别区域的 boxes 缺失或格式不符：只有这些区域逐个填充，其余区域整段赋值
+                boxes = np.full((total, 4), np.nan, dtype=np.float64)
+                start = 0
+                for label_data in self._labels:
+                    count = len(label_data.scores)
+                    area_boxes = label_data.boxes
+                    if len(area_boxes) >= count and all(len(box) == 4 for box in area_boxes[:count]):
+                        if count:
+                            boxes[start:start + count] = area_boxes[:count]
+                    else:
+                        for local, box in enumerate(area_boxes[:count]):
+                            if len(box) == 4:
+                                boxes[start + local] = box
+                    start += count
+                self._boxes = boxes
+        return self._boxes
+
+    @property
+    def box_areas(self) -> "np.ndarray":
+        """
+        每个框的面积 (x2 - x1) * (y2 - y1)，负宽高按 0 计
+        """
+        boxes = self.boxes
+        widths = np.clip(boxes[:, 2] - boxes[:, 0], 0, None)
+        heights = np.clip(boxes[:, 3] - boxes[:, 1], 0, None)
+        return widths * heights
+
+    def box_info(self, flat: int) -> BoxInfo:
+        """
+        返回展平位置对应的 (area_name, boxes, score)
+
+        Args:
+            flat (int): 展平位置
+
+        Returns:
+            BoxInfo: (area_name, boxes, score)
+
+        Raises:
+            IndexError: 该区域的 boxes 比 scores 短，与纯 Python 实现的行为一致
+        """
+        area = int(self.area_index[flat])
+        local = int(self.local_index[flat])
+        label_data = self._labels[area]
+        return self.area_names[area], label_data.boxes[local], label_data.scores[local]
+
+    def match(self, target_score: float) -> Optional[BoxInfo]:
+        """
+        查找第一个与目标分数匹配的框
+
+        Args:
+            target_score (float): 目标分数
+
+        Returns:
+            Optional[BoxInfo]: (area_name, boxes, score)，未找到返回 None
+        """
+        hits = np.flatnonzero(np.abs(self.scores - target_score) < SCORE_TOLERANCE)
+        if hits.size == 0:
+            return None
+        return self.box_info(int(hits[0]))
+
+    def size_mask(self, box_size_thr: float) -> "np.ndarray":
+        """
+        面积不小于 box_size_thr 的框
+
+        Args:
+            box_size_thr (float): 面积阈值
+
+        Returns:
+            np.ndarray: 布尔数组
+        """
+        return self.box_areas >= box_size_thr
+
+    def top_k(self, k: int, box_size_thr: Optional[float] = None) -> List[BoxInfo]:
+        """
+        分数最高的 k 个框（分数相同时按展平顺序）
+
+        Args:
+            k (int): 数量
+            box_size_thr (Optional[float]): 设置后只考虑面积不小于该值的框
+
+        Returns:
+            List[BoxInfo]: 按分数从高到低排列的 (area_name, boxes, score)
+        """
+        candidates = np.arange(len(self.scores))
+        if box_size_thr is not None:
+            candidates = candidates[self.size_mask(box_size_thr)]
+        order = candidates[np.argsort(-self.scores[candidates], kind='stable')][:k]
+        return [self.box_info(int(flat)) for flat in order]
+
+    def max_area_box(self, box_size_thr: Optional[float] = None) -> Optional[BoxInfo]:
+        """
+        面积最大的框
+
+        Args:
+            box_size_thr (Optional[float]): 设置后只考虑面积不小于该值的框
+
+        Returns:
+            Optional[BoxInfo]: (area_name, boxes, score)，没有有效框时返回 None
+        """
+        areas = self.box_areas
+        valid = ~np.isnan(areas)
+        if box_size_thr is not None:
+            valid &= areas >= box_size_thr
+        if not valid.any():
+            return None
+        flat = int(np.argmax(np.where(valid, areas, -np.inf)))
+        return self.box_info(flat)
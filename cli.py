@@ -0,0 +1,289 @@
+"""  python 模組文件名 : cli.py
+
+cli.py 是 laptop-infers 命令行入口（在 pyproject.toml 中注册为 laptop-infers），
+输入目录、数据库路径、输出格式、并行数量、增量清单、日期下限和日志模式都通过参数指定，不需要修改源码
+
+处理模块（pydantic、numpy、pyarrow 等）在参数解析完成后才导入，--help 和参数错误可以立即返回
+
+用法:
+    laptop-infers /mnt/line1 --db /data/test_03.db --output /data/out/line1.csv
+    laptop-infers /mnt/archive --roots line1 line2 --format csv parquet --workers 8 --quiet
+    laptop-infers /mnt/archive --manifest scan.sqlite --created-after 2025-03-20 --shard 0/4
+    laptop-infers /mnt/line1 --watch --settle 10 --quiet
+    laptop-infers --source db --db /data/test_03.db --created-after 2025-03-20
+
+"""
+
+import argparse
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+DEFAULT_OUTPUT_NAME = "laptop_infers_results.csv"
+DEFAULT_DB_NAME = "test_03.db"
+
+# --format 的可选值，jsonl 对应 output_formats 中的 json 加 json_format="jsonl"
+FORMAT_CHOICES = ("csv", "json", "jsonl", "parquet", "arrow", "sqlite")
+
+
+def _date(text: str) -> str:
+    """
+    校验 --created-after 参数（YYYY-MM-DD 或 YYYY-MM-DD HH:MM:SS），原样返回用于 SQL 比较
+    """
+    try:
+        datetime.fromisoformat(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"无效的日期: {text}，格式应为 YYYY-MM-DD") from None
+    return text
+
+
+def _positive_int(text: str) -> int:
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"必须为正整数: {text}")
+    return value
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    创建命令行参数解析器
+
+    Returns:
+        argparse.ArgumentParser: 参数解析器
+    """
+    parser = argparse.ArgumentParser(
+        prog="laptop-infers",
+        description="处理目录树中的 laptop_infers.json，补充数据库中的预测结果并输出 CSV/JSON/列式文件")
+
+    source = parser.add_argument_group("输入")
+    source.add_argument("input_folder", nargs="?", type=Path, default=None,
+                        help="要搜索的主文件夹（默认为当前目录）")
+    source.add_argument("--roots", nargs="+", default=[], metavar="SUBDIR",
+                        help="只处理输入目录下的这些子目录（相对路径或绝对路径）")
+    source.add_argument("--max-depth", type=int, help="最大遍历深度，输入目录本身为 0")
+    source.add_argument("--include", nargs="+", default=[], metavar="PATTERN",
+                        help="只处理相对路径匹配任一通配符的文件夹")
+    source.add_argument("--exclude", nargs="+", default=[], metavar="PATTERN",
+                        help="跳过目录名或相对路径匹配任一通配符的目录")
+    source.add_argument("--image-dir-threshold", type=int, metavar="N",
+                        help="目录中前 N 个条目全部是图片且没有 laptop_infers.json 时不再列举该目录")
+    source.add_argument("--discovery-workers", type=_positive_int, default=1,
+                        help="并行遍历顶层子目录的线程数")
+    source.add_argument("--archives", action="store_true",
+                        help="把 .zip / .tar / .tar.gz 压缩包当作目录读取（不解压到磁盘）")
+
+    database = parser.add_argument_group("数据库")
+    database.add_argument("--db", dest="db_path", type=Path, help=f"数据库路径（默认为当前目录下的 {DEFAULT_DB_NAME}）")
+    database.add_argument("--created-after", type=_date, help="只使用该日期之后创建的笔记本记录（默认 2025-01-01）")
+    database.add_argument("--db-lookup", choices=["batch", "index"], default="batch",
+                          help="batch: 每批一次 IN (...) 查询；index: 一次性建立内存索引")
+    database.add_argument("--gt-snapshot", type=Path, help="index 模式的索引快照文件")
+    database.add_argument("--source", choices=["folders", "db"], default="folders",
+                          help="folders: 遍历输入目录中的 laptop_infers.json；db: 从数据库 inference_events 读取推理结果")
+    database.add_argument("--db-fetch-size", type=_positive_int, default=10000,
+                          help="db 输入模式下每次 fetchmany 读取的行数")
+    database.add_argument("--db-immutable", action="store_true",
+                          help="以 immutable=1 打开数据库（不加锁），只用于处理期间不会被写入的静态副本；监视模式下忽略")
+
+    output = parser.add_argument_group("输出")
+    output.add_argument("-o", "--output", type=Path,
+                        help=f"输出CSV路径，其他格式与其同名（默认为当前目录下的 {DEFAULT_OUTPUT_NAME}）")
+    output.add_argument("--format", dest="formats", nargs="+", choices=FORMAT_CHOICES, default=["csv", "json"],
+                        help="输出格式，可组合多个（json 与 jsonl 只能选一个）")
+    output.add_argument("--metrics", type=Path, help="指标 JSON 报告路径（默认与输出CSV同名的 .metrics.json）")
+    output.add_argument("--log-signals", action="store_true",
+                        help="扫描 inference_ 日志时同时统计各区域推理耗时、日志级别与异常类型，写入指标报告")
+    output.add_argument("--analytics", action="store_true",
+                        help="统计各区域/模型/日期的瑕疵率、分数分布、mask_miss 与 db_pred/db_gt 混淆矩阵")
+    output.add_argument("--analytics-path", type=Path, help="瑕疵统计报告路径（默认与输出CSV同名的 .analytics.json）")
+    output.add_argument("--sweep", action="store_true",
+                        help="对 score_thr × box_size_thr 网格做阈值扫描，按 db_gt 输出 precision/recall/ROC 点（需要 numpy）")
+    output.add_argument("--sweep-scores", metavar="THRESHOLDS",
+                        help="score_thr 取值，逗号分隔或 start:stop:step（默认 0:1:0.05）")
+    output.add_argument("--sweep-box-sizes", metavar="THRESHOLDS",
+                        help="box_size_thr 取值，逗号分隔或 start:stop:step（默认 0,250,500,1000,2000,4000,8000）")
+    output.add_argument("--sweep-path", type=Path, help="阈值扫描结果 CSV 路径（默认与输出CSV同名的 .sweep.csv）")
+    output.add_argument("--box-eval", action="store_true",
+                        help="将每个框与数据库 annotations 中的人工标注框做 IoU 匹配，统计 TP/FP/FN 与各区域 AP/mAP（需要 numpy）")
+    output.add_argument("--iou-threshold", type=float, default=0.5, help="框级评估的 IoU 阈值")
+    output.add_argument("--bbox-format", choices=["xywh", "xyxy"], default="xywh",
+                        help="annotations.bbox 的坐标格式：xywh 为左上角与宽高，xyxy 为两个角点")
+    output.add_argument("--box-eval-min-score", type=float, default=0.0, metavar="SCORE",
+                        help="分数低于该值的预测框不参与框级评估")
+    output.add_argument("--box-eval-path", type=Path, help="框级评估报告路径（默认与输出CSV同名的 .box_eval.json）")
+
+    execution = parser.add_argument_group("执行")
+    execution.add_argument("-w", "--workers", type=_positive_int, default=1, help="并行工作单元数量")
+    execution.add_argument("--worker-mode", choices=["thread", "process"], default="thread",
+                           help="thread: 线程池读取与解析；process: 进程池完成 JSON 解码与验证")
+    execution.add_argument("--execution", choices=["batch", "pipeline"], default="batch",
+                           help="batch: 按批依次处理；pipeline: 由有界队列连接的并发阶段")
+    execution.add_argument("--batch-size", type=_positive_int, default=500, help="每批处理的文件夹数量")
+    execution.add_argument("--queue-size", type=_positive_int, default=256, help="pipeline 模式下每个队列的容量")
+    execution.add_argument("--parse-mode", choices=["standard", "fast"], default="standard")
+    execution.add_argument("--match-mode", choices=["python", "vectorized"], default="python")
+    execution.add_argument("--manifest", type=Path, help="扫描清单路径，设置后启用增量处理")
+    execution.add_argument("--shard", metavar="INDEX/COUNT", help="只处理第 INDEX 个分片，例如 0/4")
+    execution.add_argument("--shard-name", help="输出文件中的分片名称（默认 INDEX-of-COUNT）")
+
+    watch = parser.add_argument_group("监视模式")
+    watch.add_argument("--watch", action="store_true",
+                       help="常驻运行，处理新出现的文件夹并追加到 CSV/JSON 输出（Ctrl+C 停止）")
+    watch.add_argument("--watch-mode", choices=["auto", "inotify", "poll"], default="auto",
+                       help="auto: 优先使用 inotify，不可用时轮询")
+    watch.add_argument("--poll-interval", type=float, default=10.0, metavar="SECONDS", help="轮询间隔（秒）")
+    watch.add_argument("--settle", type=float, default=5.0, metavar="SECONDS",
+                       help="文件夹内容保持不变多少秒后才处理")
+    watch.add_argument("--incomplete-grace", type=float, default=60.0, metavar="SECONDS",
+                       help="已有 laptop_infers.json 但缺少 qc_result_* / inference_* 的文件夹最多再等待多少秒")
+    watch.add_argument("--watch-existing", action="store_true", help="启动时先完整处理一次已有的文件夹")
+    watch.add_argument("--idle-timeout", type=float, metavar="SECONDS", help="连续多少秒没有新文件夹时退出")
+
+    logging_group = parser.add_argument_group("日志")
+    logging_group.add_argument("-q", "--quiet", action="store_true",
+                               help="异步写日志，逐文件日志降为 DEBUG，改为定期输出进度")
+    logging_group.add_argument("--progress-interval", type=float, metavar="SECONDS", help="进度输出间隔（秒）")
+    return parser
+
+
+def output_options(formats: Sequence[str]) -> tuple:
+    """
+    将 --format 转换为 LaptopInfersProcessor 的 output_formats 与 json_format
+
+    Args:
+        formats (Sequence[str]): --format 参数
+
+    Returns:
+        tuple: (output_formats, json_format)
+
+    Raises:
+        ValueError: 同时指定了 json 和 jsonl
+    """
+    formats = list(dict.fromkeys(formats))
+    if "json" in formats and "jsonl" in formats:
+        raise ValueError("--format 中 json 与 jsonl 只能选一个")
+    json_format = "jsonl" if "jsonl" in formats else "json"
+    output_formats: List[str] = ["json" if fmt == "jsonl" else fmt for fmt in formats]
+    return output_formats, json_format
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    命令行入口
+
+    Args:
+        argv (Optional[Sequence[str]]): 命令行参数，为 None 时使用 sys.argv
+
+    Returns:
+        int: 退出码，0 表示成功
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        output_formats, json_format = output_options(args.formats)
+    except ValueError as e:
+        parser.error(str(e))
+
+    cwd = Path.cwd()
+    input_folder = args.input_folder or cwd
+    if not input_folder.is_dir():
+        parser.error(f"输入目录不存在: {input_folder}")
+    if args.source == "db" and (args.watch or args.shard or args.roots):
+        parser.error("--source db 不能与 --watch、--shard、--roots 同时使用")
+
+    # 处理模块较重，参数检查通过后再导入
+    from box_eval import BoxEvalConfig
+    from discovery import DiscoveryOptions
+    from process_laptop_infers import DB_CREATED_AT_CUTOFF, LaptopInfersProcessor
+    from sharding import ShardSpec
+    from threshold_sweep import SweepGrid, parse_thresholds
+    from watch import WatchOptions
+
+    shard = None
+    try:
+        if args.shard:
+            shard = ShardSpec.parse(args.shard, args.roots, args.shard_name)
+        elif args.roots:
+            shard = ShardSpec(roots=tuple(args.roots), name=args.shard_name)
+    except ValueError as e:
+        parser.error(str(e))
+
+    sweep = None
+    if args.sweep or args.sweep_scores or args.sweep_box_sizes or args.sweep_path:
+        try:
+            grid_options = {}
+            if args.sweep_scores:
+                grid_options["score_thresholds"] = parse_thresholds(args.sweep_scores)
+            if args.sweep_box_sizes:
+                grid_options["box_size_thresholds"] = parse_thresholds(args.sweep_box_sizes)
+            sweep = SweepGrid(**grid_options)
+        except ValueError as e:
+            parser.error(str(e))
+
+    box_eval = None
+    if args.box_eval or args.box_eval_path:
+        try:
+            box_eval = BoxEvalConfig(iou_threshold=args.iou_threshold, bbox_format=args.bbox_format,
+                                     score_threshold=args.box_eval_min_score)
+        except ValueError as e:
+            parser.error(str(e))
+
+    watch = None
+    if args.watch:
+        try:
+            watch = WatchOptions(mode=args.watch_mode, poll_interval=args.poll_interval,
+                                 settle_seconds=args.settle, process_existing=args.watch_existing,
+                                 idle_timeout=args.idle_timeout, incomplete_grace=args.incomplete_grace)
+        except ValueError as e:
+            parser.error(str(e))
+
+    discovery = DiscoveryOptions(max_depth=args.max_depth, include=args.include, exclude=args.exclude,
+                                 image_dir_threshold=args.image_dir_threshold, workers=args.discovery_workers,
+                                 archives=args.archives)
+    try:
+        processor = LaptopInfersProcessor(
+            input_folder=str(input_folder),
+            output_csv=str(args.output or cwd / DEFAULT_OUTPUT_NAME),
+            db_path=str(args.db_path or cwd / DEFAULT_DB_NAME),
+            batch_size=args.batch_size,
+            created_after=args.created_after or DB_CREATED_AT_CUTOFF,
+            workers=args.workers,
+            worker_mode=args.worker_mode,
+            json_format=json_format,
+            manifest_path=str(args.manifest) if args.manifest else None,
+            discovery=discovery,
+            parse_mode=args.parse_mode,
+            match_mode=args.match_mode,
+            output_formats=output_formats,
+            metrics_path=str(args.metrics) if args.metrics else None,
+            log_mode="quiet" if args.quiet else "verbose",
+            progress_interval=args.progress_interval,
+            db_lookup=args.db_lookup,
+            gt_snapshot_path=str(args.gt_snapshot) if args.gt_snapshot else None,
+            execution=args.execution,
+            queue_size=args.queue_size,
+            shard=shard,
+            analytics=args.analytics or args.analytics_path is not None,
+            analytics_path=str(args.analytics_path) if args.analytics_path else None,
+            sweep=sweep,
+            sweep_path=str(args.sweep_path) if args.sweep_path else None,
+            box_eval=box_eval,
+            box_eval_path=str(args.box_eval_path) if args.box_eval_path else None,
+            source=args.source,
+            db_fetch_size=args.db_fetch_size,
+            log_signals=args.log_signals,
+            db_immutable=args.db_immutable,
+        )
+        if watch is not None:
+            processor.watch(watch)
+        else:
+            processor.process()
+    except Exception as e:
+        print(f"程序执行时发生错误: {str(e)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
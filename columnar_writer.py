@@ -0,0 +1,178 @@
+"""  python 模組文件名 : columnar_writer.py
+
+columnar_writer.py 将结果行按行组流式写入带类型的列式文件（Parquet 或 Arrow IPC），
+boxes / mask_miss 保留为列表列，area_name 等重复值使用字典编码
+
+pyarrow 为可选依赖，未安装时 HAS_PYARROW 为 False；只有真正写入或读取列式文件时才导入
+
+"""
+
+import importlib.util
+import logging
+import os
+from pathlib import Path
+from typing import Iterable, List
+
+# pyarrow 导入较慢，只检测是否安装，实际使用时再导入
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+from result_row import OUTPUT_FIELDS, ResultRow
+from result_writer import PARTIAL_SUFFIX
+
+COLUMNAR_FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+# 每个行组（record batch）的行数
+ROW_GROUP_SIZE = 65536
+
+
+def result_schema() -> "pa.Schema":
+    """
+    结果行的列式 schema
+
+    Returns:
+        pa.Schema: 列类型定义
+    """
+    import pyarrow as pa
+
+    categorical = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ('laptop_key', pa.string()),
+        ('defect', pa.bool_()),
+        ('score', pa.float64()),
+        ('area_name', categorical),
+        ('boxes', pa.list_(pa.float64())),
+        ('matched_score', pa.float64()),
+        ('timestamp', pa.string()),
+        ('qc_result_file', categorical),
+        ('mask_miss', pa.list_(pa.string())),
+        ('laptop_name', pa.string()),
+        # 数据库字段可能是 no-db / no-sn / error 哨兵值，保留为字符串
+        ('db_pred', categorical),
+        ('db_pred_score', pa.string()),
+        ('db_gt', categorical),
+    ])
+
+
+class ColumnarResultWriter:
+    """
+    列式结果输出器
+
+    结果行在内存中最多缓存 row_group_size 行，满后作为一个行组写入 `<文件名>.part`，
+    close() 时原子重命名为正式文件。
+    """
+
+    def __init__(self, output_csv: Path, columnar_format: str = "parquet",
+                 row_group_size: int = ROW_GROUP_SIZE):
+        """
+        初始化输出器
+
+        Args:
+            output_csv (Path): 输出CSV文件的路径，列式文件与其同名
+            columnar_format (str): "parquet" 或 "arrow"（Arrow IPC 文件，加载最快）
+            row_group_size (int): 每个行组的行数
+        """
+        if not HAS_PYARROW:
+            raise ImportError("列式输出需要安装 pyarrow")
+        if columnar_format not in COLUMNAR_FORMATS:
+            raise ValueError(f"不支持的列式格式: {columnar_format}")
+        self.columnar_format = columnar_format
+        self.output_file = Path(output_csv).with_suffix(COLUMNAR_FORMATS[columnar_format])
+        self.row_group_size = row_group_size
+        self.schema = result_schema()
+        self.rows_written = 0
+        self.logger = logging.getLogger(__name__)
+        self._pending: List[ResultRow] = []
+        self._writer = None
+
+    @property
+    def partial_file(self) -> Path:
+        return self.output_file.with_name(self.output_file.name + PARTIAL_SUFFIX)
+
+    def _open(self):
+        import pyarrow as pa
+        import pyarrow.ipc
+        import pyarrow.parquet as pq
+
+        if self.columnar_format == "parquet":
+            self._writer = pq.ParquetWriter(self.partial_file, self.schema, compression='zstd')
+        else:
+            self._writer = pa.ipc.new_file(str(self.partial_file), self.schema)
+
+    def _flush_pending(self):
+        """
+        将缓存的结果行作为一个行组写入
+        """
+        if not self._pending:
+            return
+        import pyarrow as pa
+
+        if self._writer is None:
+            self._open()
+        # 按列转置，schema 的列名与 ResultRow 的输出字段名相同（zip 在输出字段结束处截止）
+        columns = {name: list(values) for name, values in zip(OUTPUT_FIELDS, zip(*self._pending))}
+        self._writer.write_batch(pa.RecordBatch.from_pydict(columns, schema=self.schema))
+        self.rows_written += len(self._pending)
+        self._pending = []
+
+    def write_rows(self, rows: Iterable[ResultRow]):
+        """
+        追加结果行，缓存满一个行组时写入
+
+        Args:
+            rows (Iterable[ResultRow]): 结果行
+        """
+        for row in rows:
+            self._pending.append(row)
+            if len(self._pending) >= self.row_group_size:
+                self._flush_pending()
+
+    def close(self) -> bool:
+        """
+        写入剩余结果并原子重命名为正式文件
+
+        Returns:
+            bool: 是否生成了输出文件
+        """
+        self._flush_pending()
+        if self._writer is None:
+            return False
+        self._writer.close()
+        self._writer = None
+        os.replace(self.partial_file, self.output_file)
+        self.logger.info(f"成功将数据写入 {self.output_file}")
+        return True
+
+    def abort(self):
+        """
+        中止写入：已写入的行组保留在 .part 文件中（Parquet 需要 close 后才可读取）
+        """
+        if self._writer is not None:
+            try:
+                self._writer.close()
+            except Exception as e:
+                self.logger.error(f"关闭列式文件时发生错误: {str(e)}")
+            self._writer = None
+        self._pending = []
+
+
+def read_columnar(path: Path) -> "pa.Table":
+    """
+    读取列式结果文件
+
+    Args:
+        path (Path): .parquet 或 .arrow 文件路径
+
+    Returns:
+        pa.Table: 结果表
+    """
+    if not HAS_PYARROW:
+        raise ImportError("读取列式文件需要安装 pyarrow")
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+
+    path = Path(path)
+    if path.suffix == COLUMNAR_FORMATS["arrow"]:
+        with pa.memory_map(str(path)) as source:
+            return pa.ipc.open_file(source).read_all()
+    return pq.read_table(path)
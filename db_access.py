@@ -0,0 +1,370 @@
+"""  python 模組文件名 : db_access.py
+
+db_access.py 是数据库的只读访问层：
+    - 以 URI 只读方式打开数据库（mode=ro，调用方明确保证文件不会被修改时使用 immutable=1 跳过加锁），
+      并设置 mmap_size / cache_size
+    - 检查查询所需的索引 laptops(laptop_name, created_at) 与 laptop_defect_predictions(laptop_id)，
+      数据库输入模式另需 inference_events(laptop_id, start_time) 与 laptop_defect_predictions(inference_event_id)
+    - 可在数据库副本中建立这些索引（不修改原数据库）
+    - 输出查询的 EXPLAIN QUERY PLAN，提前发现全表扫描
+
+用法:
+    python db_access.py test_03.db
+    python db_access.py test_03.db --build-indexes test_03_indexed.db
+
+"""
+
+import argparse
+import logging
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+# 只读连接的默认 PRAGMA：256 MB 内存映射，64 MB 页缓存（负数单位为 KB）
+DEFAULT_MMAP_SIZE = 256 * 1024 * 1024
+DEFAULT_CACHE_SIZE_KB = 64 * 1024
+
+# 查询所需的索引：(表名, 索引名, 列)
+REQUIRED_INDEXES: Tuple[Tuple[str, str, Tuple[str, ...]], ...] = (
+    ("laptops", "idx_laptops_laptop_name_created_at", ("laptop_name", "created_at")),
+    ("laptop_defect_predictions", "idx_laptop_defect_predictions_laptop_id", ("laptop_id",)),
+)
+
+# 数据库输入模式（db_source）的连接查询所需的索引
+EVENT_SOURCE_INDEXES: Tuple[Tuple[str, str, Tuple[str, ...]], ...] = (
+    ("inference_events", "idx_inference_events_laptop_id_start_time", ("laptop_id", "start_time")),
+    ("laptop_defect_predictions", "idx_laptop_defect_predictions_inference_event_id", ("inference_event_id",)),
+)
+
+
+# laptops LEFT JOIN laptop_defect_predictions 的全量查询（gt_index 与 analyze_gt 共用），按 created_at 升序返回
+GT_ROWS_QUERY = """
+SELECT
+    l.id AS laptop_id,
+    l.laptop_name,
+    p.pred,
+    p.pred_score,
+    p.gt,
+    l.created_at
+FROM
+    laptops l
+LEFT JOIN
+    laptop_defect_predictions p ON l.id = p.laptop_id
+WHERE
+    l.created_at >= ?
+ORDER BY
+    l.created_at
+"""
+
+# annotations 中的人工标注框（is_ground_truth = 1）及其所属笔记本与图片（box_eval 使用），
+# 按 created_at 升序返回，同一 laptop_name 以最新的笔记本记录为准
+GT_ANNOTATIONS_QUERY = """
+SELECT
+    l.laptop_name,
+    l.id AS laptop_id,
+    i.file_name,
+    a.bbox
+FROM
+    annotations a
+JOIN
+    images i ON a.image_id = i.id
+JOIN
+    laptops l ON i.laptop_id = l.id
+WHERE
+    a.is_ground_truth = 1 AND
+    l.created_at >= ?
+ORDER BY
+    l.created_at, l.id
+"""
+
+
+# 数据库输入模式（db_source）的全量连接查询：每个推理事件一行（附带该事件的预测结果），
+# 按笔记本记录、事件开始时间排序，同一笔记本的事件相邻
+INFERENCE_EVENTS_QUERY = """
+SELECT
+    l.id AS laptop_id,
+    l.laptop_name,
+    l.laptop_metadata,
+    e.id AS event_id,
+    e.start_time,
+    e.status,
+    e.api_version,
+    e.inference_parameters,
+    e.results,
+    p.pred,
+    p.pred_score,
+    p.gt
+FROM
+    laptops l
+JOIN
+    inference_events e ON e.laptop_id = l.id
+LEFT JOIN
+    laptop_defect_predictions p ON p.inference_event_id = e.id
+WHERE
+    l.created_at >= ?
+ORDER BY
+    l.id, e.start_time, e.id, p.id
+"""
+
+
+def latest_prediction_query(name_count: int) -> str:
+    """
+    批量查询的 SQL：每个 laptop_name 取 created_at >= ? 中最新的一条笔记本记录及其预测结果
+
+    Args:
+        name_count (int): IN (...) 中的 laptop_name 数量
+
+    Returns:
+        str: SQL，参数为 name_count 个 laptop_name 加 created_at 下限
+    """
+    placeholders = ", ".join("?" * name_count)
+    return f"""
+    SELECT laptop_name, pred, pred_score, gt
+    FROM (
+        SELECT
+            l.laptop_name,
+            p.pred,
+            p.pred_score,
+            p.gt,
+            ROW_NUMBER() OVER (
+                PARTITION BY l.laptop_name ORDER BY l.created_at DESC
+            ) AS rn
+        FROM
+            laptops l
+        LEFT JOIN
+            laptop_defect_predictions p ON l.id = p.laptop_id
+        WHERE
+            l.laptop_name IN ({placeholders}) AND
+            l.created_at >= ?
+    )
+    WHERE rn = 1
+    """
+
+
+def connect_readonly(db_path: str, immutable: bool = False,
+                     mmap_size: int = DEFAULT_MMAP_SIZE,
+                     cache_size_kb: int = DEFAULT_CACHE_SIZE_KB,
+                     check_same_thread: bool = True) -> sqlite3.Connection:
+    """
+    以只读 URI 方式打开数据库并设置读取相关的 PRAGMA
+
+    Args:
+        db_path (str): 数据库路径
+        immutable (bool): 是否使用 immutable=1（不加锁、不检查修改）。当前进程对文件没有写权限
+                          并不代表其他进程（如产线写入程序）不会修改它，只有调用方确认数据库是静态副本时才应设置
+        mmap_size (int): PRAGMA mmap_size（字节），0 表示不使用内存映射
+        cache_size_kb (int): 页缓存大小（KB）
+        check_same_thread (bool): 传给 sqlite3.connect
+
+    Returns:
+        sqlite3.Connection: 只读连接
+
+    Raises:
+        sqlite3.OperationalError: 数据库文件不存在或无法打开
+    """
+    uri = Path(db_path).resolve().as_uri() + "?mode=ro" + ("&immutable=1" if immutable else "")
+    conn = sqlite3.connect(uri, uri=True, check_same_thread=check_same_thread)
+    conn.execute(f"PRAGMA mmap_size = {int(mmap_size)}")
+    conn.execute(f"PRAGMA cache_size = {-int(cache_size_kb)}")
+    conn.execute("PRAGMA query_only = 1")
+    return conn
+
+
+@dataclass(frozen=True)
+class IndexCheck:
+    """一个查询所需索引的检查结果"""
+    table: str
+    columns: Tuple[str, ...]
+    # 覆盖该列组合（作为前缀）的已有索引名称，没有时为 None
+    existing: Optional[str]
+
+    @property
+    def ok(self) -> bool:
+        return self.existing is not None
+
+
+def index_columns(conn: sqlite3.Connection, table: str) -> List[Tuple[str, Tuple[str, ...]]]:
+    """
+    列出表上的所有索引及其列
+
+    Args:
+        conn (sqlite3.Connection): 数据库连接
+        table (str): 表名
+
+    Returns:
+        List[Tuple[str, Tuple[str, ...]]]: (索引名, 列)
+    """
+    indexes = []
+    for row in conn.execute(f"PRAGMA index_list({table})").fetchall():
+        name = row[1]
+        columns = tuple(info[2] for info in conn.execute(f"PRAGMA index_info({name})").fetchall())
+        indexes.append((name, columns))
+    return indexes
+
+
+def table_exists(conn: sqlite3.Connection, table: str) -> bool:
+    """
+    数据库中是否存在该表
+    """
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)).fetchone() is not None
+
+
+def check_indexes(conn: sqlite3.Connection,
+                  required: Sequence[Tuple[str, str, Tuple[str, ...]]] = REQUIRED_INDEXES) -> List[IndexCheck]:
+    """
+    检查查询所需的索引是否存在（已有索引以所需列为前缀即可）
+
+    Args:
+        conn (sqlite3.Connection): 数据库连接
+        required: (表名, 建议的索引名, 列) 列表
+
+    Returns:
+        List[IndexCheck]: 检查结果
+    """
+    checks = []
+    for table, _, columns in required:
+        existing = next((name for name, index_cols in index_columns(conn, table)
+                         if index_cols[:len(columns)] == columns), None)
+        checks.append(IndexCheck(table, columns, existing))
+    return checks
+
+
+def build_indexes_copy(db_path: str, copy_path: str,
+                       required: Sequence[Tuple[str, str, Tuple[str, ...]]] = REQUIRED_INDEXES) -> List[str]:
+    """
+    将数据库复制到 copy_path，并在副本中建立缺少的索引（原数据库不做任何修改）
+
+    Args:
+        db_path (str): 原数据库路径
+        copy_path (str): 副本路径（已存在时会被覆盖）
+        required: (表名, 索引名, 列) 列表
+
+    Returns:
+        List[str]: 新建立的索引名称
+    """
+    if Path(copy_path).resolve() == Path(db_path).resolve():
+        raise ValueError("副本路径不能与原数据库相同")
+    Path(copy_path).unlink(missing_ok=True)
+    source = connect_readonly(db_path)
+    target = sqlite3.connect(copy_path)
+    try:
+        source.backup(target)
+        created = []
+        for check, (_, index_name, columns) in zip(check_indexes(target, required), required):
+            if check.ok:
+                continue
+            target.execute(f"CREATE INDEX {index_name} ON {check.table} ({', '.join(columns)})")
+            created.append(index_name)
+        target.execute("ANALYZE")
+        target.commit()
+        return created
+    finally:
+        target.close()
+        source.close()
+
+
+def explain_query_plan(conn: sqlite3.Connection, query: str, params: Sequence = ()) -> List[str]:
+    """
+    返回查询的 EXPLAIN QUERY PLAN
+
+    Args:
+        conn (sqlite3.Connection): 数据库连接
+        query (str): SQL
+        params (Sequence): 查询参数
+
+    Returns:
+        List[str]: 查询计划的每一步（按层级缩进）
+    """
+    depth = {0: 0}
+    lines = []
+    for node_id, parent, _, detail in conn.execute(f"EXPLAIN QUERY PLAN {query}", tuple(params)).fetchall():
+        depth[node_id] = depth.get(parent, 0) + 1
+        lines.append("  " * (depth[node_id] - 1) + detail)
+    return lines
+
+
+def full_scans(plan: Sequence[str]) -> List[str]:
+    """
+    查询计划中未使用索引的全表扫描步骤（不包括对子查询结果的扫描）
+    """
+    return [line.strip() for line in plan
+            if line.strip().startswith("SCAN ") and "USING" not in line and not line.strip().startswith("SCAN (")]
+
+
+def query_plan_report(conn: sqlite3.Connection, created_after: str = "2025-01-01",
+                      name_count: int = 500) -> List[str]:
+    """
+    生成索引检查与查询计划报告
+
+    Args:
+        conn (sqlite3.Connection): 数据库连接
+        created_after (str): created_at 下限
+        name_count (int): 批量查询中 laptop_name 的数量
+
+    Returns:
+        List[str]: 报告文本行
+    """
+    has_events = table_exists(conn, "inference_events")
+    lines = ["索引检查:"]
+    for check in check_indexes(conn, REQUIRED_INDEXES + (EVENT_SOURCE_INDEXES if has_events else ())):
+        status = f"已有索引 {check.existing}" if check.ok else "缺少索引"
+        lines.append(f"  {check.table}({', '.join(check.columns)}): {status}")
+
+    queries = [
+        ("批量查询 (get_db_info_batch)", latest_prediction_query(name_count),
+         [f"name{i}" for i in range(name_count)] + [created_after]),
+        ("内存索引查询 (gt_index)", GT_ROWS_QUERY, [created_after]),
+    ]
+    if has_events:
+        queries.append(("数据库输入连接查询 (db_source)", INFERENCE_EVENTS_QUERY, [created_after]))
+    for title, query, params in queries:
+        plan = explain_query_plan(conn, query, params)
+        lines.append(f"{title} 查询计划:")
+        lines.extend(f"  {line}" for line in plan)
+        for scan in full_scans(plan):
+            lines.append(f"  警告: 全表扫描 - {scan}")
+    return lines
+
+
+def warn_missing_indexes(conn: sqlite3.Connection, db_path: str,
+                         required: Sequence[Tuple[str, str, Tuple[str, ...]]] = REQUIRED_INDEXES):
+    """
+    缺少查询所需索引时输出一条警告
+    """
+    missing = [check for check in check_indexes(conn, required) if not check.ok]
+    if missing:
+        columns = ", ".join(f"{check.table}({', '.join(check.columns)})" for check in missing)
+        logging.getLogger(__name__).warning(
+            f"数据库 {db_path} 缺少索引 {columns}，大规模查询可能较慢；"
+            f"可运行 python db_access.py {db_path} --build-indexes <副本路径> 在副本中建立索引")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="数据库索引检查与查询计划报告")
+    parser.add_argument("db_path", help="数据库路径")
+    parser.add_argument("--created-after", default="2025-01-01", help="created_at 下限")
+    parser.add_argument("--build-indexes", metavar="COPY_PATH", help="复制数据库并在副本中建立缺少的索引")
+    args = parser.parse_args()
+
+    db_path = args.db_path
+    if args.build_indexes:
+        conn = connect_readonly(db_path)
+        try:
+            required = REQUIRED_INDEXES + (EVENT_SOURCE_INDEXES if table_exists(conn, "inference_events") else ())
+        finally:
+            conn.close()
+        created = build_indexes_copy(db_path, args.build_indexes, required)
+        print(f"已复制到 {args.build_indexes}，新建索引: {', '.join(created) if created else '无'}")
+        db_path = args.build_indexes
+
+    conn = connect_readonly(db_path)
+    try:
+        for line in query_plan_report(conn, args.created_after):
+            print(line)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""  python 模組文件名 : db_source.py
+
+db_source.py 以数据库作为输入（代替遍历文件夹）：inference_events 的 results / inference_parameters
+与 laptop_infers.json 中每条推理记录的 results / params 相同，一次 laptops JOIN inference_events
+LEFT JOIN laptop_defect_predictions 的连接查询（fetchmany 分批读取）即可得到推理结果和预测信息，
+不需要再按 laptop_name 查询数据库
+
+同一笔记本记录的事件在查询结果中相邻，按笔记本分组后拼接成与 laptop_infers.json 相同结构的 JSON，
+交给与文件夹输入相同的 schema.py 模型验证：
+
+    - laptop_key 取 laptops.laptop_metadata 中的 laptop_key，没有时为 laptop_name 加第一个事件的开始时间（YYYYMMDDHHMM）
+    - timestamp 由事件的 start_time 转换为 laptop_infers.json 的格式（2025-02-23_09-47-39）
+    - version 为 api_version，qc_result_file 取 laptop_metadata 中的 qc_result_file（没有时为空）
+    - 数据库中没有 inference_ 日志，mask_miss 固定为 ["no_log"]
+    - db_pred / db_pred_score / db_gt 取该笔记本最新一个有预测结果的事件，没有时与文件夹输入相同为 "None"
+
+"""
+
+import json
+import sqlite3
+from dataclasses import dataclass
+from typing import Any, Iterator, List, Optional, Tuple
+
+from db_access import INFERENCE_EVENTS_QUERY
+from result_row import intern_db_info
+
+# 每次 fetchmany 读取的事件行数
+DEFAULT_FETCH_SIZE = 10000
+
+# 数据库输入没有 inference_ 日志
+NO_LOG = ["no_log"]
+
+DbInfo = Tuple[str, str, str]
+
+
+@dataclass
+class EventLaptop:
+    """一条笔记本记录及其全部推理事件（尚未验证）"""
+    laptop_id: int
+    laptop_name: str
+    laptop_key: str
+    qc_result_file: str
+    # 与 laptop_infers.json 结构相同的 JSON
+    raw_json: bytes
+    db_info: DbInfo
+    events: int
+
+
+def event_timestamp(start_time: Optional[str]) -> str:
+    """
+    将事件的 start_time（2025-02-23 09:47:39）转换为 laptop_infers.json 的 timestamp 格式（2025-02-23_09-47-39）
+    """
+    if not start_time:
+        return ""
+    return str(start_time)[:19].replace("T", "_").replace(" ", "_").replace(":", "-")
+
+
+def laptop_key_for(laptop_id: int, laptop_name: str, metadata: Any, start_time: Optional[str]) -> Tuple[str, str]:
+    """
+    由笔记本记录得到 laptop_key 与 qc_result_file
+
+    Args:
+        laptop_id (int): laptops.id
+        laptop_name (str): laptops.laptop_name
+        metadata (Any): laptops.laptop_metadata（JSON 文本或 None）
+        start_time (Optional[str]): 第一个事件的开始时间
+
+    Returns:
+        Tuple[str, str]: (laptop_key, qc_result_file)
+    """
+    try:
+        metadata = json.loads(metadata) if metadata else {}
+    except ValueError:
+        metadata = {}
+    if not isinstance(metadata, dict):
+        metadata = {}
+    laptop_key = metadata.get("laptop_key")
+    if not laptop_key:
+        # 与文件夹名称相同的形式，extract_laptop_name 去掉最后一段后即为 laptop_name
+        digits = "".join(ch for ch in str(start_time or "") if ch.isdigit())[:12]
+        laptop_key = f"{laptop_name}_{digits or laptop_id}"
+    return str(laptop_key), str(metadata.get("qc_result_file") or "")
+
+
+def _json_text(value: Any) -> str:
+    """
+    JSON 列的原始文本，NULL 为 null
+    """
+    if value is None:
+        return "null"
+    if isinstance(value, bytes):
+        return value.decode("utf-8")
+    return str(value)
+
+
+def _build_laptop(rows: List[sqlite3.Row]) -> EventLaptop:
+    """
+    将同一笔记本记录的事件行拼接为 EventLaptop
+
+    Args:
+        rows (List[sqlite3.Row]): INFERENCE_EVENTS_QUERY 的结果行（同一 laptop_id，按事件时间排序）
+
+    Returns:
+        EventLaptop: 笔记本记录
+    """
+    first = rows[0]
+    laptop_key, qc_result_file = laptop_key_for(first["laptop_id"], first["laptop_name"],
+                                                first["laptop_metadata"], first["start_time"])
+    infers = []
+    prediction = None
+    last_event = None
+    for row in rows:
+        if row["pred"] is not None:
+            prediction = row
+        # 同一事件有多条预测记录时只保留一次推理记录
+        if row["event_id"] == last_event:
+            continue
+        last_event = row["event_id"]
+        # results / inference_parameters 原样拼接，由 schema 模型一次完成解码与验证
+        infers.append(
+            f'{{"timestamp":{json.dumps(event_timestamp(row["start_time"]))},'
+            f'"version":{json.dumps(row["api_version"])},"status":{json.dumps(row["status"])},'
+            f'"params":{_json_text(row["inference_parameters"])},"results":{_json_text(row["results"])}}}')
+    raw_json = f'{{"laptop_key":{json.dumps(laptop_key)},"laptop_infers":[{",".join(infers)}]}}'
+    source = prediction if prediction is not None else rows[-1]
+    db_info = intern_db_info((str(source["pred"]), str(source["pred_score"]), str(source["gt"])))
+    return EventLaptop(first["laptop_id"], first["laptop_name"], laptop_key, qc_result_file,
+                       raw_json.encode("utf-8"), db_info, len(infers))
+
+
+def iter_event_laptops(conn: sqlite3.Connection, created_after: str,
+                       fetch_size: int = DEFAULT_FETCH_SIZE) -> Iterator[EventLaptop]:
+    """
+    流式读取 created_at >= created_after 的笔记本记录及其推理事件，每条笔记本记录返回一次
+
+    Args:
+        conn (sqlite3.Connection): 数据库连接
+        created_after (str): created_at 下限
+        fetch_size (int): 每次 fetchmany 的行数
+
+    Yields:
+        EventLaptop: 笔记本记录，按 laptops.id 顺序
+    """
+    cursor = conn.cursor()
+    cursor.row_factory = sqlite3.Row
+    cursor.execute(INFERENCE_EVENTS_QUERY, (created_after,))
+    group: List[sqlite3.Row] = []
+    while True:
+        rows = cursor.fetchmany(fetch_size)
+        if not rows:
+            break
+        for row in rows:
+            if group and row["laptop_id"] != group[0]["laptop_id"]:
+                yield _build_laptop(group)
+                group = []
+            group.append(row)
+    if group:
+        yield _build_laptop(group)
@@ -0,0 +1,313 @@
+"""  python 模組文件名 : discovery.py
+
+discovery.py 基于 os.scandir 查找 laptop_infers.json 所在的文件夹，
+支持深度限制、包含/排除通配符、跳过图片目录以及顶层子目录并行遍历，并以生成器形式逐个返回结果
+
+启用 archives 时，.zip / .tar / .tar.gz 压缩包按虚拟目录遍历（见 archive_io.py），
+压缩包中的文件夹路径为 “压缩包路径/成员目录”
+
+"""
+
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+import archive_io
+
+LAPTOP_INFERS_FILE = "laptop_infers.json"
+QC_RESULT_PREFIX = "qc_result_"
+INFERENCE_PREFIX = "inference_"
+
+# 判断图片目录时使用的扩展名
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff')
+
+# 并行遍历时结果队列的容量，消费端处理较慢时遍历线程会等待
+_QUEUE_SIZE = 1024
+_DONE = object()
+
+FileTuple = Tuple[Path, str, str]
+
+
+@dataclass
+class DiscoveryOptions:
+    """
+    文件夹查找选项
+
+    Attributes:
+        max_depth (Optional[int]): 最大遍历深度，输入目录本身为 0，None 表示不限制
+        include (List[str]): 只返回相对路径匹配任一通配符的文件夹，为空时不过滤
+        exclude (List[str]): 目录名或相对路径匹配任一通配符时不进入该目录
+        descend_matched (bool): 找到 laptop_infers.json 的文件夹是否继续遍历其子目录
+        image_dir_threshold (Optional[int]): 目录中前 N 个条目全部是图片文件、且没有 laptop_infers.json 时
+                                             视为图片目录，停止列举且不进入其子目录，None 表示不启用
+        workers (int): 并行遍历顶层子目录的线程数，1 表示串行
+        archives (bool): 是否把 .zip / .tar / .tar.gz 压缩包当作目录遍历（不解压，只读取成员列表）
+    """
+    max_depth: Optional[int] = None
+    include: List[str] = field(default_factory=list)
+    exclude: List[str] = field(default_factory=list)
+    descend_matched: bool = True
+    image_dir_threshold: Optional[int] = None
+    workers: int = 1
+    archives: bool = False
+
+
+class _FolderScanner:
+    """单个目录树的 scandir 遍历器"""
+
+    def __init__(self, root: Path, options: DiscoveryOptions, errors: Optional[List[str]] = None):
+        self.root = root
+        self.options = options
+        # 无法列举的目录与无法读取的压缩包（遍历不完整）
+        self.errors: List[str] = errors if errors is not None else []
+        self.logger = logging.getLogger(__name__)
+
+    def _relative(self, path: str) -> str:
+        relative = os.path.relpath(path, self.root)
+        return "" if relative == "." else relative.replace(os.sep, "/")
+
+    def _excluded(self, name: str, relative: str) -> bool:
+        return any(fnmatch(name, pattern) or fnmatch(relative, pattern) for pattern in self.options.exclude)
+
+    def _included(self, relative: str) -> bool:
+        if not self.options.include:
+            return True
+        return any(fnmatch(relative, pattern) for pattern in self.options.include)
+
+    def _is_archive(self, path: str) -> bool:
+        return self.options.archives and archive_io.is_archive_name(path) and not os.path.isdir(path)
+
+    def scan_dir(self, path: str) -> Tuple[Optional[FileTuple], List[str]]:
+        """
+        列举单个目录，返回其中的文件元组（如有）和需要继续遍历的子目录（启用 archives 时包括压缩包）
+
+        Args:
+            path (str): 目录路径
+
+        Returns:
+            Tuple[Optional[FileTuple], List[str]]: (文件元组或 None, 子目录路径列表)
+        """
+        has_json = False
+        qc_result_file = ""
+        inference_file = ""
+        subdirs = []
+        threshold = self.options.image_dir_threshold
+        images_only = threshold is not None
+        try:
+            with os.scandir(path) as it:
+                for count, entry in enumerate(it, 1):
+                    name = entry.name
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                    except OSError:
+                        is_dir = False
+                    if is_dir or (self.options.archives and archive_io.is_archive_name(name)):
+                        images_only = False
+                        subdirs.append(entry.path)
+                        continue
+                    if name == LAPTOP_INFERS_FILE:
+                        has_json = True
+                    elif not qc_result_file and name.startswith(QC_RESULT_PREFIX):
+                        qc_result_file = name
+                    elif not inference_file and name.startswith(INFERENCE_PREFIX):
+                        inference_file = name
+                    if images_only:
+                        if not name.lower().endswith(IMAGE_EXTENSIONS):
+                            images_only = False
+                        elif count >= threshold:
+                            images_only = False
+                            # 检测图片与 laptop_infers.json 同在一个目录时继续列举（qc_result_ / inference_ 可能排在图片之后），
+                            # 只跳过没有 laptop_infers.json 的纯图片目录
+                            if not has_json and not os.path.exists(os.path.join(path, LAPTOP_INFERS_FILE)):
+                                self.logger.info(f"跳过图片目录: {path}")
+                                return None, []
+        except OSError as e:
+            self.logger.warning(f"无法列举目录 {path}: {str(e)}")
+            self.errors.append(path)
+            return None, []
+
+        file_tuple = None
+        if has_json and self._included(self._relative(path)):
+            file_tuple = (Path(path) / LAPTOP_INFERS_FILE, qc_result_file, inference_file)
+        if has_json and not self.options.descend_matched:
+            subdirs = []
+        return file_tuple, subdirs
+
+    def walk(self, path: str, depth: int) -> Iterator[FileTuple]:
+        """
+        自顶向下遍历目录树，顺序与 os.walk 一致
+
+        Args:
+            path (str): 起始目录
+            depth (int): 起始目录相对于输入目录的深度
+
+        Yields:
+            FileTuple: (laptop_infers.json 路径, qc_result 文件名, inference_ 文件名)
+        """
+        stack = [(path, depth)]
+        while stack:
+            current, current_depth = stack.pop()
+            if self._is_archive(current):
+                yield from self.walk_archive(current, current_depth)
+                continue
+            file_tuple, subdirs = self.scan_dir(current)
+            if file_tuple is not None:
+                yield file_tuple
+            if self.options.max_depth is not None and current_depth >= self.options.max_depth:
+                continue
+            children = [(subdir, current_depth + 1) for subdir in subdirs
+                        if not self._excluded(os.path.basename(subdir), self._relative(subdir))]
+            # 逆序入栈，保证按列举顺序遍历
+            stack.extend(reversed(children))
+
+    def walk_archive(self, path: str, depth: int) -> Iterator[FileTuple]:
+        """
+        按成员列表遍历压缩包中的文件夹，深度限制、排除/包含通配符与 descend_matched 的判断与普通目录相同
+
+        Args:
+            path (str): 压缩包路径
+            depth (int): 压缩包（视为目录）相对于输入目录的深度
+
+        Yields:
+            FileTuple: (laptop_infers.json 虚拟路径, qc_result 文件名, inference_ 文件名)，按压缩包中的顺序
+        """
+        try:
+            folders = archive_io.open_archive(Path(path)).folders()
+        except archive_io.ARCHIVE_ERRORS as e:
+            self.logger.warning(f"无法读取压缩包 {path}: {str(e)}")
+            self.errors.append(path)
+            return
+        matched = set()
+        for member_dir, qc_result_file, inference_file in folders:
+            parts = member_dir.split("/") if member_dir else []
+            if self.options.max_depth is not None and depth + len(parts) > self.options.max_depth:
+                continue
+            folder = path
+            ancestors = [""]
+            excluded = False
+            for i, part in enumerate(parts):
+                folder = os.path.join(folder, part)
+                if self._excluded(part, self._relative(folder)):
+                    excluded = True
+                    break
+                ancestors.append("/".join(parts[:i + 1]))
+            if excluded:
+                continue
+            # 不继续遍历已匹配文件夹时，跳过位于已匹配文件夹之下的文件夹
+            if not self.options.descend_matched and any(ancestor in matched for ancestor in ancestors[:-1]):
+                continue
+            matched.add(member_dir)
+            if self._included(self._relative(folder)):
+                yield Path(folder) / LAPTOP_INFERS_FILE, qc_result_file, inference_file
+
+
+def iter_json_files(root: Path, options: Optional[DiscoveryOptions] = None,
+                    errors: Optional[List[str]] = None) -> Iterator[FileTuple]:
+    """
+    查找 laptop_infers.json 文件及同目录下的 qc_result_ 和 inference_ 文件
+
+    串行模式下返回顺序与 os.walk 一致；并行模式下按顶层子目录并行遍历，
+    结果按完成顺序返回。
+
+    Args:
+        root (Path): 输入目录
+        options (Optional[DiscoveryOptions]): 查找选项
+        errors (Optional[List[str]]): 传入时追加无法列举的目录和无法读取的压缩包，为空表示遍历完整
+
+    Yields:
+        FileTuple: (laptop_infers.json 路径, qc_result 文件名, inference_ 文件名)
+    """
+    options = options or DiscoveryOptions()
+    scanner = _FolderScanner(Path(root), options, errors)
+    if options.workers <= 1:
+        yield from scanner.walk(str(root), 0)
+        return
+
+    # 输入目录本身在当前线程处理，顶层子目录交给线程池
+    file_tuple, subdirs = scanner.scan_dir(str(root))
+    if file_tuple is not None:
+        yield file_tuple
+    if options.max_depth is not None and options.max_depth < 1:
+        return
+    subdirs = [subdir for subdir in subdirs
+               if not scanner._excluded(os.path.basename(subdir), scanner._relative(subdir))]
+
+    results: "queue.Queue" = queue.Queue(maxsize=_QUEUE_SIZE)
+    stop = threading.Event()
+
+    def walk_subtree(subdir: str):
+        try:
+            for item in scanner.walk(subdir, 1):
+                if stop.is_set():
+                    return
+                results.put(item)
+        finally:
+            results.put(_DONE)
+
+    with ThreadPoolExecutor(max_workers=options.workers, thread_name_prefix="discovery") as pool:
+        for subdir in subdirs:
+            pool.submit(walk_subtree, subdir)
+        remaining = len(subdirs)
+        try:
+            while remaining:
+                item = results.get()
+                if item is _DONE:
+                    remaining -= 1
+                else:
+                    yield item
+        finally:
+            # 消费端提前结束时通知遍历线程退出，并清空队列避免线程阻塞
+            stop.set()
+            while remaining:
+                if results.get() is _DONE:
+                    remaining -= 1
+
+
+def scan_folder(folder: Path, root: Path, options: Optional[DiscoveryOptions] = None) -> Optional[FileTuple]:
+    """
+    检查单个文件夹（不遍历子目录），返回其中的文件元组，与遍历时的判断（include 通配符、图片目录）相同
+
+    Args:
+        folder (Path): 文件夹路径
+        root (Path): 输入目录（include 通配符按相对于它的路径匹配）
+        options (Optional[DiscoveryOptions]): 查找选项
+
+    Returns:
+        Optional[FileTuple]: (laptop_infers.json 路径, qc_result 文件名, inference_ 文件名)，没有 laptop_infers.json 时为 None
+    """
+    file_tuple, _ = _FolderScanner(Path(root), options or DiscoveryOptions()).scan_dir(str(folder))
+    return file_tuple
+
+
+def iter_dirs(root: Path, options: Optional[DiscoveryOptions] = None,
+              start: Optional[Path] = None, depth: int = 0) -> Iterator[Tuple[str, int]]:
+    """
+    遍历需要查找的目录本身（监视模式用于注册 inotify），与 iter_json_files 使用相同的深度限制、排除通配符和图片目录判断
+
+    Args:
+        root (Path): 输入目录
+        options (Optional[DiscoveryOptions]): 查找选项
+        start (Optional[Path]): 起始目录，默认为输入目录
+        depth (int): 起始目录相对于输入目录的深度
+
+    Yields:
+        Tuple[str, int]: (目录路径, 深度)，父目录先于子目录返回
+    """
+    options = options or DiscoveryOptions()
+    scanner = _FolderScanner(Path(root), options)
+    stack = [(str(start or root), depth)]
+    while stack:
+        current, current_depth = stack.pop()
+        yield current, current_depth
+        if options.max_depth is not None and current_depth >= options.max_depth:
+            continue
+        _, subdirs = scanner.scan_dir(current)
+        stack.extend((subdir, current_depth + 1) for subdir in reversed(subdirs)
+                     if not scanner._excluded(os.path.basename(subdir), scanner._relative(subdir))
+                     and not scanner._is_archive(subdir))
@@ -0,0 +1,211 @@
+"""  python 模組文件名 : gt_index.py
+
+gt_index.py 一次性读取 laptops LEFT JOIN laptop_defect_predictions 中 created_at 下限之后的数据，
+建立以 laptop_name 为键的内存索引（最新一条记录的 pred / pred_score / gt），查询为 O(1) 字典查找
+
+索引可以保存为快照文件，数据库文件的修改时间或大小变化、created_at 下限变化时快照自动失效
+
+"""
+
+import json
+import logging
+import os
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from db_access import GT_ROWS_QUERY, connect_readonly
+
+SNAPSHOT_VERSION = "1"
+
+# 与 process_laptop_infers 中的哨兵值相同
+NO_SN = ("no-sn", "no-sn", "no-sn")
+
+DbInfo = Tuple[str, str, str]
+
+
+def iter_gt_rows(conn: sqlite3.Connection, created_after: str) -> Iterator[sqlite3.Row]:
+    """
+    逐行读取 created_at >= created_after 的笔记本记录及其预测结果
+
+    Args:
+        conn (sqlite3.Connection): 数据库连接
+        created_after (str): created_at 下限
+
+    Yields:
+        sqlite3.Row: laptop_id, laptop_name, pred, pred_score, gt, created_at
+    """
+    cursor = conn.cursor()
+    cursor.row_factory = sqlite3.Row
+    cursor.execute(GT_ROWS_QUERY, (created_after,))
+    while True:
+        rows = cursor.fetchmany(10000)
+        if not rows:
+            break
+        yield from rows
+
+
+class GroundTruthIndex:
+    """
+    laptop_name -> (db_pred, db_pred_score, db_gt) 的内存索引
+
+    值与 get_db_info_batch 的返回值相同（str 形式），相同的取值组合共享同一个元组以减少内存。
+    """
+
+    def __init__(self, entries: Optional[Dict[str, DbInfo]] = None, created_after: str = ""):
+        self.entries: Dict[str, DbInfo] = entries or {}
+        self.created_after = created_after
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, laptop_name: str) -> DbInfo:
+        """
+        查询单个 laptop_name，没有记录时返回 no-sn 哨兵值
+        """
+        return self.entries.get(laptop_name, NO_SN)
+
+    def lookup(self, laptop_names: Iterable[str]) -> Dict[str, DbInfo]:
+        """
+        查询多个 laptop_name，返回格式与 get_db_info_batch 相同
+
+        Args:
+            laptop_names (Iterable[str]): 要查询的laptop_name集合
+
+        Returns:
+            Dict[str, DbInfo]: laptop_name -> (db_pred, db_pred_score, db_gt)
+        """
+        return {name: self.entries.get(name, NO_SN) for name in laptop_names}
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[sqlite3.Row], created_after: str = "") -> "GroundTruthIndex":
+        """
+        由按 created_at 升序排列的记录建立索引，同一 laptop_name 保留最后（最新）一条
+
+        Args:
+            rows (Iterable[sqlite3.Row]): iter_gt_rows 的结果
+            created_after (str): 建立索引时使用的 created_at 下限
+
+        Returns:
+            GroundTruthIndex: 索引
+        """
+        values: Dict[DbInfo, DbInfo] = {}
+        entries: Dict[str, DbInfo] = {}
+        for row in rows:
+            value = (str(row[2]), str(row[3]), str(row[4]))
+            entries[row[1]] = values.setdefault(value, value)
+        return cls(entries, created_after)
+
+    @classmethod
+    def load(cls, db_path: str, created_after: str,
+             conn: Optional[sqlite3.Connection] = None) -> "GroundTruthIndex":
+        """
+        从数据库读取并建立索引
+
+        Args:
+            db_path (str): 数据库路径
+            created_after (str): created_at 下限
+            conn (Optional[sqlite3.Connection]): 复用的数据库连接，为 None 时以只读方式打开并关闭
+
+        Returns:
+            GroundTruthIndex: 索引
+        """
+        own_conn = conn is None
+        if own_conn:
+            conn = connect_readonly(db_path)
+        try:
+            return cls.from_rows(iter_gt_rows(conn, created_after), created_after)
+        finally:
+            if own_conn:
+                conn.close()
+
+    @staticmethod
+    def _db_signature(db_path: str) -> Dict[str, int]:
+        stat = os.stat(db_path)
+        return {"db_mtime_ns": stat.st_mtime_ns, "db_size": stat.st_size}
+
+    def save_snapshot(self, snapshot_path: Path, db_path: str):
+        """
+        将索引保存为快照文件（先写临时文件再原子重命名）
+
+        Args:
+            snapshot_path (Path): 快照文件路径
+            db_path (str): 建立索引所用的数据库路径，记录其修改时间和大小
+        """
+        snapshot_path = Path(snapshot_path)
+        names = list(self.entries)
+        snapshot = {
+            "version": SNAPSHOT_VERSION,
+            "created_after": self.created_after,
+            **self._db_signature(db_path),
+            "names": names,
+            "values": [self.entries[name] for name in names],
+        }
+        partial = snapshot_path.with_name(snapshot_path.name + ".part")
+        with open(partial, 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(partial, snapshot_path)
+
+    @classmethod
+    def load_snapshot(cls, snapshot_path: Path, db_path: str, created_after: str) -> Optional["GroundTruthIndex"]:
+        """
+        读取快照；快照不存在、版本不符或数据库已变化时返回 None
+
+        Args:
+            snapshot_path (Path): 快照文件路径
+            db_path (str): 数据库路径
+            created_after (str): created_at 下限
+
+        Returns:
+            Optional[GroundTruthIndex]: 索引
+        """
+        snapshot_path = Path(snapshot_path)
+        if not snapshot_path.exists():
+            return None
+        with open(snapshot_path, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+        expected = {"version": SNAPSHOT_VERSION, "created_after": created_after, **cls._db_signature(db_path)}
+        if any(snapshot.get(key) != value for key, value in expected.items()):
+            return None
+        values: Dict[DbInfo, DbInfo] = {}
+        entries = {}
+        for name, value in zip(snapshot["names"], snapshot["values"]):
+            value = tuple(value)
+            entries[name] = values.setdefault(value, value)
+        return cls(entries, created_after)
+
+    @classmethod
+    def load_cached(cls, db_path: str, created_after: str, snapshot_path: Optional[Path] = None,
+                    conn: Optional[sqlite3.Connection] = None) -> "GroundTruthIndex":
+        """
+        优先使用有效的快照，否则从数据库建立索引并（设置了 snapshot_path 时）保存快照
+
+        Args:
+            db_path (str): 数据库路径
+            created_after (str): created_at 下限
+            snapshot_path (Optional[Path]): 快照文件路径
+            conn (Optional[sqlite3.Connection]): 复用的数据库连接
+
+        Returns:
+            GroundTruthIndex: 索引
+        """
+        logger = logging.getLogger(__name__)
+        if snapshot_path is not None:
+            try:
+                index = cls.load_snapshot(snapshot_path, db_path, created_after)
+            except Exception as e:
+                logger.warning(f"读取索引快照 {snapshot_path} 时发生错误: {str(e)}")
+                index = None
+            if index is not None:
+                logger.info(f"使用索引快照: {snapshot_path} ({len(index)} 个laptop_name)")
+                return index
+
+        index = cls.load(db_path, created_after, conn=conn)
+        logger.info(f"已从数据库建立内存索引: {len(index)} 个laptop_name")
+        if snapshot_path is not None:
+            try:
+                index.save_snapshot(snapshot_path, db_path)
+                logger.info(f"索引快照已写入 {snapshot_path}")
+            except Exception as e:
+                logger.warning(f"写入索引快照 {snapshot_path} 时发生错误: {str(e)}")
+        return index
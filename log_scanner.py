@@ -0,0 +1,178 @@
+"""  python 模組文件名 : log_scanner.py
+
+log_scanner.py 使用字面量查找与预编译的 bytes 正则在 mmap（或带重叠处理的分块读取）上单次扫描 inference_ 日志，
+内存占用与日志大小无关，同时提取 mask_miss 区域、各区域耗时和错误分类
+
+"""
+
+import mmap
+import os
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# mask_miss 行的固定标记，例如
+#   [INFO][2025-02-23 09:47:39][inference_v2][LASA_02_...] Front_04: Transformation not possible
+# 区域名称的规则与原有正则 MASK_MISS_PATTERN 相同：标记之前、上一次匹配之后第一个后跟空白的 "]"，
+# 到标记之间不含 ":" 的部分。使用字面量查找定位标记，再在标记之前定位区域名称，速度接近磁盘读取速度
+MASK_MISS_MARKER = b': Transformation not possible'
+MASK_MISS_PATTERN = re.compile(rb'\]\s([^:]+): Transformation not possible')
+
+# 与 \s 相同的空白字节
+_WHITESPACE = frozenset(b' \t\n\r\x0b\x0c')
+
+# 需要额外信号时使用的组合正则，单次扫描同时提取耗时和错误分类，各分支以命名分组区分，匹配均不跨行
+#   area/seconds/unit: ... Front_04: inference time 0.123s （也支持 elapsed / cost / 耗时 及 ms）
+#   level/exc: [ERROR] / [WARNING] / [CRITICAL] 开头的行，以及行内的异常类型（如 ValueError）
+SIGNAL_PATTERN = re.compile(
+    rb'\][ \t](?P<area>[^:\s\]]+):[^\r\n]*?(?:time|elapsed|cost|\xe8\x80\x97\xe6\x97\xb6)[^\d\r\n]*'
+    rb'(?P<seconds>\d+(?:\.\d+)?)[ \t]*(?P<unit>ms|s)\b'
+    rb'|^\[(?P<level>ERROR|WARNING|CRITICAL)\](?:[^\r\n]*?\b(?P<exc>[A-Z]\w*(?:Error|Exception))\b)?',
+    re.MULTILINE
+)
+
+# 分块读取时每块的大小
+CHUNK_SIZE = 8 * 1024 * 1024
+
+
+@dataclass
+class InferenceLogScan:
+    """inference_ 日志的单次扫描结果"""
+    mask_miss_areas: List[str] = field(default_factory=list)
+    # 区域名称 -> 每次记录的耗时（秒）
+    area_timings: Dict[str, List[float]] = field(default_factory=dict)
+    # 日志级别 -> 行数
+    level_counts: Counter = field(default_factory=Counter)
+    # 异常类型 -> 出现次数
+    exception_counts: Counter = field(default_factory=Counter)
+    bytes_scanned: int = 0
+
+    def mask_miss_result(self) -> List[str]:
+        """
+        返回与原有约定一致的 mask_miss 列表：没有匹配时为 ["none"]
+
+        Returns:
+            List[str]: mask_miss 区域名称列表
+        """
+        return self.mask_miss_areas if self.mask_miss_areas else ["none"]
+
+    def _consume(self, buffer, extract_signals: bool) -> None:
+        """
+        扫描一段缓冲区并累计匹配结果
+
+        Args:
+            buffer: bytes 或 mmap 对象
+            extract_signals (bool): 是否同时提取耗时和错误分类
+        """
+        # mask_miss 无论是否提取其他信号都使用同一规则，结果相同
+        self._consume_mask_miss(buffer)
+        if not extract_signals:
+            return
+        for match in SIGNAL_PATTERN.finditer(buffer):
+            if match.group('unit') is not None:
+                seconds = float(match.group('seconds'))
+                if match.group('unit') == b'ms':
+                    seconds /= 1000.0
+                area = match.group('area').decode('utf-8', errors='ignore')
+                self.area_timings.setdefault(area, []).append(seconds)
+            elif match.group('level') is not None:
+                self.level_counts[match.group('level').decode('ascii')] += 1
+                if match.group('exc') is not None:
+                    self.exception_counts[match.group('exc').decode('ascii')] += 1
+
+    def _consume_mask_miss(self, buffer) -> None:
+        """
+        提取 mask_miss，结果与 MASK_MISS_PATTERN.findall 相同：字面量查找标记，
+        再在上一次匹配结束和标记前最后一个 ":" 之后，找到第一个后跟空白的 "]"，其后到标记之间即为区域名称
+
+        Args:
+            buffer: bytes 或 mmap 对象
+        """
+        marker_length = len(MASK_MISS_MARKER)
+        # 上一次匹配的结束位置，findall 的下一次匹配从这里开始
+        search_from = 0
+        pos = buffer.find(MASK_MISS_MARKER)
+        while pos != -1:
+            # 区域名称不含 ":"，只能从标记前最后一个 ":" 之后开始
+            start = max(search_from, buffer.rfind(b':', search_from, pos) + 1)
+            bracket = buffer.find(b']', start, pos - 2) if pos - 2 > start else -1
+            while bracket != -1 and buffer[bracket + 1] not in _WHITESPACE:
+                bracket = buffer.find(b']', bracket + 1, pos - 2)
+            if bracket != -1:
+                self.mask_miss_areas.append(buffer[bracket + 2:pos].decode('utf-8', errors='ignore'))
+                search_from = pos + marker_length
+            pos = buffer.find(MASK_MISS_MARKER, pos + marker_length)
+
+
+def scan_inference_log(file_path: Path, extract_signals: bool = False, use_mmap: bool = True,
+                       chunk_size: int = CHUNK_SIZE) -> InferenceLogScan:
+    """
+    单次扫描 inference_ 日志文件
+
+    优先使用 mmap，让正则直接在页缓存上匹配；mmap 不可用时改为分块读取，
+    每块只处理到最后一个换行符，剩余部分并入下一块，因此不会漏掉跨块的行。
+
+    Args:
+        file_path (Path): 日志文件路径
+        extract_signals (bool): 是否同时提取各区域耗时和错误分类，否则只提取 mask_miss
+        use_mmap (bool): 是否使用 mmap
+        chunk_size (int): 分块读取时每块的大小
+
+    Returns:
+        InferenceLogScan: 扫描结果
+
+    Raises:
+        OSError: 文件无法打开或读取
+    """
+    scan = InferenceLogScan()
+    with open(file_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        scan.bytes_scanned = size
+        if size == 0:
+            return scan
+        if use_mmap:
+            mapped: Optional[mmap.mmap] = None
+            try:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                mapped = None
+            if mapped is not None:
+                with mapped:
+                    scan._consume(mapped, extract_signals)
+                return scan
+
+        carry = b''
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            buffer = carry + chunk
+            cut = buffer.rfind(b'\n') + 1
+            if cut == 0:
+                carry = buffer
+                continue
+            scan._consume(buffer[:cut], extract_signals)
+            carry = buffer[cut:]
+        if carry:
+            scan._consume(carry, extract_signals)
+    return scan
+
+
+def scan_inference_bytes(data: bytes, extract_signals: bool = False) -> InferenceLogScan:
+    """
+    扫描已读入内存的 inference_ 日志内容（例如压缩包成员），结果与 scan_inference_log 相同
+
+    Args:
+        data (bytes): 日志内容
+        extract_signals (bool): 是否同时提取各区域耗时和错误分类，否则只提取 mask_miss
+
+    Returns:
+        InferenceLogScan: 扫描结果
+    """
+    scan = InferenceLogScan()
+    scan.bytes_scanned = len(data)
+    if data:
+        scan._consume(data, extract_signals)
+    return scan
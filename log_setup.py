@@ -0,0 +1,132 @@
+"""  python 模組文件名 : log_setup.py
+
+log_setup.py 配置处理程序的日志输出，并提供定期输出处理进度的 ProgressReporter
+
+    verbose: 与原来相同，FileHandler 与 StreamHandler 直接挂在 root logger 上，逐文件输出 INFO 日志
+    quiet:   root logger 只挂一个 QueueHandler，文件与控制台写入由后台 QueueListener 线程完成，
+             逐文件日志降为 DEBUG（不会被格式化），改为定期输出进度（文件夹/s 与预计剩余时间）
+
+"""
+
+import atexit
+import logging
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, TypeVar
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+LOG_MODES = ("verbose", "quiet")
+
+# quiet 模式下默认的进度输出间隔（秒）
+DEFAULT_PROGRESS_INTERVAL = 10.0
+
+T = TypeVar("T")
+
+
+def setup_logging(log_file: Path, log_mode: str = "verbose") -> Optional[QueueListener]:
+    """
+    配置 root logger。root logger 已有 handler 时（例如调用方已配置日志）保持不变
+
+    Args:
+        log_file (Path): 日志文件路径
+        log_mode (str): "verbose" 或 "quiet"
+
+    Returns:
+        Optional[QueueListener]: quiet 模式下启动的后台监听器（程序退出时自动停止并写完剩余日志）
+    """
+    if log_mode not in LOG_MODES:
+        raise ValueError(f"不支持的 log_mode: {log_mode}")
+    handlers = [logging.FileHandler(log_file, encoding='utf-8'), logging.StreamHandler()]
+    root = logging.getLogger()
+    if root.handlers:
+        for handler in handlers:
+            handler.close()
+        return None
+
+    if log_mode == "verbose":
+        logging.basicConfig(level=logging.INFO, format=LOG_FORMAT, handlers=handlers)
+        return None
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(logging.INFO)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+def format_duration(seconds: float) -> str:
+    """
+    将秒数格式化为 H:MM:SS
+    """
+    seconds = int(round(seconds))
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+class ProgressReporter:
+    """
+    定期输出处理进度
+
+    文件夹查找与处理同时进行，查找结束前总数未知，只输出已处理数量和速度；
+    查找结束后根据当前速度估算剩余时间。
+    """
+
+    def __init__(self, logger: logging.Logger, interval: float = DEFAULT_PROGRESS_INTERVAL):
+        """
+        Args:
+            logger (logging.Logger): 输出进度的 logger
+            interval (float): 两次输出之间的最短间隔（秒）
+        """
+        self.logger = logger
+        self.interval = interval
+        self.discovered = 0
+        self.discovery_done = False
+        self.processed = 0
+        self._started = time.perf_counter()
+        self._last_report = self._started
+
+    def track(self, iterable: Iterable[T]) -> Iterator[T]:
+        """
+        包装文件夹查找的迭代器，统计已发现的数量
+
+        Args:
+            iterable (Iterable[T]): 文件夹查找结果
+        """
+        for item in iterable:
+            self.discovered += 1
+            yield item
+        self.discovery_done = True
+
+    def advance(self, count: int):
+        """
+        记录新处理完成的文件夹数量，距上次输出超过间隔时输出一行进度
+
+        Args:
+            count (int): 本次处理完成的数量
+        """
+        self.processed += count
+        now = time.perf_counter()
+        if now - self._last_report >= self.interval:
+            self._last_report = now
+            self.report(now)
+
+    def report(self, now: Optional[float] = None):
+        """
+        输出一行进度
+        """
+        elapsed = (now or time.perf_counter()) - self._started
+        rate = self.processed / elapsed if elapsed > 0 else 0.0
+        if self.discovery_done:
+            remaining = max(0, self.discovered - self.processed)
+            eta = format_duration(remaining / rate) if rate > 0 else "未知"
+            self.logger.info("进度: %d/%d 个文件夹, %.1f 文件/s, 预计剩余 %s",
+                             self.processed, self.discovered, rate, eta)
+        else:
+            self.logger.info("进度: 已处理 %d 个文件夹 (已发现 %d 个，仍在查找), %.1f 文件/s",
+                             self.processed, self.discovered, rate)
@@ -0,0 +1,245 @@
+"""  python 模組文件名 : metrics.py
+
+metrics.py 记录处理流程各阶段的耗时、计数、单文件耗时分布和读取字节数，
+以及（启用 log_signals 时）inference_ 日志中的各区域推理耗时、日志级别与异常类型，
+处理结束后输出汇总表格和 JSON 报告
+
+"""
+
+import json
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TypeVar
+
+# 单文件耗时直方图的桶上限（毫秒），最后一个桶为 +inf
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+# 汇总表格中显示的耗时最长的区域数与最常见的异常类型数
+SUMMARY_TOP_N = 5
+
+# 汇总表格中各阶段的显示顺序
+STAGES = ("discovery", "db_source", "inference_log", "json_read", "validation", "db_lookup", "write", "analytics", "sweep", "annotations", "box_eval")
+
+T = TypeVar("T")
+
+
+class LatencyHistogram:
+    """固定桶的耗时直方图，内存占用与样本数无关"""
+
+    def __init__(self, buckets_ms: Iterable[float] = LATENCY_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self.counts = [0] * (len(self.buckets_ms) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms: Optional[float] = None
+        self.max_ms: Optional[float] = None
+
+    def observe(self, value_ms: float):
+        self.counts[bisect_left(self.buckets_ms, value_ms)] += 1
+        self.count += 1
+        self.total_ms += value_ms
+        self.min_ms = value_ms if self.min_ms is None else min(self.min_ms, value_ms)
+        self.max_ms = value_ms if self.max_ms is None else max(self.max_ms, value_ms)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        按桶估算分位数（返回所在桶的上限，最后一个桶返回最大值）
+
+        Args:
+            q (float): 分位数，0 ~ 1
+
+        Returns:
+            Optional[float]: 估算值（毫秒），没有样本时返回 None
+        """
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target and bucket_count:
+                return self.buckets_ms[i] if i < len(self.buckets_ms) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        labels = [f"<={bucket}ms" for bucket in self.buckets_ms] + [f">{self.buckets_ms[-1]}ms"]
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ms / self.count if self.count else None,
+            "min_ms": self.min_ms,
+            "max_ms": self.max_ms,
+            "p50_ms": self.quantile(0.5),
+            "p90_ms": self.quantile(0.9),
+            "p99_ms": self.quantile(0.99),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class PipelineMetrics:
+    """
+    处理流程的指标记录器（线程安全）
+
+    阶段耗时为各线程中该阶段耗时之和，并行处理时可能大于总耗时。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stage_seconds: Dict[str, float] = {}
+        self.stage_calls: Dict[str, int] = {}
+        self.counters: Dict[str, int] = {}
+        self.file_latency = LatencyHistogram()
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.elapsed_seconds: Optional[float] = None
+        # inference_ 日志信号：区域名称 -> [次数, 总耗时(s), 最大耗时(s)]
+        self.area_timings: Dict[str, List[float]] = {}
+        self.log_levels: Counter = Counter()
+        self.log_exceptions: Counter = Counter()
+
+    def add_stage(self, stage: str, seconds: float, calls: int = 1):
+        with self._lock:
+            self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+            self.stage_calls[stage] = self.stage_calls.get(stage, 0) + calls
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[None]:
+        """
+        记录代码块的耗时
+
+        Args:
+            stage (str): 阶段名称
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_stage(stage, time.perf_counter() - start)
+
+    def timed_iter(self, stage: str, iterable: Iterable[T]) -> Iterator[T]:
+        """
+        包装迭代器，记录每次取下一个元素的耗时（用于生成器形式的文件夹查找）
+
+        Args:
+            stage (str): 阶段名称
+            iterable (Iterable[T]): 被包装的迭代器
+        """
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add_stage(stage, time.perf_counter() - start, calls=0)
+                return
+            self.add_stage(stage, time.perf_counter() - start)
+            yield item
+
+    def incr(self, counter: str, value: int = 1):
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def observe_file(self, seconds: float):
+        with self._lock:
+            self.file_latency.observe(seconds * 1000.0)
+
+    def observe_log_signals(self, scan: Any):
+        """
+        累计单个 inference_ 日志的信号（log_scanner.InferenceLogScan 的 area_timings / level_counts / exception_counts）
+
+        Args:
+            scan (Any): 以 extract_signals=True 扫描得到的 InferenceLogScan
+        """
+        with self._lock:
+            for area, values in scan.area_timings.items():
+                stats = self.area_timings.setdefault(area, [0, 0.0, 0.0])
+                stats[0] += len(values)
+                stats[1] += sum(values)
+                stats[2] = max(stats[2], max(values))
+            self.log_levels.update(scan.level_counts)
+            self.log_exceptions.update(scan.exception_counts)
+
+    def _log_signals_dict(self) -> Optional[Dict[str, Any]]:
+        if not (self.area_timings or self.log_levels or self.log_exceptions):
+            return None
+        return {
+            "area_timings": {
+                area: {"count": count, "mean_seconds": total / count, "max_seconds": longest, "total_seconds": total}
+                for area, (count, total, longest) in sorted(self.area_timings.items())
+            },
+            "levels": dict(self.log_levels.most_common()),
+            "exceptions": dict(self.log_exceptions.most_common()),
+        }
+
+    def finish(self):
+        self.elapsed_seconds = time.perf_counter() - self._started
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        返回机器可读的指标报告
+        """
+        elapsed = self.elapsed_seconds if self.elapsed_seconds is not None else time.perf_counter() - self._started
+        files = self.counters.get("files_processed", 0) + self.counters.get("files_failed", 0)
+        report = {
+            "started_at": time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(self.started_at)) + " UTC",
+            "elapsed_seconds": elapsed,
+            "files_per_second": files / elapsed if elapsed > 0 else None,
+            "stages": {
+                stage: {"seconds": self.stage_seconds[stage], "calls": self.stage_calls.get(stage, 0)}
+                for stage in self._ordered_stages()
+            },
+            "counters": dict(sorted(self.counters.items())),
+            "file_latency": self.file_latency.to_dict(),
+        }
+        log_signals = self._log_signals_dict()
+        if log_signals is not None:
+            report["inference_log_signals"] = log_signals
+        return report
+
+    def _ordered_stages(self) -> List[str]:
+        return [stage for stage in STAGES if stage in self.stage_seconds] + \
+            sorted(stage for stage in self.stage_seconds if stage not in STAGES)
+
+    def summary_lines(self) -> List[str]:
+        """
+        返回汇总表格的文本行
+        """
+        report = self.to_dict()
+        elapsed = report["elapsed_seconds"]
+        lines = [f"{'阶段':<14}{'耗时(s)':>10}{'占比':>8}{'次数':>10}"]
+        for stage, values in report["stages"].items():
+            share = values["seconds"] / elapsed * 100 if elapsed > 0 else 0.0
+            lines.append(f"{stage:<16}{values['seconds']:>10.3f}{share:>9.1f}%{values['calls']:>10}")
+        latency = report["file_latency"]
+        if latency["count"]:
+            lines.append(f"单文件耗时(ms): mean={latency['mean_ms']:.1f} p50<={latency['p50_ms']} "
+                         f"p90<={latency['p90_ms']} p99<={latency['p99_ms']} max={latency['max_ms']:.1f}")
+        for counter, value in report["counters"].items():
+            lines.append(f"{counter}: {value}")
+        log_signals = report.get("inference_log_signals")
+        if log_signals is not None:
+            slowest = sorted(log_signals["area_timings"].items(), key=lambda item: -item[1]["mean_seconds"])
+            for area, stats in slowest[:SUMMARY_TOP_N]:
+                lines.append(f"区域耗时 {area}: mean={stats['mean_seconds']:.3f}s max={stats['max_seconds']:.3f}s "
+                             f"n={stats['count']}")
+            if log_signals["levels"]:
+                lines.append("日志级别: " + ", ".join(f"{level}={count}" for level, count in log_signals["levels"].items()))
+            if log_signals["exceptions"]:
+                lines.append("异常类型: " + ", ".join(f"{name}={count}" for name, count
+                                                   in list(log_signals["exceptions"].items())[:SUMMARY_TOP_N]))
+        if report["files_per_second"] is not None:
+            lines.append(f"总耗时: {elapsed:.3f} s, 吞吐量: {report['files_per_second']:.1f} 文件/s")
+        return lines
+
+    def write_report(self, path: Path):
+        """
+        将指标报告写入 JSON 文件
+
+        Args:
+            path (Path): 报告文件路径
+        """
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
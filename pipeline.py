@@ -0,0 +1,258 @@
+"""  python 模組文件名 : pipeline.py
+
+pipeline.py 提供 LaptopInfersProcessor 的流水线执行模式：文件夹查找、文件读取、解析与数据库查询、
+结果写入作为并发阶段运行，阶段之间由有界队列连接（队列满时上游阶段阻塞等待，形成背压）
+
+    查找线程 --> [读取队列] --> 读取线程 x N --> [解析结果队列] --> 查询线程 --> [写入队列] --> 写入（调用线程）
+
+慢速存储（网络盘）上的读取与解析、数据库查询、写入重叠进行，第一批结果在几秒内即可写出。
+写入阶段按查找顺序重新排序，输出与批处理模式逐字节一致；处理中的文件夹数量由信号量限制，内存占用有上限。
+
+"""
+
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from itertools import batched
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    from log_setup import ProgressReporter
+    from process_laptop_infers import FolderLoad, LaptopInfersProcessor, RunTally
+    from result_row import ResultRow
+    from scan_manifest import ScanManifest
+
+# 队列结束标记
+_END = object()
+
+# 阻塞等待队列时检查停止标志的间隔（秒）
+_POLL_INTERVAL = 0.1
+
+# 增量模式下每次查询清单的文件夹数量
+MANIFEST_LOOKUP_CHUNK = 64
+
+
+class StagePipeline:
+    """
+    由有界队列连接的并发处理流水线
+
+    任一阶段出错时设置停止标志，其余阶段在下一次队列等待时退出，错误在调用线程中重新抛出。
+    """
+
+    def __init__(self, processor: "LaptopInfersProcessor", writers: Sequence[Any],
+                 manifest: Optional["ScanManifest"] = None,
+                 parse_pool: Optional[ProcessPoolExecutor] = None,
+                 progress: Optional["ProgressReporter"] = None,
+                 queue_size: int = 256):
+        """
+        初始化流水线
+
+        Args:
+            processor (LaptopInfersProcessor): 提供读取、解析、查询和结果生成的处理器
+            writers (Sequence[Any]): 结果输出器
+            manifest (Optional[ScanManifest]): 扫描清单，设置后未变化的文件夹不再读取
+            parse_pool (Optional[ProcessPoolExecutor]): 解析进程池，为 None 时在读取线程中解析
+            progress (Optional[ProgressReporter]): 进度输出
+            queue_size (int): 每个队列的容量
+        """
+        self.processor = processor
+        self.writers = writers
+        self.manifest = manifest
+        self.parse_pool = parse_pool
+        self.progress = progress
+        self.readers = max(1, processor.workers)
+        self.read_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.parsed_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.write_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        # 已发现但尚未写出的文件夹数量上限，写入阶段重新排序时的缓存也受此限制
+        self._in_flight = threading.Semaphore(queue_size * 2)
+        self._stop = threading.Event()
+        self._errors: List[BaseException] = []
+
+    def _put(self, target: queue.Queue, item: Any) -> bool:
+        """
+        放入队列，队列满时阻塞；停止后返回 False
+        """
+        while not self._stop.is_set():
+            try:
+                target.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, source: queue.Queue) -> Any:
+        """
+        从队列取出，队列空时阻塞；停止后返回 _END
+        """
+        while not self._stop.is_set():
+            try:
+                return source.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+        return _END
+
+    def _acquire_slot(self) -> bool:
+        while not self._stop.is_set():
+            if self._in_flight.acquire(timeout=_POLL_INTERVAL):
+                return True
+        return False
+
+    def _run_stage(self, stage, *args):
+        """
+        运行一个阶段，记录异常并通知其他阶段停止
+        """
+        try:
+            stage(*args)
+        except BaseException as e:
+            self._errors.append(e)
+            self._stop.set()
+
+    def _discover(self, discovered: Iterable[Tuple[Path, str, str]], tally: "RunTally"):
+        """
+        查找阶段：为每个文件夹分配序号并放入读取队列；增量模式下先按块查询清单
+        """
+        seq = 0
+        chunk_size = MANIFEST_LOOKUP_CHUNK if self.manifest is not None else 1
+        try:
+            for chunk in batched(discovered, chunk_size):
+                unchanged = self.manifest.lookup_unchanged(list(chunk)) if self.manifest is not None else {}
+                if unchanged:
+                    self.processor.metrics.incr("files_cached", len(unchanged))
+                for file_tuple in chunk:
+                    if not self._acquire_slot() or not self._put(
+                            self.read_queue, (seq, file_tuple, unchanged.get(file_tuple[0]))):
+                        return
+                    seq += 1
+                    tally.found_files += 1
+        finally:
+            for _ in range(self.readers):
+                self._put(self.read_queue, _END)
+
+    def _read(self):
+        """
+        读取阶段：读取 inference_ 日志与 laptop_infers.json 并解析（或交给解析进程池）
+        """
+        processor = self.processor
+        try:
+            while True:
+                item = self._get(self.read_queue)
+                if item is _END:
+                    return
+                seq, file_tuple, entry = item
+                if entry is not None:
+                    load = processor.cached_load(file_tuple, entry)
+                elif self.parse_pool is not None:
+                    load = processor.read_folder(*file_tuple)
+                    processor.parse_loaded(load, self.parse_pool)
+                    processor.metrics.observe_file(load.elapsed)
+                else:
+                    load = processor.load_folder(*file_tuple)
+                    processor.metrics.observe_file(load.elapsed)
+                if not self._put(self.parsed_queue, (seq, load)):
+                    return
+        finally:
+            self._put(self.parsed_queue, _END)
+
+    def _enrich(self):
+        """
+        查询阶段：取出当前所有已解析的文件夹（最多 batch_size 个）做一次数据库批量查询并生成结果行
+        """
+        processor = self.processor
+        finished_readers = 0
+        try:
+            while finished_readers < self.readers:
+                item = self._get(self.parsed_queue)
+                if item is _END:
+                    if self._stop.is_set():
+                        return
+                    finished_readers += 1
+                    continue
+                batch = [item]
+                while len(batch) < processor.batch_size:
+                    try:
+                        item = self.parsed_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is _END:
+                        finished_readers += 1
+                        continue
+                    batch.append(item)
+
+                loads = [load for _, load in batch]
+                with processor.metrics.stage("db_lookup"):
+                    db_infos = processor.enrich_batch(loads)
+                for seq, load in batch:
+                    if not self._put(self.write_queue, (seq, load, processor.results_for_load(load, db_infos))):
+                        return
+        finally:
+            # 数据库连接在本线程中创建，也在本线程中关闭
+            processor.close_db()
+            self._put(self.write_queue, _END)
+
+    def _write_ready(self, ready: List[Tuple["FolderLoad", List["ResultRow"]]], tally: "RunTally"):
+        """
+        按顺序写出一组已就绪的文件夹结果
+        """
+        processor = self.processor
+        rows = []
+        new_entries = []
+        for load, results in ready:
+            if results and self.manifest is not None and load.cached_rows is None:
+                new_entries.append((load.json_file, load.qc_result_file, load.inference_file,
+                                    load.laptop_name, results))
+            rows.extend(results)
+            processor.record_load(load, results, tally)
+        with processor.metrics.stage("write"):
+            for writer in self.writers:
+                writer.write_rows(rows)
+        processor.metrics.incr("rows_written", len(rows))
+        if new_entries:
+            self.manifest.store(new_entries)
+        if self.progress is not None:
+            self.progress.advance(len(ready))
+        for _ in ready:
+            self._in_flight.release()
+
+    def run(self, discovered: Iterable[Tuple[Path, str, str]], tally: "RunTally"):
+        """
+        运行流水线直到所有文件夹写出，写入阶段在调用线程中执行
+
+        Args:
+            discovered (Iterable[Tuple[Path, str, str]]): 文件夹查找结果
+            tally (RunTally): 本次运行的计数
+        """
+        threads = [threading.Thread(target=self._run_stage, args=(self._discover, discovered, tally),
+                                    name="discovery", daemon=True)]
+        threads += [threading.Thread(target=self._run_stage, args=(self._read,), name=f"io_{i}", daemon=True)
+                    for i in range(self.readers)]
+        threads.append(threading.Thread(target=self._run_stage, args=(self._enrich,), name="enrich", daemon=True))
+        for thread in threads:
+            thread.start()
+
+        pending: Dict[int, Tuple["FolderLoad", List["ResultRow"]]] = {}
+        next_seq = 0
+        try:
+            while True:
+                item = self._get(self.write_queue)
+                if item is _END:
+                    break
+                seq, load, results = item
+                pending[seq] = (load, results)
+                ready = []
+                while next_seq in pending:
+                    ready.append(pending.pop(next_seq))
+                    next_seq += 1
+                if ready:
+                    self._write_ready(ready, tally)
+        except BaseException:
+            self._stop.set()
+            raise
+        finally:
+            if self._errors:
+                self._stop.set()
+            for thread in threads:
+                thread.join()
+        if self._errors:
+            raise self._errors[0]
@@ -1,13 +1,40 @@
 import os
 import json
-import csv
-import re
 import sqlite3
 from datetime import datetime
-from typing import List, Dict, Any, Optional, Tuple
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Iterator, Sequence
 from pathlib import Path
 import logging
-from schema import InferenceOutput, LaptopInfers, ModelParams, Labels
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from contextlib import ExitStack
+from functools import partial
+from itertools import batched
+import archive_io
+from analytics import DefectAnalytics
+from box_eval import BoxEvalConfig, BoxEvaluator, latest_labels, load_evaluator
+from box_matching import HAS_NUMPY, BoxPosition, LabelArrays, match_records
+from columnar_writer import COLUMNAR_FORMATS, HAS_PYARROW, ColumnarResultWriter
+from discovery import DiscoveryOptions, iter_json_files, scan_folder
+from db_access import EVENT_SOURCE_INDEXES, REQUIRED_INDEXES, connect_readonly, latest_prediction_query, warn_missing_indexes
+from db_source import DEFAULT_FETCH_SIZE, NO_LOG, EventLaptop, iter_event_laptops
+from gt_index import GroundTruthIndex
+from log_setup import DEFAULT_PROGRESS_INTERVAL, LOG_MODES, ProgressReporter, setup_logging
+from metrics import PipelineMetrics
+from pipeline import StagePipeline
+from result_row import ResultRow, intern_db_info, intern_str
+from result_writer import StreamingResultWriter
+from results_store import HAS_STORE_SUPPORT, STORE_SUFFIX, ResultsStoreWriter
+from log_scanner import scan_inference_bytes, scan_inference_log
+from scan_manifest import ManifestEntry, ScanManifest
+from sharding import ShardSpec, failures_path, write_failure_summary
+from threshold_sweep import SweepGrid, ThresholdSweep
+from watch import WATCH_TICK, SettleTracker, WatchOptions, open_watcher
+from pydantic import ValidationError
+from schema import InferenceOutput, InferenceOutputWithDefaults, LaptopInfers, ModelParams, Labels
 
 # 设置数据库路径
 ##DB_Path = "./test_02.db"  # 可以根据需要修改为实际的数据库路径
@@ -27,6 +54,89 @@ def extract_laptop_name(laptop_key: str) -> str:
         return laptop_key[:last_underscore_pos]
     return laptop_key  # 如果没有下划线，返回原始字符串
 
+# 支持的输出格式
+OUTPUT_FORMATS = ("csv", "json", *COLUMNAR_FORMATS, "sqlite")
+
+# 数据库查询的 created_at 下限，只取该日期之后创建的笔记本记录
+DB_CREATED_AT_CUTOFF = '2025-01-01'
+
+# 每个 IN (...) 查询最多携带的 laptop_name 数量，需低于 SQLite 的变量上限 (999)
+DB_LOOKUP_CHUNK_SIZE = 500
+
+# 数据库查询的哨兵值
+DB_SENTINEL_NO_DB = ("no-db", "no-db", "no-db")
+DB_SENTINEL_NO_SN = ("no-sn", "no-sn", "no-sn")
+DB_SENTINEL_ERROR = ("error", "error", "error")
+
+
+def get_db_info_batch(laptop_names: Iterable[str], db_path: str,
+                      conn: Optional[sqlite3.Connection] = None,
+                      created_after: str = DB_CREATED_AT_CUTOFF,
+                      chunk_size: int = DB_LOOKUP_CHUNK_SIZE,
+                      log_level: int = logging.INFO) -> Dict[str, Tuple[str, str, str]]:
+    """
+    批量从数据库中查询多个laptop_name的相关信息
+
+    每个 laptop_name 取 created_at >= created_after 中最新的一条记录，
+    查询按 chunk_size 分块使用 IN (...)，数据库耗时与分块数而非笔记本数成正比。
+
+    Args:
+        laptop_names (Iterable[str]): 要查询的laptop_name集合
+        db_path (str): 数据库路径
+        conn (Optional[sqlite3.Connection]): 复用的数据库连接，为 None 时以只读方式自行打开并关闭
+        created_after (str): created_at 下限
+        chunk_size (int): 每次查询的laptop_name数量
+        log_level (int): 连接与查询完成日志的级别（quiet 模式下为 DEBUG）
+
+    Returns:
+        Dict[str, Tuple[str, str, str]]: laptop_name -> (db_pred, db_pred_score, db_gt)
+                                         哨兵值与 get_db_info 相同 (no-db / no-sn / error)
+    """
+    logger = logging.getLogger(__name__)
+    names = sorted(set(laptop_names))
+    if not names:
+        return {}
+
+    if conn is None and not os.path.exists(db_path):
+        logger.warning(f"数据库文件不存在: {db_path}")
+        return {name: DB_SENTINEL_NO_DB for name in names}
+
+    own_conn = conn is None
+    db_info: Dict[str, Tuple[str, str, str]] = {}
+    try:
+        if own_conn:
+            logger.log(log_level, "尝试连接数据库: %s", db_path)
+            conn = connect_readonly(db_path)
+    except Exception as e:
+        logger.error(f"连接数据库时出错: {str(e)}")
+        return {name: DB_SENTINEL_ERROR for name in names}
+
+    try:
+        for start in range(0, len(names), chunk_size):
+            chunk = names[start:start + chunk_size]
+            # 与单条查询语义一致：每个 laptop_name 取 created_at 最新的一条
+            query = latest_prediction_query(len(chunk))
+            try:
+                cursor = conn.execute(query, (*chunk, created_after))
+                for laptop_name, pred, pred_score, gt in cursor.fetchall():
+                    db_info[laptop_name] = intern_db_info((str(pred), str(pred_score), str(gt)))
+            except Exception as e:
+                logger.error(f"查询数据库时出错: {str(e)}")
+                for name in chunk:
+                    db_info[name] = DB_SENTINEL_ERROR
+    finally:
+        if own_conn:
+            conn.close()
+
+    missing = [name for name in names if name not in db_info]
+    if missing:
+        logger.warning(f"未找到匹配的记录: {len(missing)} 个laptop_name")
+    for name in missing:
+        db_info[name] = DB_SENTINEL_NO_SN
+    logger.log(log_level, "数据库批量查询完成: %d 个laptop_name", len(names))
+    return db_info
+
+
 def get_db_info(laptop_name: str, db_path: str) -> Tuple[str, str, str]:
     """
     从数据库中查询laptop_name相关信息
@@ -41,65 +151,257 @@ def get_db_info(laptop_name: str, db_path: str) -> Tuple[str, str, str]:
                              如果没有找到记录，返回 ("no-sn", "no-sn", "no-sn")
                              如果查询出错，返回 ("error", "error", "error")
     """
-    logger = logging.getLogger(__name__)
+    return get_db_info_batch([laptop_name], db_path)[laptop_name]
+
+
+def parse_inference_output(json_data: Dict[str, Any]) -> InferenceOutput:
+    """
+    补充缺失的必需字段后将 JSON 数据构造为 InferenceOutput，验证失败时抛出异常
+
+    Args:
+        json_data (Dict[str, Any]): JSON 数据
+
+    Returns:
+        InferenceOutput: 解析后的数据结构
+    """
+    # 预处理 JSON 数据，补充缺失的必需字段
+    for infer in json_data.get('laptop_infers', []):
+        if 'params' in infer:
+            params = infer['params']
+            # 添加默认值
+            params.setdefault('score_thr', 0.0)
+            params.setdefault('box_size_thr', 1000)
+            params.setdefault('model_key', params.get('model_version', 'unknown'))
+            params.setdefault('mask_key', params.get('model_version', 'unknown'))
+    return InferenceOutput(**json_data)
+
 
-    DB_Path = db_path
-    if not os.path.exists(DB_Path):
-        logger.warning(f"数据库文件不存在: {DB_Path}")
-        return "no-db", "no-db", "no-db"
+def parse_inference_output_json(raw_json: bytes) -> InferenceOutput:
+    """
+    快速解析：直接从原始字节验证 laptop_infers.json，缺失字段的默认值由 schema 声明，
+    不经过 json.loads 生成的中间字典。JSON 本身无效时抛出 ValueError，验证失败时抛出 ValidationError
+
+    Args:
+        raw_json (bytes): laptop_infers.json 的原始内容
 
+    Returns:
+        InferenceOutput: 解析后的数据结构（InferenceOutputWithDefaults 实例）
+    """
     try:
-        logger.info(f"尝试连接数据库: {DB_Path}")
-        conn = sqlite3.connect(DB_Path)
-        cursor = conn.cursor()
-
-        # 修正查询语句，确保字段名与analyze_gt.py中一致
-        query = """
-        SELECT
-            p.pred,
-            p.pred_score,
-            p.gt
-        FROM
-            laptops l
-        LEFT JOIN
-            laptop_defect_predictions p ON l.id = p.laptop_id
-        WHERE
-            l.laptop_name = ? AND
-            l.created_at >= '2025-01-01'
-        ORDER BY
-            l.created_at DESC
-        LIMIT 1
-        """
-
-        logger.info(f"执行查询: laptop_name={laptop_name}")
-        cursor.execute(query, (laptop_name,))
-        record = cursor.fetchone()
-        conn.close()
-
-        if record:
-            # 确保变量名与字段名一致
-            pred, pred_score, gt = record
-            logger.info(f"找到记录: pred={pred}, pred_score={pred_score}, gt={gt}")
-            return str(pred), str(pred_score), str(gt)
-        else:
-            logger.warning(f"未找到匹配的记录: laptop_name={laptop_name}")
-            return "no-sn", "no-sn", "no-sn"
+        return InferenceOutputWithDefaults.model_validate_json(raw_json)
+    except ValidationError as e:
+        if any(error['type'] == 'json_invalid' for error in e.errors()):
+            raise ValueError(f"无效的JSON: {str(e)}") from None
+        raise
+
+
+def _parse_json_worker(raw_json: bytes, parse_mode: str = "standard") -> Tuple[Optional[InferenceOutput], Optional[str], str, str, float]:
+    """
+    解析任务（可在进程池中执行）：JSON 解码与 pydantic 验证
+
+    Args:
+        raw_json (bytes): laptop_infers.json 的原始内容
+        parse_mode (str): "standard" 使用 json.loads 与 parse_inference_output；
+                          "fast" 使用 parse_inference_output_json
+
+    Returns:
+        Tuple[Optional[InferenceOutput], Optional[str], str, str, float]:
+            (解析结果, 失败原因 "read"/"parse"/None, 错误信息, 工作进程标识, 解析耗时秒数)
+    """
+    start = time.perf_counter()
+    worker = f"pid-{os.getpid()}"
+    inference_output, failure, error = None, None, ""
+    if parse_mode == "fast":
+        try:
+            inference_output = parse_inference_output_json(raw_json)
+        except ValueError as e:
+            failure, error = "read", f"解码JSON时发生错误: {str(e)}"
+        except Exception as e:
+            failure, error = "parse", f"解析JSON数据时发生错误: {str(e)}"
+        return inference_output, failure, error, worker, time.perf_counter() - start
+
+    try:
+        json_data = json.loads(raw_json)
+        if not json_data:
+            failure, error = "read", "JSON内容为空"
     except Exception as e:
-        logger.error(f"查询数据库时出错: {str(e)}")
-        return "error", "error", "error"
+        failure, error = "read", f"解码JSON时发生错误: {str(e)}"
+    if failure is None:
+        try:
+            inference_output = parse_inference_output(json_data)
+        except Exception as e:
+            failure, error = "parse", f"解析JSON数据时发生错误: {str(e)}"
+    return inference_output, failure, error, worker, time.perf_counter() - start
+
+
+@dataclass
+class FolderLoad:
+    """单个 laptop_infers.json 所在文件夹的读取与解析结果（尚未查询数据库）"""
+    json_file: Path
+    qc_result_file: str
+    inference_file: str
+    mask_miss_areas: List[str]
+    inference_output: Optional[InferenceOutput] = None
+    # 失败原因: None 表示成功, "read" 表示文件读取失败, "parse" 表示数据处理失败
+    failure: Optional[str] = None
+    # 完成读取/解析的工作线程或进程标识，用于按工作单元统计失败
+    worker: str = "main"
+    # 进程池模式下由 I/O 线程读取的原始 JSON 内容，解析后清空
+    raw_json: Optional[bytes] = None
+    # 读取与解析该文件夹的耗时（秒）
+    elapsed: float = 0.0
+    # 增量模式下从扫描清单复用的结果行（不含数据库字段）及其 laptop_name
+    cached_rows: Optional[List[ResultRow]] = None
+    cached_laptop_name: Optional[str] = None
+
+    @property
+    def laptop_name(self) -> Optional[str]:
+        if self.cached_rows is not None:
+            return self.cached_laptop_name
+        if self.inference_output is None:
+            return None
+        return extract_laptop_name(self.inference_output.laptop_key)
+
+
+@dataclass
+class RunTally:
+    """一次运行的文件夹计数"""
+    found_files: int = 0
+    processed_files: int = 0
+    error_files: int = 0
+    # 工作单元 -> 失败数量
+    worker_errors: Counter = field(default_factory=Counter)
+    # 失败记录，分片运行时写入失败记录摘要
+    failures: List[Dict[str, Any]] = field(default_factory=list)
+
 
 class LaptopInfersProcessor:
-    def __init__(self, input_folder: str, output_csv: str, db_path: str):
+    def __init__(self, input_folder: str, output_csv: str, db_path: str,
+                 batch_size: int = 500, created_after: str = DB_CREATED_AT_CUTOFF,
+                 workers: int = 1, worker_mode: str = "thread", json_format: str = "json",
+                 manifest_path: Optional[str] = None, discovery: Optional[DiscoveryOptions] = None,
+                 parse_mode: str = "standard", match_mode: str = "python",
+                 output_formats: Sequence[str] = ("csv", "json"), metrics_path: Optional[str] = None,
+                 log_mode: str = "verbose", progress_interval: Optional[float] = None,
+                 db_lookup: str = "batch", gt_snapshot_path: Optional[str] = None,
+                 execution: str = "batch", queue_size: int = 256, shard: Optional[ShardSpec] = None,
+                 analytics: bool = False, analytics_path: Optional[str] = None,
+                 sweep: Optional[SweepGrid] = None, sweep_path: Optional[str] = None,
+                 box_eval: Optional[BoxEvalConfig] = None, box_eval_path: Optional[str] = None,
+                 source: str = "folders", db_fetch_size: int = DEFAULT_FETCH_SIZE, log_signals: bool = False,
+                 db_immutable: bool = False):
         """
         初始化处理器
 
         Args:
             input_folder (str): 要搜索的主文件夹路径
             output_csv (str): 输出CSV文件的路径
+            db_path (str): 数据库路径
+            batch_size (int): 每批处理的文件夹数量，每批只做一次数据库批量查询
+            created_after (str): 数据库查询的 created_at 下限
+            workers (int): 并行工作单元数量，1 表示串行处理
+            worker_mode (str): "thread" 使用线程池完成读取与解析；
+                               "process" 使用线程池读取文件、进程池完成 JSON 解码与验证
+            json_format (str): "json" 输出 JSON 数组，"jsonl" 输出 JSON Lines
+            manifest_path (Optional[str]): 扫描清单路径，设置后启用增量处理：
+                                           未变化的文件夹复用上次的结果行，只重新查询数据库
+            discovery (Optional[DiscoveryOptions]): 文件夹查找选项（深度、通配符、并行遍历等）
+            parse_mode (str): "standard" 使用 json.load 后补充默认值再构造模型；
+                              "fast" 直接从字节验证，默认值由 schema 声明
+            match_mode (str): "python" 逐个区域循环匹配分数；"vectorized" 使用 NumPy 展平后匹配（需要 numpy）
+            output_formats (Sequence[str]): 输出格式，可组合 "csv"、"json"（格式由 json_format 决定）、
+                                            "parquet"、"arrow"（列式格式需要 pyarrow）、"sqlite"（带索引的结果库）
+            metrics_path (Optional[str]): 指标 JSON 报告路径，默认与输出CSV同名的 .metrics.json 文件
+            log_mode (str): "verbose" 逐文件输出 INFO 日志；"quiet" 使用队列异步写日志，
+                            逐文件日志降为 DEBUG，改为定期输出进度
+            progress_interval (Optional[float]): 进度输出间隔（秒），quiet 模式默认 10 秒，verbose 模式默认不输出
+            db_lookup (str): "batch" 每批对数据库做一次 IN (...) 查询；
+                             "index" 开始时一次性读取 created_after 之后的全部记录建立内存索引，之后 O(1) 查找
+            gt_snapshot_path (Optional[str]): "index" 模式的索引快照文件，数据库未变化时直接读取快照
+            execution (str): "batch" 按批依次读取、查询、写入；"pipeline" 查找、读取、解析与查询、写入
+                             作为并发阶段运行，由有界队列连接，慢速存储的读取与解析、写入重叠进行
+            queue_size (int): "pipeline" 模式下每个队列的容量，处理中的文件夹数量不超过其 2 倍
+            shard (Optional[ShardSpec]): 只处理属于该分片的文件夹（相对路径哈希取模或指定子目录），
+                                         输出文件名带分片标记，并额外写出失败记录摘要，供 sharding.py 合并
+            analytics (bool): 是否在写出结果的同时统计瑕疵分析指标（按区域、模型、日期分组，见 analytics.py）
+            analytics_path (Optional[str]): 瑕疵统计报告路径，默认与输出CSV同名的 .analytics.json 文件
+            sweep (Optional[SweepGrid]): 设置后对 score_thr × box_size_thr 网格做阈值扫描（见 threshold_sweep.py，
+                                         需要 numpy），按 db_gt 统计各网格点的 TP/FP/FN/TN
+            sweep_path (Optional[str]): 阈值扫描结果 CSV 路径，默认与输出CSV同名的 .sweep.csv 文件
+            box_eval (Optional[BoxEvalConfig]): 设置后将每个框与数据库 annotations 中的人工标注框做 IoU 匹配
+                                                （见 box_eval.py，需要 numpy），统计 TP/FP/FN 与各区域 AP/mAP
+            box_eval_path (Optional[str]): 框级评估报告路径，默认与输出CSV同名的 .box_eval.json 文件
+            source (str): "folders" 遍历输入目录中的 laptop_infers.json；"db" 从数据库 inference_events 读取推理结果
+                          （见 db_source.py），与 laptops、laptop_defect_predictions 一次连接查询完成，不遍历文件夹
+            db_fetch_size (int): "db" 输入模式下每次 fetchmany 读取的行数
+            log_signals (bool): 扫描 inference_ 日志时同时提取各区域推理耗时、日志级别与异常类型，
+                                汇总到指标报告的 inference_log_signals（增量模式下复用缓存的文件夹不读取日志，不计入）
+            db_immutable (bool): 以 immutable=1 打开数据库（不加锁、不检查修改），只在确认数据库是处理期间
+                                 不会被写入的静态副本时使用；监视模式下忽略
         """
+        unknown_formats = set(output_formats) - set(OUTPUT_FORMATS)
+        if unknown_formats or not output_formats:
+            raise ValueError(f"不支持的 output_formats: {sorted(unknown_formats) or output_formats}")
+        if match_mode not in ("python", "vectorized"):
+            raise ValueError(f"不支持的 match_mode: {match_mode}")
+        if parse_mode not in ("standard", "fast"):
+            raise ValueError(f"不支持的 parse_mode: {parse_mode}")
+        if worker_mode not in ("thread", "process"):
+            raise ValueError(f"不支持的 worker_mode: {worker_mode}")
+        if log_mode not in LOG_MODES:
+            raise ValueError(f"不支持的 log_mode: {log_mode}")
+        if db_lookup not in ("batch", "index"):
+            raise ValueError(f"不支持的 db_lookup: {db_lookup}")
+        if execution not in ("batch", "pipeline"):
+            raise ValueError(f"不支持的 execution: {execution}")
+        if source not in ("folders", "db"):
+            raise ValueError(f"不支持的 source: {source}")
         self.input_folder = Path(input_folder)
-        self.output_csv = Path(output_csv)
+        self.shard = shard
+        self.output_csv = shard.output_path(output_csv) if shard else Path(output_csv)
         self.db_path = Path(db_path)
+        self.batch_size = max(1, batch_size)
+        self.created_after = created_after
+        self._db_conn: Optional[sqlite3.Connection] = None
+        # 传给 connect_readonly 的 immutable；监视模式下数据库会被持续写入，固定为 False
+        self._db_immutable = db_immutable
+        self.db_lookup = db_lookup
+        self.gt_snapshot_path = Path(gt_snapshot_path) if gt_snapshot_path else None
+        self._gt_index: Optional[GroundTruthIndex] = None
+        # 本次运行中无法列举的目录（遍历不完整时不清理扫描清单）
+        self._discovery_errors: List[str] = []
+        self.workers = max(1, workers)
+        self.worker_mode = worker_mode
+        self.execution = execution
+        self.queue_size = max(1, queue_size)
+        self.source = source
+        self.db_fetch_size = max(1, db_fetch_size)
+        self.log_signals = log_signals
+        self.json_format = json_format
+        self.manifest_path = Path(manifest_path) if manifest_path else None
+        self.discovery = discovery or DiscoveryOptions()
+        self.parse_mode = parse_mode
+        self.match_mode = match_mode
+        self.output_formats = list(dict.fromkeys(output_formats))
+        self.metrics_path = Path(metrics_path) if metrics_path else self.output_csv.with_suffix('.metrics.json')
+        self.metrics = PipelineMetrics()
+        self.analytics_path = (Path(analytics_path) if analytics_path
+                               else self.output_csv.with_suffix('.analytics.json')) if analytics else None
+        self.analytics: Optional[DefectAnalytics] = None
+        self.sweep_grid = sweep
+        self.sweep_path = (Path(sweep_path) if sweep_path
+                           else self.output_csv.with_suffix('.sweep.csv')) if sweep is not None else None
+        self.sweep: Optional[ThresholdSweep] = None
+        self.box_eval_config = box_eval
+        self.box_eval_path = (Path(box_eval_path) if box_eval_path
+                              else self.output_csv.with_suffix('.box_eval.json')) if box_eval is not None else None
+        self.box_eval: Optional[BoxEvaluator] = None
+        self.log_mode = log_mode
+        if progress_interval is None and log_mode == "quiet":
+            progress_interval = DEFAULT_PROGRESS_INTERVAL
+        self.progress_interval = progress_interval
+        # 逐文件、逐批次日志的级别，quiet 模式下为 DEBUG，不会被格式化和写入
+        self._detail_level = logging.DEBUG if log_mode == "quiet" else logging.INFO
 
         # 确保日志目录存在
         log_dir = Path("logs")
@@ -110,17 +412,81 @@ class LaptopInfersProcessor:
         log_file = log_dir / f"laptop_infers_processor_{current_time}.log"
 
         # 设置日志配置
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler(log_file, encoding='utf-8'),
-                logging.StreamHandler()
-            ]
-        )
+        self._log_listener = setup_logging(log_file, log_mode)
         self.logger = logging.getLogger(__name__)
         self.logger.info(f"开始处理，输入目录: {input_folder}")
-        self.logger.info(f"输出文件: {output_csv}")
+        self.logger.info(f"输出文件: {self.output_csv}")
+        if shard is not None:
+            self.logger.info(f"分片: {shard.tag}" + (f"，子目录: {', '.join(shard.roots)}" if shard.roots else ""))
+        if self.source == "db":
+            if self.shard is not None:
+                raise ValueError("数据库输入模式不支持分片")
+            self.logger.info(f"输入来源: 数据库 {self.db_path} (inference_events)")
+            if self.manifest_path is not None or self.execution == "pipeline":
+                self.logger.warning("数据库输入模式不使用扫描清单与 pipeline 执行模式，按批依次处理全部笔记本记录")
+                self.manifest_path = None
+                self.execution = "batch"
+        if any(fmt in COLUMNAR_FORMATS for fmt in self.output_formats) and not HAS_PYARROW:
+            self.logger.warning("未安装 pyarrow，跳过列式输出")
+            self.output_formats = [fmt for fmt in self.output_formats if fmt not in COLUMNAR_FORMATS]
+        if "sqlite" in self.output_formats and not HAS_STORE_SUPPORT:
+            self.logger.warning(f"SQLite 版本 {sqlite3.sqlite_version} 低于 3.38，跳过 SQLite 结果库输出")
+            self.output_formats = [fmt for fmt in self.output_formats if fmt != "sqlite"]
+        if ("sqlite" in self.output_formats and self.manifest_path is not None
+                and self.manifest_path.resolve() == self.output_csv.with_suffix(STORE_SUFFIX).resolve()):
+            raise ValueError(f"扫描清单与 SQLite 结果库不能是同一个文件: {self.manifest_path}")
+        if self.match_mode == "vectorized" and not HAS_NUMPY:
+            self.logger.warning("未安装 numpy，match_mode 回退为 python")
+            self.match_mode = "python"
+        if self.sweep_grid is not None and not HAS_NUMPY:
+            self.logger.warning("未安装 numpy，跳过阈值扫描")
+            self.sweep_grid = None
+        if self.sweep_grid is not None and self.manifest_path is not None:
+            self.logger.warning("增量模式下复用缓存的文件夹没有 labels，不参与阈值扫描")
+        if self.box_eval_config is not None and not HAS_NUMPY:
+            self.logger.warning("未安装 numpy，跳过框级评估")
+            self.box_eval_config = None
+        if self.box_eval_config is not None and self.manifest_path is not None:
+            self.logger.warning("增量模式下复用缓存的文件夹没有 labels，不参与框级评估")
+
+    def iter_json_files(self) -> Iterator[Tuple[Path, str, str]]:
+        """
+        以生成器形式遍历文件夹寻找 laptop_infers.json 文件和对应的 qc_result 文件以及 inference_ 文件，
+        遍历尚未结束时即可开始处理
+
+        Yields:
+            Tuple[Path, str, str]: laptop_infers.json 文件、对应的 qc_result 文件名和 inference_ 文件名
+        """
+        try:
+            if self.shard is None:
+                yield from iter_json_files(self.input_folder, self.discovery, self._discovery_errors)
+                return
+            roots = [self.input_folder / root for root in self.shard.roots] or [self.input_folder]
+            for root in roots:
+                for file_tuple in iter_json_files(root, self.discovery, self._discovery_errors):
+                    if self.shard.contains(self._relative_folder(file_tuple[0].parent)):
+                        yield file_tuple
+        except Exception as e:
+            self.logger.error(f"遍历文件夹时发生错误: {str(e)}")
+            self._discovery_errors.append(str(self.input_folder))
+
+    def _relative_folder(self, folder: Path) -> str:
+        """
+        文件夹相对于输入目录的 POSIX 路径（用于分片哈希）
+        """
+        try:
+            return folder.relative_to(self.input_folder).as_posix()
+        except ValueError:
+            return folder.as_posix()
+
+    def _owns_folder(self, folder: Path) -> bool:
+        """
+        文件夹是否属于本分片（位于分片的子目录内且哈希取模匹配）
+        """
+        if self.shard.roots and not any(folder.is_relative_to(self.input_folder / root)
+                                        for root in self.shard.roots):
+            return False
+        return self.shard.contains(self._relative_folder(folder))
 
     def find_json_files(self) -> List[Tuple[Path, str, str]]:
         """
@@ -130,27 +496,16 @@ class LaptopInfersProcessor:
             List[Tuple[Path, str, str]]: 找到的文件对列表，每个元组包含一个 laptop_infers.json 文件、
                                         对应的 qc_result 文件名和 inference_ 文件名
         """
-        file_tuples = []
-        try:
-            for root, _, files in os.walk(self.input_folder):
-                root_path = Path(root)
-                if "laptop_infers.json" in files:
-                    laptop_infers_file = root_path / "laptop_infers.json"
-                    # 寻找 qc_result_ 开头的文件
-                    qc_files = [f for f in files if f.startswith("qc_result_")]
-                    qc_result_file = qc_files[0] if qc_files else ""
-
-                    # 寻找 inference_ 开头的文件
-                    inference_files = [f for f in files if f.startswith("inference_")]
-                    inference_file = inference_files[0] if inference_files else ""
-
-                    file_tuples.append((laptop_infers_file, qc_result_file, inference_file))
-
-            self.logger.info(f"找到 {len(file_tuples)} 个 laptop_infers.json 文件")
-        except Exception as e:
-            self.logger.error(f"遍历文件夹时发生错误: {str(e)}")
+        file_tuples = list(self.iter_json_files())
+        self.logger.info(f"找到 {len(file_tuples)} 个 laptop_infers.json 文件")
         return file_tuples
 
+    def _in_archive(self, path: Path) -> bool:
+        """
+        路径是否为压缩包成员（只在启用 discovery.archives 时检查）
+        """
+        return self.discovery.archives and archive_io.in_archive(path)
+
     def read_inference_file(self, folder_path: Path, filename: str) -> List[str]:
         """
         读取并解析 inference_ 文件，提取 mask_miss 信息
@@ -167,18 +522,15 @@ class LaptopInfersProcessor:
 
         file_path = folder_path / filename
         try:
-            mask_miss_areas = []
-            pattern = r'\]\s([^:]+): Transformation not possible'
-
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read()
-
-            matches = re.findall(pattern, content)
-            if matches:
-                mask_miss_areas.extend(matches)
-
-            return mask_miss_areas if mask_miss_areas else ["none"]
-
+            with self.metrics.stage("inference_log"):
+                if self._in_archive(file_path):
+                    scan = scan_inference_bytes(archive_io.read_bytes(file_path), self.log_signals)
+                else:
+                    scan = scan_inference_log(file_path, extract_signals=self.log_signals)
+            self.metrics.incr("bytes_inference_log", scan.bytes_scanned)
+            if self.log_signals:
+                self.metrics.observe_log_signals(scan)
+            return scan.mask_miss_result()
         except Exception as e:
             self.logger.error(f"读取inference文件 {file_path} 时发生错误: {str(e)}")
             return ["error"]
@@ -194,7 +546,12 @@ class LaptopInfersProcessor:
             Optional[Dict[str, Any]]: 解析后的 JSON 数据，如果发生错误返回 None
         """
         try:
+            if self._in_archive(file_path):
+                data = archive_io.read_bytes(file_path)
+                self.metrics.incr("bytes_json", len(data))
+                return json.loads(data)
             with open(file_path, 'r', encoding='utf-8') as f:
+                self.metrics.incr("bytes_json", os.fstat(f.fileno()).st_size)
                 return json.load(f)
         except Exception as e:
             self.logger.error(f"读取文件 {file_path} 时发生错误: {str(e)}")
@@ -211,16 +568,7 @@ class LaptopInfersProcessor:
             Optional[InferenceOutput]: 解析后的数据结构，如果发生错误返回 None
         """
         try:
-            # 预处理 JSON 数据，补充缺失的必需字段
-            for infer in json_data.get('laptop_infers', []):
-                if 'params' in infer:
-                    params = infer['params']
-                    # 添加默认值
-                    params.setdefault('score_thr', 0.0)
-                    params.setdefault('box_size_thr', 1000)
-                    params.setdefault('model_key', params.get('model_version', 'unknown'))
-                    params.setdefault('mask_key', params.get('model_version', 'unknown'))
-            return InferenceOutput(**json_data)
+            return parse_inference_output(json_data)
         except Exception as e:
             self.logger.error(f"解析JSON数据时发生错误: {str(e)}")
             return None
@@ -237,6 +585,8 @@ class LaptopInfersProcessor:
             Optional[tuple]: 找到的瑕疵点信息 (area_name, boxes, score)，如果未找到返回 None
         """
         try:
+            if self.match_mode == "vectorized":
+                return LabelArrays(labels).match(target_score)
             for area_name, label_data in labels.items():
                 scores = label_data.scores
                 boxes = label_data.boxes
@@ -247,38 +597,82 @@ class LaptopInfersProcessor:
             self.logger.error(f"处理标签数据时发生错误: {str(e)}")
         return None
 
-    def process_json_data(self, json_data: Dict[str, Any], qc_result_file: str, mask_miss_areas: List[str]) -> List[Dict[str, Any]]:
+    def match_laptop_boxes(self, laptop_infers: List[LaptopInfers]) -> Dict[int, Optional[BoxPosition]]:
         """
-        处理 JSON 数据，提取所需信息
+        vectorized 模式下一次匹配一台笔记本全部带 labels 的推理记录（展平一次，所有记录共用）
 
         Args:
-            json_data (Dict[str, Any]): JSON 数据
+            laptop_infers (List[LaptopInfers]): 推理记录列表
+
+        Returns:
+            Dict[int, Optional[BoxPosition]]: 推理记录序号 -> (区域名称, 区域内序号)；出错时返回空字典，
+                由 find_matching_box_info 逐条匹配
+        """
+        indexes = [index for index, infer in enumerate(laptop_infers) if infer.results and infer.results.labels]
+        try:
+            positions = match_records([laptop_infers[index].results.labels for index in indexes],
+                                      [laptop_infers[index].results.score for index in indexes])
+        except Exception as e:
+            self.logger.debug(f"批量匹配失败，改为逐条匹配: {str(e)}")
+            return {}
+        return dict(zip(indexes, positions))
+
+    def box_info_at(self, labels: Dict[str, Labels], position: Optional[BoxPosition]) -> Optional[tuple]:
+        """
+        根据 match_laptop_boxes 的匹配位置取出瑕疵点信息，与 find_matching_box_info 的返回值相同
+
+        Args:
+            labels (Dict[str, Labels]): 标签数据
+            position (Optional[BoxPosition]): (区域名称, 区域内序号)
+
+        Returns:
+            Optional[tuple]: 瑕疵点信息 (area_name, boxes, score)，未匹配返回 None
+        """
+        if position is None:
+            return None
+        area_name, i = position
+        try:
+            label_data = labels[area_name]
+            return (area_name, label_data.boxes[i], label_data.scores[i])
+        except Exception as e:
+            self.logger.error(f"处理标签数据时发生错误: {str(e)}")
+        return None
+
+    def build_results(self, inference_output: InferenceOutput, qc_result_file: str,
+                      mask_miss_areas: List[str], db_info: Tuple[str, str, str]) -> List[ResultRow]:
+        """
+        根据已解析的数据和数据库信息生成结果行
+
+        Args:
+            inference_output (InferenceOutput): 解析后的数据结构
             qc_result_file (str): 对应的 QC 文件名
             mask_miss_areas (List[str]): 从inference文件中提取的mask_miss区域列表
+            db_info (Tuple[str, str, str]): (db_pred, db_pred_score, db_gt)
 
         Returns:
-            List[Dict[str, Any]]: 提取的信息列表
+            List[ResultRow]: 提取的信息列表
         """
         results = []
         try:
-            inference_output = self.parse_json_data(json_data)
-            if not inference_output:
-                return results
-
             laptop_key = inference_output.laptop_key
-            laptop_name = extract_laptop_name(laptop_key)
-
-            # 获取数据库信息
-            db_pred, db_pred_score, db_gt = get_db_info(laptop_name, self.db_path)
+            # 重复出现的字符串共享同一个对象
+            laptop_name = intern_str(extract_laptop_name(laptop_key))
+            qc_result_file = intern_str(qc_result_file)
+            db_pred, db_pred_score, db_gt = db_info
+            positions = (self.match_laptop_boxes(inference_output.laptop_infers)
+                         if self.match_mode == "vectorized" else {})
 
-            for infer in inference_output.laptop_infers:
+            for index, infer in enumerate(inference_output.laptop_infers):
                 if infer.results:
                     defect = infer.results.defect
                     score = infer.results.score
 
                     # 检查是否有 labels（是否检测到瑕疵）
                     if infer.results.labels and len(infer.results.labels) > 0:
-                        box_info = self.find_matching_box_info(infer.results.labels, score)
+                        if index in positions:
+                            box_info = self.box_info_at(infer.results.labels, positions[index])
+                        else:
+                            box_info = self.find_matching_box_info(infer.results.labels, score)
                         if box_info:
                             area_name, boxes, matched_score = box_info
                         else:
@@ -288,131 +682,819 @@ class LaptopInfersProcessor:
                         area_name, boxes, matched_score = None, None, None
 
                     # 添加数据库信息到结果中
-                    results.append({
-                        'laptop_key': laptop_key,
-                        'defect': defect,
-                        'score': score,
-                        'area_name': area_name,
-                        'boxes': str(boxes) if boxes is not None else None,
-                        'matched_score': matched_score,
-                        'timestamp': infer.timestamp,
-                        'qc_result_file': qc_result_file,
-                        'mask_miss': mask_miss_areas,  # 直接使用列表
-                        'laptop_name': laptop_name,
-                        'db_pred': db_pred,
-                        'db_pred_score': db_pred_score,
-                        'db_gt': db_gt
-                    })
+                    results.append(ResultRow(
+                        laptop_key=laptop_key,
+                        defect=defect,
+                        score=score,
+                        area_name=intern_str(area_name),
+                        boxes=boxes,  # 原始坐标列表，CSV/JSON 输出时转换为字符串
+                        matched_score=matched_score,
+                        timestamp=infer.timestamp,
+                        qc_result_file=qc_result_file,
+                        mask_miss=mask_miss_areas,  # 直接使用列表
+                        laptop_name=laptop_name,
+                        db_pred=db_pred,
+                        db_pred_score=db_pred_score,
+                        db_gt=db_gt,
+                        model_key=intern_str(infer.params.model_key),
+                        version=intern_str(infer.version)
+                    ))
 
         except Exception as e:
             self.logger.error(f"处理JSON数据时发生错误: {str(e)}")
 
         return results
 
-    def write_to_csv(self, all_results: List[Dict[str, Any]]):
+    def process_json_data(self, json_data: Dict[str, Any], qc_result_file: str, mask_miss_areas: List[str]) -> List[ResultRow]:
+        """
+        处理 JSON 数据，提取所需信息（单条查询数据库，批量处理请使用 process）
+
+        Args:
+            json_data (Dict[str, Any]): JSON 数据
+            qc_result_file (str): 对应的 QC 文件名
+            mask_miss_areas (List[str]): 从inference文件中提取的mask_miss区域列表
+
+        Returns:
+            List[ResultRow]: 提取的信息列表
+        """
+        inference_output = self.parse_json_data(json_data)
+        if not inference_output:
+            return []
+
+        laptop_name = extract_laptop_name(inference_output.laptop_key)
+        db_info = get_db_info_batch([laptop_name], str(self.db_path), conn=self._db_conn,
+                                    created_after=self.created_after)[laptop_name]
+        return self.build_results(inference_output, qc_result_file, mask_miss_areas, db_info)
+
+    def _read_mask_miss(self, json_file: Path, inference_file: str) -> List[str]:
+        """
+        读取 inference_ 文件提取 mask_miss 信息并记录日志
+
+        Args:
+            json_file (Path): laptop_infers.json 文件路径
+            inference_file (str): inference_ 文件名
+
+        Returns:
+            List[str]: 提取的mask_miss区域名称列表
+        """
+        self.logger.log(self._detail_level, "处理文件: %s", json_file)
+        mask_miss_areas = self.read_inference_file(json_file.parent, inference_file)
+        self.logger.log(self._detail_level, "从 %s 中提取的mask_miss区域: %s",
+                        inference_file if inference_file else '(未找到inference文件)', mask_miss_areas)
+        return mask_miss_areas
+
+    def load_folder(self, json_file: Path, qc_result_file: str, inference_file: str) -> FolderLoad:
+        """
+        读取单个文件夹的 inference_ 日志和 laptop_infers.json 并完成解析（不查询数据库）
+
+        Args:
+            json_file (Path): laptop_infers.json 文件路径
+            qc_result_file (str): 对应的 QC 文件名
+            inference_file (str): inference_ 文件名
+
+        Returns:
+            FolderLoad: 读取与解析结果
+        """
+        start = time.perf_counter()
+        if self.parse_mode == "fast":
+            load = self.read_folder(json_file, qc_result_file, inference_file)
+            if load.raw_json is not None:
+                self._apply_parsed(load, _parse_json_worker(load.raw_json, "fast"))
+            load.elapsed = time.perf_counter() - start
+            return load
+
+        mask_miss_areas = self._read_mask_miss(json_file, inference_file)
+        load = FolderLoad(json_file, qc_result_file, inference_file, mask_miss_areas,
+                          worker=threading.current_thread().name)
+        with self.metrics.stage("json_read"):
+            json_data = self.read_json_file(json_file)
+        if not json_data:
+            load.failure = "read"
+        else:
+            with self.metrics.stage("validation"):
+                load.inference_output = self.parse_json_data(json_data)
+            if load.inference_output is None:
+                load.failure = "parse"
+        load.elapsed = time.perf_counter() - start
+        return load
+
+    def read_folder(self, json_file: Path, qc_result_file: str, inference_file: str) -> FolderLoad:
+        """
+        只读取单个文件夹的 inference_ 日志和 laptop_infers.json 原始内容，解析交给进程池
+
+        Args:
+            json_file (Path): laptop_infers.json 文件路径
+            qc_result_file (str): 对应的 QC 文件名
+            inference_file (str): inference_ 文件名
+
+        Returns:
+            FolderLoad: 读取结果，raw_json 为原始内容
+        """
+        start = time.perf_counter()
+        mask_miss_areas = self._read_mask_miss(json_file, inference_file)
+        load = FolderLoad(json_file, qc_result_file, inference_file, mask_miss_areas,
+                          worker=threading.current_thread().name)
+        try:
+            with self.metrics.stage("json_read"):
+                load.raw_json = archive_io.read_bytes(json_file) if self._in_archive(json_file) else json_file.read_bytes()
+            self.metrics.incr("bytes_json", len(load.raw_json))
+        except Exception as e:
+            self.logger.error(f"读取文件 {json_file} 时发生错误: {str(e)}")
+            load.failure = "read"
+        load.elapsed = time.perf_counter() - start
+        return load
+
+    def parse_loaded(self, load: FolderLoad, parse_pool: ProcessPoolExecutor):
+        """
+        在进程池中解析 read_folder 读取的原始内容（阻塞等待结果）
+
+        Args:
+            load (FolderLoad): read_folder 的结果
+            parse_pool (ProcessPoolExecutor): 解析进程池
+        """
+        if load.raw_json is not None:
+            self._apply_parsed(load, parse_pool.submit(_parse_json_worker, load.raw_json, self.parse_mode).result())
+
+    def _apply_parsed(self, load: FolderLoad, parsed: Tuple[Optional[InferenceOutput], Optional[str], str, str, float]):
+        """
+        将 _parse_json_worker 的解析结果写回 FolderLoad 并记录验证耗时
+
+        Args:
+            load (FolderLoad): 已读取原始内容的文件夹
+            parsed (Tuple): _parse_json_worker 的返回值
+        """
+        inference_output, failure, error, worker, seconds = parsed
+        self.metrics.add_stage("validation", seconds)
+        load.raw_json = None
+        load.inference_output = inference_output
+        load.failure = failure
+        load.elapsed += seconds
+        if failure:
+            if self.worker_mode == "process" and self.workers > 1:
+                load.worker = worker
+            self.logger.error(f"处理文件 {load.json_file} 时发生错误: {error}")
+
+    def _load_batch(self, batch: List[Tuple[Path, str, str]],
+                    io_pool: Optional[ThreadPoolExecutor],
+                    parse_pool: Optional[ProcessPoolExecutor]) -> List[FolderLoad]:
+        """
+        读取并解析一批文件夹，返回顺序与输入顺序一致
+
+        Args:
+            batch (List[Tuple[Path, str, str]]): 文件元组列表
+            io_pool (Optional[ThreadPoolExecutor]): I/O 线程池，为 None 时串行处理
+            parse_pool (Optional[ProcessPoolExecutor]): 解析进程池，为 None 时在线程内解析
+
+        Returns:
+            List[FolderLoad]: 读取与解析结果
+        """
+        if io_pool is None:
+            loads = [self.load_folder(*file_tuple) for file_tuple in batch]
+        elif parse_pool is None:
+            loads = list(io_pool.map(lambda file_tuple: self.load_folder(*file_tuple), batch))
+        else:
+            loads = list(io_pool.map(lambda file_tuple: self.read_folder(*file_tuple), batch))
+            pending = [load for load in loads if load.raw_json is not None]
+            chunksize = max(1, len(pending) // (self.workers * 4))
+            parsed = parse_pool.map(partial(_parse_json_worker, parse_mode=self.parse_mode),
+                                    [load.raw_json for load in pending],
+                                    chunksize=chunksize)
+            for load, result in zip(pending, parsed):
+                self._apply_parsed(load, result)
+        for load in loads:
+            self.metrics.observe_file(load.elapsed)
+        return loads
+
+    def _load_batch_incremental(self, batch: List[Tuple[Path, str, str]],
+                                io_pool: Optional[ThreadPoolExecutor],
+                                parse_pool: Optional[ProcessPoolExecutor],
+                                manifest: ScanManifest) -> List[FolderLoad]:
+        """
+        增量模式下读取一批文件夹：未变化的文件夹直接使用清单缓存，其余正常读取解析
+
+        Args:
+            batch (List[Tuple[Path, str, str]]): 文件元组列表
+            io_pool (Optional[ThreadPoolExecutor]): I/O 线程池
+            parse_pool (Optional[ProcessPoolExecutor]): 解析进程池
+            manifest (ScanManifest): 扫描清单
+
+        Returns:
+            List[FolderLoad]: 读取与解析结果，顺序与输入顺序一致
+        """
+        unchanged = manifest.lookup_unchanged(batch)
+        changed = [file_tuple for file_tuple in batch if file_tuple[0] not in unchanged]
+        fresh = iter(self._load_batch(changed, io_pool, parse_pool))
+
+        loads = []
+        for json_file, qc_result_file, inference_file in batch:
+            entry = unchanged.get(json_file)
+            if entry is None:
+                loads.append(next(fresh))
+                continue
+            loads.append(self.cached_load((json_file, qc_result_file, inference_file), entry))
+        self.metrics.incr("files_cached", len(unchanged))
+        if unchanged:
+            self.logger.log(self._detail_level, "复用清单缓存: %d 个文件夹，重新处理: %d 个文件夹",
+                            len(unchanged), len(changed))
+        return loads
+
+    @staticmethod
+    def cached_load(file_tuple: Tuple[Path, str, str], entry: ManifestEntry) -> FolderLoad:
+        """
+        由清单缓存记录构造 FolderLoad（不读取文件）
+
+        Args:
+            file_tuple (Tuple[Path, str, str]): 文件元组
+            entry (ManifestEntry): 清单中未变化的缓存记录
+
+        Returns:
+            FolderLoad: 带缓存结果行的文件夹
+        """
+        mask_miss_areas = entry.rows[0].mask_miss if entry.rows else []
+        return FolderLoad(*file_tuple, mask_miss_areas,
+                          cached_rows=entry.rows, cached_laptop_name=entry.laptop_name)
+
+    def results_for_load(self, load: FolderLoad, db_infos: Dict[str, Tuple[str, str, str]]) -> List[ResultRow]:
+        """
+        生成一个文件夹的结果行：缓存结果行合并本次查询的数据库字段，或由解析结果生成
+
+        Args:
+            load (FolderLoad): 已读取与解析的文件夹
+            db_infos (Dict[str, Tuple[str, str, str]]): enrich_batch 的查询结果
+
+        Returns:
+            List[ResultRow]: 结果行，读取或解析失败时为空列表
+        """
+        if load.cached_rows is not None:
+            db_info = db_infos[load.laptop_name]
+            return [row.with_db_info(db_info) for row in load.cached_rows]
+        if load.inference_output is None:
+            return []
+        results = self.build_results(load.inference_output, load.qc_result_file,
+                                     load.mask_miss_areas, db_infos[load.laptop_name])
+        if not results:
+            load.failure = "parse"
+        return results
+
+    def record_load(self, load: FolderLoad, results: List[ResultRow], tally: RunTally):
+        """
+        统计一个文件夹的处理结果，失败时输出失败记录
+
+        Args:
+            load (FolderLoad): 文件夹
+            results (List[ResultRow]): 该文件夹的结果行
+            tally (RunTally): 本次运行的计数
+        """
+        if results:
+            tally.processed_files += 1
+            if self.analytics is not None:
+                with self.metrics.stage("analytics"):
+                    self.analytics.observe_folder(results)
+            if self.sweep is not None:
+                if load.inference_output is None:
+                    self.sweep.skip()
+                else:
+                    with self.metrics.stage("sweep"):
+                        self.sweep.add_laptop([infer.results.labels for infer in load.inference_output.laptop_infers
+                                               if infer.results], results[0].db_gt)
+            if self.box_eval is not None:
+                if load.inference_output is None:
+                    self.box_eval.skip()
+                else:
+                    with self.metrics.stage("box_eval"):
+                        self.box_eval.add_laptop(load.laptop_name, latest_labels(load.inference_output))
+            return
+        tally.error_files += 1
+        tally.worker_errors[load.worker] += 1
+        tally.failures.append({
+            "json_file": str(load.json_file),
+            "qc_result_file": load.qc_result_file,
+            "inference_file": load.inference_file,
+            "reason": load.failure or "parse",
+            "worker": load.worker,
+        })
+        self._log_failure(load, tally.error_files)
+
+    def enrich_batch(self, loads: List[FolderLoad]) -> Dict[str, Tuple[str, str, str]]:
+        """
+        对一批已解析的文件夹做一次数据库批量查询
+
+        Args:
+            loads (List[FolderLoad]): 已解析的文件夹列表
+
+        Returns:
+            Dict[str, Tuple[str, str, str]]: laptop_name -> (db_pred, db_pred_score, db_gt)
+        """
+        names = {load.laptop_name for load in loads
+                 if load.inference_output is not None or load.cached_rows is not None}
+        if not names:
+            return {}
+        self.metrics.incr("db_batches")
+        self.metrics.incr("db_laptop_names", len(names))
+        if self.db_lookup == "index":
+            return self.lookup_gt_index(names)
+        return get_db_info_batch(names, str(self.db_path), conn=self._connect_db(),
+                                 created_after=self.created_after, log_level=self._detail_level)
+
+    def _connect_db(self) -> Optional[sqlite3.Connection]:
+        """
+        以只读方式打开（或返回已打开的）复用数据库连接，第一次打开时检查查询所需的索引
+
+        Returns:
+            Optional[sqlite3.Connection]: 数据库连接，数据库不存在或无法打开时为 None
+        """
+        if self._db_conn is None and self.db_path.exists():
+            try:
+                self._db_conn = connect_readonly(str(self.db_path), immutable=self._db_immutable)
+                self.logger.info(f"已连接数据库: {self.db_path}")
+                warn_missing_indexes(self._db_conn, str(self.db_path),
+                                     EVENT_SOURCE_INDEXES if self.source == "db" else REQUIRED_INDEXES)
+            except Exception as e:
+                self.logger.error(f"连接数据库时出错: {str(e)}")
+        return self._db_conn
+
+    def lookup_gt_index(self, names: Iterable[str]) -> Dict[str, Tuple[str, str, str]]:
+        """
+        从内存索引查询，第一次调用时建立索引（或读取快照）
+
+        Args:
+            names (Iterable[str]): 要查询的laptop_name集合
+
+        Returns:
+            Dict[str, Tuple[str, str, str]]: laptop_name -> (db_pred, db_pred_score, db_gt)
+        """
+        if self._gt_index is None:
+            if not self.db_path.exists():
+                self.logger.warning(f"数据库文件不存在: {self.db_path}")
+                return {name: DB_SENTINEL_NO_DB for name in names}
+            try:
+                self._gt_index = GroundTruthIndex.load_cached(str(self.db_path), self.created_after,
+                                                              snapshot_path=self.gt_snapshot_path,
+                                                              conn=self._connect_db())
+            except Exception as e:
+                self.logger.error(f"建立内存索引时出错: {str(e)}")
+                return {name: DB_SENTINEL_ERROR for name in names}
+        return self._gt_index.lookup(names)
+
+    def load_box_evaluator(self) -> Optional[BoxEvaluator]:
+        """
+        一次性读取数据库中的人工标注框并创建框级评估器，数据库不存在或缺少标注表时跳过评估
+
+        Returns:
+            Optional[BoxEvaluator]: 评估器，无法读取标注时为 None
+        """
+        if not self.db_path.exists():
+            self.logger.warning(f"数据库文件不存在: {self.db_path}，跳过框级评估")
+            return None
+        try:
+            with self.metrics.stage("annotations"):
+                return load_evaluator(str(self.db_path), self.created_after, self.box_eval_config)
+        except Exception as e:
+            self.logger.error(f"读取人工标注框时出错，跳过框级评估: {str(e)}")
+            return None
+
+    def close_db(self):
+        """
+        关闭处理过程中复用的数据库连接
+        """
+        if self._db_conn is not None:
+            self._db_conn.close()
+            self._db_conn = None
+
+    def write_to_csv(self, all_results: List[ResultRow]):
         """
         将结果写入 CSV 文件，使用字符串格式存储mask_miss字段
 
         Args:
-            all_results (List[Dict[str, Any]]): 提取的所有信息
+            all_results (List[ResultRow]): 提取的所有信息
         """
         if not all_results:
             self.logger.warning("没有数据要写入CSV")
             return
 
+        writers = self.create_writers()
         try:
-            # 将结果保存为JSON文件，这样可以保留列表格式
-            json_file = self.output_csv.with_suffix('.json')
-            with open(json_file, 'w', encoding='utf-8') as f:
-                json.dump(all_results, f, ensure_ascii=False, indent=2)
-            self.logger.info(f"成功将数据写入 {json_file}")
-
-            # 准备CSV数据，将mask_miss转换为字符串
-            csv_results = []
-            for result in all_results:
-                csv_result = result.copy()
-                if isinstance(csv_result['mask_miss'], list):
-                    csv_result['mask_miss'] = ', '.join(csv_result['mask_miss'])
-                csv_results.append(csv_result)
-
-            # 定义CSV字段，添加新字段
-            fieldnames = [
-                'laptop_key', 'defect', 'score',
-                'area_name', 'boxes', 'matched_score',
-                'timestamp', 'qc_result_file', 'mask_miss',
-                'laptop_name', 'db_pred', 'db_pred_score', 'db_gt'
-            ]
-
-            # 使用标准CSV写入器
-            with open(self.output_csv, 'w', newline='', encoding='utf-8-sig') as f:
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(csv_results)
-
-            self.logger.info(f"成功将数据写入 {self.output_csv}")
-            self.logger.info(f"总共处理了 {len(all_results)} 条记录")
+            for writer in writers:
+                writer.write_rows(all_results)
+            for writer in writers:
+                writer.close()
         except Exception as e:
+            for writer in writers:
+                writer.abort()
             self.logger.error(f"写入文件时发生错误: {str(e)}")
 
+    def create_writers(self, append: bool = False) -> List[Any]:
+        """
+        根据 output_formats 创建输出器，每个输出器提供 write_rows / close / abort
+
+        Args:
+            append (bool): 追加到已有的 CSV / JSON 文件（监视模式），列式格式不支持追加，不创建；
+                SQLite 结果库按 (laptop_key, timestamp) upsert，两种情况相同
+
+        Returns:
+            List[Any]: 输出器列表
+        """
+        writers: List[Any] = []
+        write_csv = "csv" in self.output_formats
+        write_json = "json" in self.output_formats
+        if write_csv or write_json:
+            writers.append(StreamingResultWriter(self.output_csv, self.json_format,
+                                                 write_csv=write_csv, write_json=write_json, append=append))
+        for fmt in self.output_formats:
+            if fmt in COLUMNAR_FORMATS and not append:
+                writers.append(ColumnarResultWriter(self.output_csv, fmt))
+        if "sqlite" in self.output_formats:
+            writers.append(ResultsStoreWriter(self.output_csv))
+        return writers
+
+    def _log_failure(self, load: FolderLoad, error_files: int):
+        """
+        记录单个文件夹的处理失败信息
+
+        Args:
+            load (FolderLoad): 失败的文件夹
+            error_files (int): 当前失败序号
+        """
+        if load.failure == "read":
+            reason = "文件读取失败 - 无法读取或解析JSON文件"
+        else:
+            reason = "数据处理失败 - 无法从JSON数据中提取有效信息"
+        json_file = load.json_file
+        self.logger.error(f"""
+==================== 处理失败 #{error_files} ====================
+文件路径: {json_file}
+所在文件夹: {json_file.parent}
+文件夹名称: {json_file.parent.name}
+QC文件: {load.qc_result_file if load.qc_result_file else '未找到'}
+Inference文件: {load.inference_file if load.inference_file else '未找到'}
+失败原因: {reason}{f"{chr(10)}工作单元: {load.worker}" if self.workers > 1 else ""}
+=======================================================
+""")
+
     def process(self):
         """
         执行完整的处理流程
+
+        文件夹按 batch_size 分批：先读取并解析整批文件，再对整批 laptop_name
+        做一次数据库批量查询，最后生成结果行并立即流式写入输出文件，内存占用与批大小相关。
+        文件夹查找以生成器方式进行，第一批找到后即开始处理。
+        execution="pipeline" 时改为由有界队列连接的并发阶段（见 pipeline.py）。
+        source="db" 时不遍历文件夹，改为流式读取数据库中的推理事件（见 process_db_source）。
+        各阶段耗时、计数和单文件耗时分布记录在 self.metrics 中，结束时输出汇总表格和 JSON 报告。
         """
-        file_tuples = self.find_json_files()
-        all_results = []
-        processed_files = 0
-        error_files = 0
+        tally = self._start_run()
+        writers = self.create_writers()
 
         self.logger.info(f"\n{'='*50}")
         self.logger.info(f"程序开始时间: 2025-03-20 02:44:05 UTC")
         self.logger.info(f"程序执行用户: hmjack2008")
         self.logger.info(f"{'='*50}\n")
 
-        for json_file, qc_result_file, inference_file in file_tuples:
-            self.logger.info(f"处理文件: {json_file}")
-
-            # 读取 inference_ 文件提取 mask_miss 信息
-            mask_miss_areas = self.read_inference_file(json_file.parent, inference_file)
-            self.logger.info(f"从 {inference_file if inference_file else '(未找到inference文件)'} 中提取的mask_miss区域: {mask_miss_areas}")
+        try:
+            with ExitStack() as stack:
+                io_pool = parse_pool = None
+                if self.workers > 1:
+                    if self.execution == "batch" and self.source == "folders":
+                        io_pool = stack.enter_context(
+                            ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="io"))
+                    if self.worker_mode == "process":
+                        parse_pool = stack.enter_context(ProcessPoolExecutor(max_workers=self.workers))
+                    self.logger.info(f"并行处理模式: {self.worker_mode}, 工作单元数: {self.workers}")
+                stack.callback(self.close_db)
+                if self.discovery.archives:
+                    stack.callback(archive_io.close_archives)
+                manifest = None
+                if self.manifest_path is not None:
+                    manifest = stack.enter_context(ScanManifest(self.manifest_path, self.input_folder))
 
-            json_data = self.read_json_file(json_file)
-            if json_data:
-                results = self.process_json_data(json_data, qc_result_file, mask_miss_areas)
-                if results:
-                    all_results.extend(results)
-                    processed_files += 1
+                if self.source == "db":
+                    self.process_db_source(writers, tally, parse_pool)
                 else:
-                    error_files += 1
-                    self.logger.error(f"""
-==================== 处理失败 #{error_files} ====================
-文件路径: {json_file}
-所在文件夹: {json_file.parent}
-文件夹名称: {json_file.parent.name}
-QC文件: {qc_result_file if qc_result_file else '未找到'}
-Inference文件: {inference_file if inference_file else '未找到'}
-失败原因: 数据处理失败 - 无法从JSON数据中提取有效信息
-=======================================================
-""")
-            else:
-                error_files += 1
-                self.logger.error(f"""
-==================== 处理失败 #{error_files} ====================
-文件路径: {json_file}
-所在文件夹: {json_file.parent}
-文件夹名称: {json_file.parent.name}
-QC文件: {qc_result_file if qc_result_file else '未找到'}
-Inference文件: {inference_file if inference_file else '未找到'}
-失败原因: 文件读取失败 - 无法读取或解析JSON文件
-=======================================================
-""")
+                    discovered = self.metrics.timed_iter("discovery", self.iter_json_files())
+                    progress = None
+                    if self.progress_interval:
+                        progress = ProgressReporter(self.logger, self.progress_interval)
+                        discovered = progress.track(discovered)
+                    if self.execution == "pipeline":
+                        StagePipeline(self, writers, manifest, parse_pool, progress,
+                                      queue_size=self.queue_size).run(discovered, tally)
+                    else:
+                        for batch in batched(discovered, self.batch_size):
+                            self.process_batch(list(batch), writers, tally, io_pool, parse_pool, manifest)
+                            if progress is not None:
+                                progress.advance(len(batch))
+
+                    self.logger.info(f"找到 {tally.found_files} 个 laptop_infers.json 文件")
+                    if manifest is not None and self._discovery_errors:
+                        # 遍历不完整时无法区分“已删除”与“暂时无法访问”的文件夹，保留清单中的记录
+                        self.logger.warning(f"遍历过程中有 {len(self._discovery_errors)} 个目录无法访问，"
+                                            f"本次不清理扫描清单")
+                    elif manifest is not None:
+                        if self.shard is None:
+                            manifest.prune()
+                        else:
+                            # 分片共用清单时只删除属于本分片的记录
+                            manifest.prune(lambda key: self._owns_folder((self.input_folder / key).parent))
+        except BaseException:
+            # 保留 .part 文件中已写入的部分结果
+            for writer in writers:
+                writer.abort()
+            raise
+
+        self._log_run_summary(tally)
+
+        with self.metrics.stage("write"):
+            for writer in writers:
+                writer.close()
+        if self.shard is not None:
+            write_failure_summary(failures_path(self.output_csv), tally.failures,
+                                  tally.found_files, tally.processed_files)
+        self.report_metrics()
+
+    def watch(self, options: Optional[WatchOptions] = None, stop_event: Optional[threading.Event] = None):
+        """
+        监视模式：常驻运行，处理输入目录中新出现的文件夹，结果追加到 CSV / JSON 输出文件
 
+        新文件夹由 inotify（不可用时定期轮询）发现，内容在 settle_seconds 秒内不再变化后按 batch_size 分批处理；
+        数据库连接、线程池/进程池在整个监视期间复用，每轮写入完成后输出文件都是完整有效的。
+        中断（Ctrl+C）、设置 stop_event 或空闲超过 idle_timeout 时停止，输出汇总与指标报告。
+
+        Args:
+            options (Optional[WatchOptions]): 监视模式选项，为 None 时使用默认选项
+            stop_event (Optional[threading.Event]): 设置后在下一次检查时停止
+        """
+        if self.source == "db":
+            raise ValueError("监视模式只支持文件夹输入 (source=\"folders\")")
+        options = options or WatchOptions()
+        if options.process_existing:
+            self.process()
+        if self.db_lookup == "index":
+            self.logger.warning("监视模式下新笔记本不在启动时建立的内存索引中，改为批量查询数据库")
+            self.db_lookup = "batch"
+        if any(fmt in COLUMNAR_FORMATS for fmt in self.output_formats):
+            self.logger.warning("列式格式不支持追加，监视模式下只输出 CSV / JSON")
+        if self.manifest_path is not None:
+            self.logger.warning("监视模式不使用扫描清单，新文件夹的结果不会写入清单")
+        if self._db_immutable:
+            self.logger.warning("监视模式下数据库会被持续写入，不使用 immutable 方式打开")
+            self._db_immutable = False
+            self.close_db()
+        tally = self._start_run()
+
+        seen = {str(file_tuple[0].parent) for file_tuple in self.iter_json_files()}
+        self.logger.info(f"监视模式: 已有 {len(seen)} 个文件夹，等待新文件夹（内容 {options.settle_seconds:g} 秒不变后处理）")
+        tracker = SettleTracker(options.settle_seconds, self._watched_file_tuple, options.incomplete_grace)
+        try:
+            with ExitStack() as stack:
+                io_pool = parse_pool = None
+                if self.workers > 1:
+                    io_pool = stack.enter_context(ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="io"))
+                    if self.worker_mode == "process":
+                        parse_pool = stack.enter_context(ProcessPoolExecutor(max_workers=self.workers))
+                stack.callback(self.close_db)
+                watcher = stack.enter_context(open_watcher(options, self._watch_roots(), self.discovery,
+                                                                 self.iter_json_files))
+                last_activity = time.monotonic()
+                while stop_event is None or not stop_event.is_set():
+                    candidates = watcher.poll(WATCH_TICK)
+                    if watcher.needs_rescan:
+                        watcher.needs_rescan = False
+                        candidates.update(str(file_tuple[0].parent) for file_tuple in self.iter_json_files())
+                    tracker.add(folder for folder in candidates if folder not in seen)
+                    now = time.monotonic()
+                    ready = tracker.ready(now)
+                    if ready:
+                        seen.update(str(file_tuple[0].parent) for file_tuple in ready)
+                        self._process_watched(ready, tally, io_pool, parse_pool)
+                        last_activity = time.monotonic()
+                    elif (options.idle_timeout is not None and not tracker.pending
+                          and now - last_activity >= options.idle_timeout):
+                        self.logger.info(f"已 {options.idle_timeout:g} 秒没有新文件夹，退出监视模式")
+                        break
+        except KeyboardInterrupt:
+            self.logger.info("监视模式已中断")
+
+        self._log_run_summary(tally)
+        self.report_metrics()
+
+    def _watched_file_tuple(self, folder: str) -> Optional[Tuple[Path, str, str]]:
+        """
+        监视模式下检查一个候选文件夹，不含 laptop_infers.json 或不属于本分片时返回 None
+        """
+        folder_path = Path(folder)
+        if self.shard is not None and not self._owns_folder(folder_path):
+            return None
+        root = next((root for root in self._watch_roots() if folder_path.is_relative_to(root)), self.input_folder)
+        return scan_folder(folder_path, root, self.discovery)
+
+    def _watch_roots(self) -> List[Path]:
+        """
+        监视模式下监视的根目录：分片指定的子目录，或输入目录
+        """
+        if self.shard is not None and self.shard.roots:
+            return [self.input_folder / root for root in self.shard.roots]
+        return [self.input_folder]
+
+    def _process_watched(self, ready: List[Tuple[Path, str, str]], tally: RunTally,
+                         io_pool: Optional[ThreadPoolExecutor], parse_pool: Optional[ProcessPoolExecutor]):
+        """
+        处理一轮写入完成的新文件夹并追加到输出文件，每轮结束时关闭输出文件
+        """
+        processed, failed = tally.processed_files, tally.error_files
+        writers = self.create_writers(append=True)
+        try:
+            for batch in batched(ready, self.batch_size):
+                self.process_batch(list(batch), writers, tally, io_pool, parse_pool)
+        except BaseException:
+            for writer in writers:
+                writer.abort()
+            raise
+        with self.metrics.stage("write"):
+            for writer in writers:
+                writer.close()
+        self.metrics.incr("watch_cycles")
+        self.logger.info(f"监视模式: 本轮处理 {len(ready)} 个新文件夹，成功 {tally.processed_files - processed} 个，"
+                         f"失败 {tally.error_files - failed} 个，累计 {tally.found_files} 个")
+
+    def _start_run(self) -> RunTally:
+        """
+        重置一次运行的指标与统计（瑕疵统计、阈值扫描、框级评估）
+
+        Returns:
+            RunTally: 本次运行的计数
+        """
+        self.metrics = PipelineMetrics()
+        self.analytics = DefectAnalytics() if self.analytics_path is not None else None
+        self.sweep = ThresholdSweep(self.sweep_grid) if self.sweep_grid is not None else None
+        self.box_eval = self.load_box_evaluator() if self.box_eval_config is not None else None
+        # 每次运行重新建立内存索引（或读取仍然有效的快照），避免使用过期数据
+        self._gt_index = None
+        self._discovery_errors = []
+        return RunTally()
+
+    def process_batch(self, batch: List[Tuple[Path, str, str]], writers: Sequence[Any], tally: RunTally,
+                      io_pool: Optional[ThreadPoolExecutor] = None,
+                      parse_pool: Optional[ProcessPoolExecutor] = None,
+                      manifest: Optional[ScanManifest] = None):
+        """
+        处理一批文件夹：读取并解析、对整批 laptop_name 做一次数据库查询、生成结果行并写入各输出器
+
+        Args:
+            batch (List[Tuple[Path, str, str]]): 文件元组列表
+            writers (Sequence[Any]): 结果输出器
+            tally (RunTally): 本次运行的计数
+            io_pool (Optional[ThreadPoolExecutor]): I/O 线程池，为 None 时串行处理
+            parse_pool (Optional[ProcessPoolExecutor]): 解析进程池，为 None 时在线程内解析
+            manifest (Optional[ScanManifest]): 扫描清单，设置后未变化的文件夹复用缓存，新结果写回清单
+        """
+        tally.found_files += len(batch)
+        if manifest is not None:
+            loads = self._load_batch_incremental(batch, io_pool, parse_pool, manifest)
+        else:
+            loads = self._load_batch(batch, io_pool, parse_pool)
+        with self.metrics.stage("db_lookup"):
+            db_infos = self.enrich_batch(loads)
+
+        batch_results = []
+        new_entries = []
+        for load in loads:
+            results = self.results_for_load(load, db_infos)
+            if results and manifest is not None and load.cached_rows is None:
+                new_entries.append((load.json_file, load.qc_result_file, load.inference_file,
+                                    load.laptop_name, results))
+            batch_results.extend(results)
+            self.record_load(load, results, tally)
+        with self.metrics.stage("write"):
+            for writer in writers:
+                writer.write_rows(batch_results)
+        self.metrics.incr("rows_written", len(batch_results))
+        if new_entries:
+            manifest.store(new_entries)
+
+    def process_db_source(self, writers: Sequence[Any], tally: RunTally,
+                          parse_pool: Optional[ProcessPoolExecutor] = None):
+        """
+        数据库输入模式：流式读取 inference_events 连接 laptops、laptop_defect_predictions 的查询结果，
+        每条笔记本记录相当于一个文件夹，按 batch_size 分批验证、生成结果行并写入
+
+        Args:
+            writers (Sequence[Any]): 结果输出器
+            tally (RunTally): 本次运行的计数
+            parse_pool (Optional[ProcessPoolExecutor]): 解析进程池，为 None 时在当前线程解析
+        """
+        conn = self._connect_db()
+        if conn is None:
+            self.logger.error(f"无法打开数据库 {self.db_path}，没有可处理的推理事件")
+            return
+        laptops = self.metrics.timed_iter("db_source",
+                                          iter_event_laptops(conn, self.created_after, self.db_fetch_size))
+        progress = None
+        if self.progress_interval:
+            progress = ProgressReporter(self.logger, self.progress_interval)
+            laptops = progress.track(laptops)
+        try:
+            for batch in batched(laptops, self.batch_size):
+                self.process_event_batch(list(batch), writers, tally, parse_pool)
+                if progress is not None:
+                    progress.advance(len(batch))
+        except sqlite3.Error as e:
+            self.logger.error(f"读取推理事件时出错: {str(e)}")
+        self.logger.info(f"从数据库读取 {tally.found_files} 条笔记本记录")
+
+    def process_event_batch(self, batch: List[EventLaptop], writers: Sequence[Any], tally: RunTally,
+                            parse_pool: Optional[ProcessPoolExecutor] = None):
+        """
+        处理一批数据库中的笔记本记录：验证拼接的 JSON、使用连接查询得到的预测信息生成结果行并写入
+
+        Args:
+            batch (List[EventLaptop]): 笔记本记录
+            writers (Sequence[Any]): 结果输出器
+            tally (RunTally): 本次运行的计数
+            parse_pool (Optional[ProcessPoolExecutor]): 解析进程池，为 None 时在当前线程解析
+        """
+        tally.found_files += len(batch)
+        self.metrics.incr("db_events", sum(item.events for item in batch))
+        loads = [FolderLoad(self.db_path / "laptops" / str(item.laptop_id), item.qc_result_file, "", NO_LOG,
+                            raw_json=item.raw_json) for item in batch]
+        if parse_pool is None:
+            for load in loads:
+                self._apply_parsed(load, _parse_json_worker(load.raw_json, self.parse_mode))
+        else:
+            chunksize = max(1, len(loads) // (self.workers * 4))
+            parsed = parse_pool.map(partial(_parse_json_worker, parse_mode=self.parse_mode),
+                                    [load.raw_json for load in loads], chunksize=chunksize)
+            for load, result in zip(loads, parsed):
+                self._apply_parsed(load, result)
+
+        batch_results = []
+        for item, load in zip(batch, loads):
+            self.metrics.observe_file(load.elapsed)
+            results = []
+            if load.inference_output is not None:
+                results = self.build_results(load.inference_output, load.qc_result_file,
+                                             load.mask_miss_areas, item.db_info)
+                if not results:
+                    load.failure = "parse"
+            batch_results.extend(results)
+            self.record_load(load, results, tally)
+        with self.metrics.stage("write"):
+            for writer in writers:
+                writer.write_rows(batch_results)
+        self.metrics.incr("rows_written", len(batch_results))
+
+    def _log_run_summary(self, tally: RunTally):
+        """
+        输出处理结果摘要并记录成功/失败数量
+        """
         self.logger.info(f"\n{'='*50}")
         self.logger.info(f"处理完成时间: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')} UTC")
         self.logger.info(f"处理结果摘要:")
-        self.logger.info(f"- 成功处理: {processed_files} 个文件")
-        self.logger.info(f"- 处理失败: {error_files} 个文件")
-        if error_files > 0:
+        self.metrics.incr("files_processed", tally.processed_files)
+        self.metrics.incr("files_failed", tally.error_files)
+        self.logger.info(f"- 成功处理: {tally.processed_files} 个文件")
+        self.logger.info(f"- 处理失败: {tally.error_files} 个文件")
+        if tally.error_files > 0:
+            if self.workers > 1:
+                for worker, count in sorted(tally.worker_errors.items()):
+                    self.logger.info(f"  - {worker}: {count} 个文件失败")
             self.logger.info(f"- 详细的失败记录请查看上方日志")
         self.logger.info(f"{'='*50}\n")
 
-        self.write_to_csv(all_results)
+    def report_metrics(self):
+        """
+        输出指标汇总表格并写入 JSON 报告
+        """
+        self.metrics.finish()
+        self.logger.info("性能指标:")
+        for line in self.metrics.summary_lines():
+            self.logger.info(f"  {line}")
+        try:
+            self.metrics.write_report(self.metrics_path)
+            self.logger.info(f"指标报告已写入 {self.metrics_path}")
+        except Exception as e:
+            self.logger.error(f"写入指标报告时发生错误: {str(e)}")
+        if self.analytics is not None:
+            for line in self.analytics.summary_lines():
+                self.logger.info(line)
+            try:
+                self.analytics.write_report(self.analytics_path)
+                self.logger.info(f"瑕疵统计报告已写入 {self.analytics_path}")
+            except Exception as e:
+                self.logger.error(f"写入瑕疵统计报告时发生错误: {str(e)}")
+        if self.sweep is not None:
+            for line in self.sweep.summary_lines():
+                self.logger.info(line)
+            try:
+                self.sweep.write_csv(self.sweep_path)
+                self.logger.info(f"阈值扫描结果已写入 {self.sweep_path}")
+            except Exception as e:
+                self.logger.error(f"写入阈值扫描结果时发生错误: {str(e)}")
+        if self.box_eval is not None:
+            report = self.box_eval.to_dict()
+            for line in self.box_eval.summary_lines(report):
+                self.logger.info(line)
+            try:
+                self.box_eval.write_report(self.box_eval_path, report)
+                self.logger.info(f"框级评估报告已写入 {self.box_eval_path}")
+            except Exception as e:
+                self.logger.error(f"写入框级评估报告时发生错误: {str(e)}")
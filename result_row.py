@@ -0,0 +1,132 @@
+"""  python 模組文件名 : result_row.py
+
+result_row.py 定义结果行 ResultRow：每条推理记录一行，前 13 个字段即输出字段（CSV 字段顺序），
+末尾的 model_key / version 只用于统计分析，不写入输出文件
+
+ResultRow 是 NamedTuple（没有每实例的 __dict__），内存约为同样 13 个键的 dict 的四分之一；
+laptop_name、area_name、qc_result_file 和数据库字段等大量重复的字符串通过 sys.intern 共享同一个对象
+
+"""
+
+import sys
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+
+def intern_str(value: Any) -> Any:
+    """
+    字符串返回 sys.intern 后的共享对象，其他值原样返回
+    """
+    return sys.intern(value) if type(value) is str else value
+
+
+def intern_db_info(db_info: Tuple[str, str, str]) -> Tuple[str, str, str]:
+    """
+    共享数据库查询结果中的 db_pred / db_gt 字符串（取值只有少数几种，db_pred_score 不做处理）
+
+    Args:
+        db_info (Tuple[str, str, str]): (db_pred, db_pred_score, db_gt)
+
+    Returns:
+        Tuple[str, str, str]: 相同取值的元组
+    """
+    db_pred, db_pred_score, db_gt = db_info
+    return sys.intern(db_pred), db_pred_score, sys.intern(db_gt)
+
+
+class ResultRow(NamedTuple):
+    """一条推理记录的结果行"""
+    laptop_key: str
+    defect: Optional[bool]
+    score: Optional[float]
+    area_name: Optional[str]
+    # 原始坐标列表，CSV/JSON 输出时转换为字符串（合并分片时读回的已是字符串）
+    boxes: Any
+    matched_score: Optional[float]
+    timestamp: Optional[str]
+    qc_result_file: str
+    # 同一文件夹的所有行共享同一个列表
+    mask_miss: List[str]
+    laptop_name: str
+    db_pred: Optional[str]
+    db_pred_score: Optional[str]
+    db_gt: Optional[str]
+    # 以下字段不写入输出文件
+    model_key: Optional[str] = None
+    version: Optional[str] = None
+
+    def with_db_info(self, db_info: Tuple[str, str, str]) -> "ResultRow":
+        """
+        替换数据库字段
+
+        Args:
+            db_info (Tuple[str, str, str]): (db_pred, db_pred_score, db_gt)
+
+        Returns:
+            ResultRow: 新的结果行
+        """
+        return self._replace(db_pred=db_info[0], db_pred_score=db_info[1], db_gt=db_info[2])
+
+    @classmethod
+    def from_dict(cls, record: Dict[str, Any]) -> "ResultRow":
+        """
+        由 CSV/JSON 记录（字段名 -> 值）构造结果行，缺少的字段为 None
+
+        Args:
+            record (Dict[str, Any]): 记录
+
+        Returns:
+            ResultRow: 结果行
+        """
+        return cls._make(intern_str(record.get(name)) if name in INTERNED_FIELDS else record.get(name)
+                         for name in cls._fields)
+
+
+# 写入输出文件的字段（即 CSV 字段顺序），位于 ResultRow 开头
+OUTPUT_FIELDS: Tuple[str, ...] = ResultRow._fields[:ResultRow._fields.index('db_gt') + 1]
+OUTPUT_FIELD_COUNT = len(OUTPUT_FIELDS)
+# 取值大量重复、需要共享的字符串字段
+INTERNED_FIELDS = frozenset(('laptop_name', 'area_name', 'qc_result_file', 'db_pred', 'db_gt', 'model_key', 'version'))
+
+
+def pack_folder_rows(rows: Sequence[ResultRow]) -> Dict[str, Any]:
+    """
+    将一个文件夹的结果行转换为扫描清单中保存的紧凑形式（可 JSON 序列化，不含数据库字段）：
+    laptop_key、qc_result_file、mask_miss、laptop_name 在同一文件夹的各行中相同，只保存一次
+
+    Args:
+        rows (Sequence[ResultRow]): 同一文件夹的结果行
+
+    Returns:
+        Dict[str, Any]: {"folder": [laptop_key, qc_result_file, mask_miss, laptop_name],
+                         "rows": [[defect, score, area_name, boxes, matched_score, timestamp,
+                                   model_key, version], ...]}
+    """
+    if not rows:
+        return {"folder": None, "rows": []}
+    first = rows[0]
+    return {
+        "folder": [first.laptop_key, first.qc_result_file, first.mask_miss, first.laptop_name],
+        "rows": [[row.defect, row.score, row.area_name, row.boxes, row.matched_score, row.timestamp,
+                  row.model_key, row.version] for row in rows],
+    }
+
+
+def unpack_folder_rows(packed: Dict[str, Any]) -> List[ResultRow]:
+    """
+    由 pack_folder_rows 的结果还原结果行，数据库字段为 None，同一文件夹的各行共享相同的对象
+
+    Args:
+        packed (Dict[str, Any]): pack_folder_rows 的结果（JSON 读回）
+
+    Returns:
+        List[ResultRow]: 结果行
+    """
+    if not packed["rows"]:
+        return []
+    laptop_key, qc_result_file, mask_miss, laptop_name = packed["folder"]
+    qc_result_file = intern_str(qc_result_file)
+    laptop_name = intern_str(laptop_name)
+    return [ResultRow(laptop_key, defect, score, intern_str(area_name), boxes, matched_score, timestamp,
+                      qc_result_file, mask_miss, laptop_name, None, None, None,
+                      intern_str(model_key), intern_str(version))
+            for defect, score, area_name, boxes, matched_score, timestamp, model_key, version in packed["rows"]]
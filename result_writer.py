@@ -0,0 +1,283 @@
+"""  python 模組文件名 : result_writer.py
+
+result_writer.py 提供流式写入结果行的 CSV / JSON 输出器，
+每处理完一批文件夹就追加写入，最后通过原子重命名生成正式文件；
+追加模式（监视模式使用）直接在已有的正式文件末尾追加记录，每次 close() 后文件都是完整有效的
+
+"""
+
+import csv
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from result_row import OUTPUT_FIELD_COUNT, OUTPUT_FIELDS, ResultRow
+
+# CSV 字段顺序（与 ResultRow 的输出字段顺序相同）
+CSV_FIELDNAMES = list(OUTPUT_FIELDS)
+
+_BOXES_INDEX = CSV_FIELDNAMES.index('boxes')
+_MASK_MISS_INDEX = CSV_FIELDNAMES.index('mask_miss')
+
+# 写入过程中使用的临时文件后缀，处理中断时保留已写入的部分结果
+PARTIAL_SUFFIX = '.part'
+
+
+class StreamingResultWriter:
+    """
+    流式结果输出器
+
+    CSV 与 JSON 先写入 `<文件名>.part` 临时文件，每批结果写入后立即 flush，
+    close() 时原子重命名为正式文件。程序中途崩溃时 .part 文件中保留已处理的结果。
+    """
+
+    def __init__(self, output_csv: Path, json_format: str = "json",
+                 write_csv: bool = True, write_json: bool = True, append: bool = False):
+        """
+        初始化输出器
+
+        Args:
+            output_csv (Path): 输出CSV文件的路径，JSON 文件与其同名
+            json_format (str): "json" 输出与原来相同的 JSON 数组 (.json)；
+                               "jsonl" 每行一条记录 (.jsonl)，中断后的部分结果可直接读取
+            write_csv (bool): 是否输出 CSV
+            write_json (bool): 是否输出 JSON
+            append (bool): 追加到已有的正式文件（不使用 .part 临时文件）：CSV 文件不存在或为空时才写表头，
+                           JSON 数组去掉末尾的 "]" 后继续写入，close() 时补回
+        """
+        if json_format not in ("json", "jsonl"):
+            raise ValueError(f"不支持的 json_format: {json_format}")
+        if not (write_csv or write_json):
+            raise ValueError("write_csv 和 write_json 至少需要一个为 True")
+        self.write_csv = write_csv
+        self.write_json = write_json
+        self.output_csv = Path(output_csv)
+        self.json_format = json_format
+        self.append = append
+        self.json_file = self.output_csv.with_suffix('.jsonl' if json_format == "jsonl" else '.json')
+        self.rows_written = 0
+        self.logger = logging.getLogger(__name__)
+        self._csv_handle = None
+        self._json_handle = None
+        self._csv_writer = None
+        self._opened = False
+        # JSON 数组中已有的记录数（追加模式下包括文件中原有的记录），决定是否需要写逗号
+        self._json_records = 0
+
+    @staticmethod
+    def partial_path(path: Path) -> Path:
+        """
+        返回正式文件对应的临时文件路径
+
+        Args:
+            path (Path): 正式文件路径
+
+        Returns:
+            Path: 临时文件路径
+        """
+        return path.with_name(path.name + PARTIAL_SUFFIX)
+
+    def open(self):
+        """
+        创建临时文件并写入 CSV 表头
+        """
+        self.rows_written = 0
+        self._json_records = 0
+        if self.append:
+            self._open_append()
+            return
+        if self.write_csv:
+            self._csv_handle = open(self.partial_path(self.output_csv), 'w', newline='', encoding='utf-8-sig')
+            self._csv_writer = csv.writer(self._csv_handle)
+            self._csv_writer.writerow(CSV_FIELDNAMES)
+        if self.write_json:
+            self._json_handle = open(self.partial_path(self.json_file), 'w', encoding='utf-8')
+            if self.json_format == "json":
+                self._json_handle.write('[')
+        self._opened = True
+
+    def _open_append(self):
+        """
+        以追加方式打开正式文件
+        """
+        if self.write_csv:
+            has_header = self.output_csv.exists() and self.output_csv.stat().st_size > 0
+            self._csv_handle = open(self.output_csv, 'a', newline='', encoding='utf-8-sig')
+            self._csv_writer = csv.writer(self._csv_handle)
+            if not has_header:
+                self._csv_writer.writerow(CSV_FIELDNAMES)
+        if self.write_json:
+            if self.json_format == "json":
+                self._json_handle = self._reopen_json_array()
+            else:
+                self._json_handle = open(self.json_file, 'a', encoding='utf-8')
+        self._opened = True
+
+    def _reopen_json_array(self):
+        """
+        打开已有的 JSON 数组文件并截掉末尾的 "]"，文件不存在时新建数组
+
+        Raises:
+            ValueError: 已有文件不是以 "]" 结尾的 JSON 数组
+        """
+        if not self.json_file.exists() or self.json_file.stat().st_size == 0:
+            handle = open(self.json_file, 'w', encoding='utf-8')
+            handle.write('[')
+            return handle
+        with open(self.json_file, 'rb+') as raw:
+            raw.seek(0, os.SEEK_END)
+            size = raw.tell()
+            raw.seek(max(0, size - 2))
+            tail = raw.read()
+            if tail == b'[]' and size == 2:
+                raw.truncate(1)
+            elif tail.endswith(b'\n]'):
+                raw.truncate(size - 2)
+                self._json_records = 1
+            else:
+                raise ValueError(f"无法追加到 {self.json_file}：文件不是以 ']' 结尾的 JSON 数组")
+        return open(self.json_file, 'a', encoding='utf-8')
+
+    def write_rows(self, rows: Iterable[ResultRow]):
+        """
+        追加写入一批结果行并 flush
+
+        Args:
+            rows (Iterable[ResultRow]): 结果行
+        """
+        if not self._opened:
+            self.open()
+        for row in rows:
+            if self.write_csv:
+                self._csv_writer.writerow(self._csv_values(row))
+            if self.write_json:
+                record = self._output_record(row)
+                if self.json_format == "json":
+                    # 与 json.dump(all_results, indent=2) 的输出逐字节一致
+                    text = json.dumps(record, ensure_ascii=False, indent=2).replace('\n', '\n  ')
+                    self._json_handle.write((',\n  ' if self._json_records else '\n  ') + text)
+                    self._json_records += 1
+                else:
+                    self._json_handle.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self.rows_written += 1
+        self.flush()
+
+    @staticmethod
+    def _output_record(row: ResultRow) -> Dict[str, Any]:
+        """
+        转换为 JSON 输出使用的记录：boxes 保持原有的字符串形式
+
+        Args:
+            row (ResultRow): 结果行
+
+        Returns:
+            Dict[str, Any]: 输出记录
+        """
+        record = dict(zip(OUTPUT_FIELDS, row))
+        if isinstance(row.boxes, list):
+            record['boxes'] = str(row.boxes)
+        return record
+
+    @staticmethod
+    def _csv_values(row: ResultRow) -> List[Any]:
+        """
+        按 CSV 字段顺序取值，boxes 转换为字符串，mask_miss 转换为逗号分隔的字符串
+
+        Args:
+            row (ResultRow): 结果行
+
+        Returns:
+            List[Any]: CSV 行
+        """
+        values = list(row[:OUTPUT_FIELD_COUNT])
+        if isinstance(values[_BOXES_INDEX], list):
+            values[_BOXES_INDEX] = str(values[_BOXES_INDEX])
+        if isinstance(values[_MASK_MISS_INDEX], list):
+            values[_MASK_MISS_INDEX] = ', '.join(values[_MASK_MISS_INDEX])
+        return ['' if value is None else value for value in values]
+
+    def _handles(self) -> List:
+        return [handle for handle in (self._csv_handle, self._json_handle) if handle is not None]
+
+    def _outputs(self) -> List[Path]:
+        outputs = []
+        if self.write_json:
+            outputs.append(self.json_file)
+        if self.write_csv:
+            outputs.append(self.output_csv)
+        return outputs
+
+    def flush(self):
+        """
+        将缓冲区内容写入磁盘
+        """
+        for handle in self._handles():
+            handle.flush()
+
+    def _close_handles(self):
+        """
+        关闭临时文件句柄
+        """
+        for handle in self._handles():
+            handle.close()
+        self._csv_handle = None
+        self._json_handle = None
+        self._csv_writer = None
+        self._opened = False
+
+    def close(self) -> bool:
+        """
+        完成写入：将临时文件原子重命名为正式文件。没有任何结果时删除临时文件
+
+        Returns:
+            bool: 是否生成了输出文件
+        """
+        if not self._opened:
+            self.logger.warning("没有数据要写入CSV")
+            return False
+        if self._json_handle is not None and self.json_format == "json":
+            self._json_handle.write('\n]' if self._json_records else ']')
+        self._close_handles()
+        if self.append:
+            if self.rows_written:
+                self.logger.info(f"已追加 {self.rows_written} 条记录到 {', '.join(map(str, self._outputs()))}")
+            return bool(self.rows_written)
+
+        if not self.rows_written:
+            for output in self._outputs():
+                self.partial_path(output).unlink(missing_ok=True)
+            self.logger.warning("没有数据要写入CSV")
+            return False
+
+        for output in self._outputs():
+            os.replace(self.partial_path(output), output)
+            self.logger.info(f"成功将数据写入 {output}")
+        self.logger.info(f"总共处理了 {self.rows_written} 条记录")
+        return True
+
+    def abort(self):
+        """
+        中止写入：关闭文件但保留 .part 临时文件中的部分结果
+        """
+        if self.append:
+            # 追加模式下补回 JSON 数组末尾的 "]"，保持文件有效
+            if self._json_handle is not None and self.json_format == "json":
+                self._json_handle.write('\n]' if self._json_records else ']')
+            self._close_handles()
+            return
+        self._close_handles()
+        if self.rows_written:
+            partials = ", ".join(str(self.partial_path(output)) for output in self._outputs())
+            self.logger.warning(f"写入中止，已写入的 {self.rows_written} 条记录保留在 {partials}")
+
+    def __enter__(self) -> "StreamingResultWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> Optional[bool]:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return None
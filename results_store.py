@@ -0,0 +1,389 @@
+"""  python 模組文件名 : results_store.py
+
+results_store.py 将结果行写入带索引的 SQLite 结果库（output_formats 中的 "sqlite"，文件与输出CSV同名的 .sqlite），
+查询“哪些笔记本在 Front_04 出现 mask_miss”“上周哪些分数超过阈值”时不需要重新读取整个 CSV / JSON：
+
+    results           每条推理记录一行，(laptop_key, timestamp) 唯一，重复运行时原地更新（upsert）
+    result_mask_miss  mask_miss 列表拆成多行 (result_id, position, area_name)，特殊值 none / no_log / error 原样保存
+    result_boxes      匹配的框坐标 (result_id, x1, y1, x2, y2)，只保存 4 个坐标的框
+
+写入方式：结果行先缓存，每 transaction_rows 行在一个事务中用 executemany 写入临时表，
+再以几条集合操作完成 upsert 与子表替换；写入期间数据库使用 WAL 模式，可以同时查询，
+关闭时做一次 checkpoint 并切换回 DELETE 日志模式，不留下 -wal / -shm 文件，结果库始终是单个文件。
+laptop_name / area_name / timestamp 等二级索引在第一次 close() 时建立（首次大批量写入时不维护索引），之后随写入更新
+
+子表替换使用 ->> 运算符与 JSON 函数，需要 SQLite 3.38 及以上（Python 链接的 sqlite3 库版本，见 HAS_STORE_SUPPORT）
+
+"""
+
+import json
+import logging
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from result_row import ResultRow, intern_str
+
+STORE_SUFFIX = '.sqlite'
+
+# ->> 运算符与内置 JSON 函数所需的最低 SQLite 版本
+MIN_SQLITE_VERSION = (3, 38, 0)
+HAS_STORE_SUPPORT = sqlite3.sqlite_version_info >= MIN_SQLITE_VERSION
+
+# 结果库结构版本（PRAGMA user_version）
+STORE_VERSION = 1
+
+# 每个事务写入的结果行数
+TRANSACTION_ROWS = 50000
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    laptop_key TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    laptop_name TEXT,
+    defect INTEGER,
+    score REAL,
+    area_name TEXT,
+    matched_score REAL,
+    qc_result_file TEXT,
+    db_pred TEXT,
+    db_pred_score TEXT,
+    db_gt TEXT,
+    model_key TEXT,
+    version TEXT,
+    UNIQUE (laptop_key, timestamp)
+);
+CREATE TABLE IF NOT EXISTS result_mask_miss (
+    result_id INTEGER NOT NULL REFERENCES results(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    area_name TEXT NOT NULL,
+    PRIMARY KEY (result_id, position)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS result_boxes (
+    result_id INTEGER PRIMARY KEY REFERENCES results(id) ON DELETE CASCADE,
+    x1 REAL,
+    y1 REAL,
+    x2 REAL,
+    y2 REAL
+);
+"""
+
+# 查询用的二级索引：(索引名, 表名, 列)
+SECONDARY_INDEXES: Tuple[Tuple[str, str, str], ...] = (
+    ("idx_results_laptop_name", "results", "laptop_name"),
+    ("idx_results_area_name", "results", "area_name"),
+    ("idx_results_timestamp", "results", "timestamp"),
+    ("idx_result_mask_miss_area_name", "result_mask_miss", "area_name"),
+)
+
+# 与 results 表列顺序相同的字段（不含 id）
+_RESULT_COLUMNS = ("laptop_key", "timestamp", "laptop_name", "defect", "score", "area_name", "matched_score",
+                   "qc_result_file", "db_pred", "db_pred_score", "db_gt", "model_key", "version")
+
+_STAGING_SQL = f"""
+CREATE TEMP TABLE IF NOT EXISTS result_staging (
+    seq INTEGER PRIMARY KEY,
+    {", ".join(_RESULT_COLUMNS)},
+    mask_miss TEXT,
+    boxes TEXT
+)
+"""
+
+_UPSERT_SQL = f"""
+INSERT INTO results ({", ".join(_RESULT_COLUMNS)})
+SELECT {", ".join(_RESULT_COLUMNS)} FROM temp.result_staging WHERE true ORDER BY seq
+ON CONFLICT (laptop_key, timestamp) DO UPDATE SET
+    {", ".join(f"{column} = excluded.{column}" for column in _RESULT_COLUMNS[2:])}
+"""
+
+# 本批结果行在 results 中的 id
+_STAGED_IDS = """
+SELECT r.id FROM temp.result_staging s
+JOIN results r ON r.laptop_key = s.laptop_key AND r.timestamp = s.timestamp
+"""
+
+_REPLACE_CHILDREN_SQL = (
+    f"DELETE FROM result_mask_miss WHERE result_id IN ({_STAGED_IDS})",
+    f"DELETE FROM result_boxes WHERE result_id IN ({_STAGED_IDS})",
+    """
+    INSERT INTO result_mask_miss (result_id, position, area_name)
+    SELECT r.id, j.key, j.value
+    FROM temp.result_staging s
+    JOIN results r ON r.laptop_key = s.laptop_key AND r.timestamp = s.timestamp,
+         json_each(s.mask_miss) j
+    WHERE s.mask_miss IS NOT NULL
+    """,
+    """
+    INSERT INTO result_boxes (result_id, x1, y1, x2, y2)
+    SELECT r.id, s.boxes ->> '$[0]', s.boxes ->> '$[1]', s.boxes ->> '$[2]', s.boxes ->> '$[3]'
+    FROM temp.result_staging s
+    JOIN results r ON r.laptop_key = s.laptop_key AND r.timestamp = s.timestamp
+    WHERE s.boxes IS NOT NULL AND json_array_length(s.boxes) = 4
+    """,
+    "DELETE FROM temp.result_staging",
+)
+
+
+def _boxes_json(boxes: Any) -> Optional[str]:
+    """
+    框坐标的 JSON 文本：坐标列表，或合并分片时读回的字符串形式（"[x1, y1, x2, y2]"）
+    """
+    if isinstance(boxes, (list, tuple)):
+        return json.dumps(list(boxes))
+    if isinstance(boxes, str) and boxes.startswith('['):
+        try:
+            return json.dumps(json.loads(boxes))
+        except ValueError:
+            return None
+    return None
+
+
+def _mask_miss_json(mask_miss: Any) -> Optional[str]:
+    """
+    mask_miss 的 JSON 数组文本：区域列表，或 CSV 中逗号分隔的字符串
+    """
+    if isinstance(mask_miss, str):
+        mask_miss = [area.strip() for area in mask_miss.split(',') if area.strip()]
+    if not mask_miss:
+        return None
+    return json.dumps(list(mask_miss), ensure_ascii=False)
+
+
+def _staging_values(row: ResultRow) -> Tuple:
+    """
+    结果行转换为临时表的一行（不含 seq）
+    """
+    return (row.laptop_key, row.timestamp or "", row.laptop_name,
+            None if row.defect is None else int(row.defect), row.score, row.area_name, row.matched_score,
+            row.qc_result_file, row.db_pred, row.db_pred_score, row.db_gt, row.model_key, row.version,
+            _mask_miss_json(row.mask_miss), _boxes_json(row.boxes))
+
+
+def connect_store(path: Path) -> sqlite3.Connection:
+    """
+    打开（必要时创建）结果库：WAL 模式，建表，连接为自动提交模式，由调用方显式 BEGIN / COMMIT
+
+    Args:
+        path (Path): 结果库路径
+
+    Returns:
+        sqlite3.Connection: 数据库连接
+
+    Raises:
+        RuntimeError: SQLite 版本低于 MIN_SQLITE_VERSION
+        ValueError: 结果库结构版本与当前版本不同
+    """
+    if not HAS_STORE_SUPPORT:
+        raise RuntimeError(f"SQLite 结果库需要 SQLite {'.'.join(map(str, MIN_SQLITE_VERSION))} 及以上，"
+                           f"当前为 {sqlite3.sqlite_version}")
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, STORE_VERSION):
+            raise ValueError(f"结果库 {path} 的结构版本为 {version}，当前版本为 {STORE_VERSION}")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        conn.executescript(SCHEMA_SQL)
+        conn.execute(f"PRAGMA user_version = {STORE_VERSION}")
+        conn.execute(_STAGING_SQL)
+    except BaseException:
+        conn.close()
+        raise
+    return conn
+
+
+def release_store(conn: sqlite3.Connection):
+    """
+    把 WAL 中的内容写回数据库并切换为 DELETE 日志模式，关闭连接后不留下 -wal / -shm 文件
+
+    Args:
+        conn (sqlite3.Connection): 结果库的读写连接
+    """
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.execute("PRAGMA journal_mode = DELETE")
+
+
+def _release_store_file(path: Path):
+    """
+    对结果库文件（例如未正常关闭的分片）做 checkpoint 并切换为 DELETE 日志模式
+    """
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        release_store(conn)
+    finally:
+        conn.close()
+
+
+class ResultsStoreWriter:
+    """
+    SQLite 结果库输出器，提供与其他输出器相同的 write_rows / close / abort
+
+    结果行按 (laptop_key, timestamp) upsert，结果库本身就是累积的，监视模式与重复运行都直接写入同一个文件。
+    """
+
+    def __init__(self, output_csv: Path, transaction_rows: int = TRANSACTION_ROWS):
+        """
+        初始化输出器
+
+        Args:
+            output_csv (Path): 输出CSV文件的路径，结果库与其同名（.sqlite）
+            transaction_rows (int): 每个事务写入的结果行数
+        """
+        self.output_file = Path(output_csv).with_suffix(STORE_SUFFIX)
+        self.transaction_rows = max(1, transaction_rows)
+        self.rows_written = 0
+        self.logger = logging.getLogger(__name__)
+        self._conn: Optional[sqlite3.Connection] = None
+        # 待写入的结果行，同一 (laptop_key, timestamp) 以最后一次为准
+        self._pending: Dict[Tuple[str, str], ResultRow] = {}
+
+    def write_rows(self, rows: Iterable[ResultRow]):
+        """
+        缓存结果行，满 transaction_rows 行时在一个事务中写入
+
+        Args:
+            rows (Iterable[ResultRow]): 结果行
+        """
+        for row in rows:
+            self._pending[(row.laptop_key, row.timestamp or "")] = row
+            if len(self._pending) >= self.transaction_rows:
+                self._flush_pending()
+
+    def _flush_pending(self):
+        """
+        在一个事务中写入缓存的结果行：executemany 写入临时表，再 upsert 到 results 并替换子表
+        """
+        if not self._pending:
+            return
+        if self._conn is None:
+            self._conn = connect_store(self.output_file)
+        rows = list(self._pending.values())
+        self._pending = {}
+        conn = self._conn
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(f"INSERT INTO temp.result_staging ({', '.join(_RESULT_COLUMNS)}, mask_miss, boxes) "
+                             f"VALUES ({', '.join('?' * (len(_RESULT_COLUMNS) + 2))})",
+                             map(_staging_values, rows))
+            conn.execute(_UPSERT_SQL)
+            for sql in _REPLACE_CHILDREN_SQL:
+                conn.execute(sql)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self.rows_written += len(rows)
+
+    def _create_indexes(self):
+        """
+        建立查询用的二级索引（已存在时跳过）
+        """
+        for index_name, table, column in SECONDARY_INDEXES:
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} ({column})")
+
+    def close(self) -> bool:
+        """
+        写入剩余结果、建立索引并关闭结果库
+
+        Returns:
+            bool: 是否写入了结果行
+        """
+        self._flush_pending()
+        if self._conn is None:
+            return False
+        try:
+            self._create_indexes()
+            self._conn.execute("PRAGMA optimize")
+            release_store(self._conn)
+        finally:
+            self._conn.close()
+            self._conn = None
+        self.logger.info(f"成功将 {self.rows_written} 条记录写入结果库 {self.output_file}")
+        return True
+
+    def abort(self):
+        """
+        中止写入：已缓存的结果行仍然提交（都是完整处理过的文件夹），然后关闭结果库
+        """
+        try:
+            self._flush_pending()
+        except Exception as e:
+            self.logger.error(f"写入结果库时发生错误: {str(e)}")
+        if self._conn is not None:
+            try:
+                release_store(self._conn)
+            except sqlite3.Error as e:
+                self.logger.error(f"关闭结果库时发生错误: {str(e)}")
+            self._conn.close()
+            self._conn = None
+        if self.rows_written:
+            self.logger.warning(f"写入中止，已写入的 {self.rows_written} 条记录保留在 {self.output_file}")
+
+
+def iter_store_rows(path: Path) -> Iterator[ResultRow]:
+    """
+    按写入顺序读回结果库中的结果行（boxes 为坐标列表，mask_miss 为区域列表）
+
+    Args:
+        path (Path): 结果库路径
+
+    Yields:
+        ResultRow: 结果行
+    """
+    conn = sqlite3.connect(Path(path).resolve().as_uri() + "?mode=ro", uri=True)
+    try:
+        cursor = conn.execute(f"""
+            SELECT {", ".join(f"r.{column}" for column in _RESULT_COLUMNS)},
+                   b.x1, b.y1, b.x2, b.y2,
+                   (SELECT json_group_array(area_name) FROM
+                        (SELECT area_name FROM result_mask_miss m WHERE m.result_id = r.id ORDER BY position))
+            FROM results r LEFT JOIN result_boxes b ON b.result_id = r.id
+            ORDER BY r.id
+        """)
+        while True:
+            chunk = cursor.fetchmany(10000)
+            if not chunk:
+                break
+            for (laptop_key, timestamp, laptop_name, defect, score, area_name, matched_score, qc_result_file,
+                 db_pred, db_pred_score, db_gt, model_key, version, x1, y1, x2, y2, mask_miss) in chunk:
+                boxes = [x1, y1, x2, y2] if x1 is not None else None
+                yield ResultRow(laptop_key, None if defect is None else bool(defect), score, intern_str(area_name),
+                                boxes, matched_score, timestamp, intern_str(qc_result_file), json.loads(mask_miss),
+                                intern_str(laptop_name), intern_str(db_pred), db_pred_score, intern_str(db_gt),
+                                intern_str(model_key), intern_str(version))
+    finally:
+        conn.close()
+
+
+def merge_stores(shards: Sequence[Path], output_file: Path) -> Tuple[int, int]:
+    """
+    合并各分片的结果库（按 (laptop_key, timestamp) 保留第一次出现的结果行），写入 output_file（已有时 upsert）
+
+    读取前先对每个分片做 checkpoint 并切换为 DELETE 日志模式（未正常关闭的分片可能还有 -wal 文件），
+    合并后分片与输出都不留下 -wal / -shm 文件
+
+    Returns:
+        Tuple[int, int]: (写入行数, 去掉的重复行数)
+    """
+    seen = set()
+    duplicates = 0
+    writer = ResultsStoreWriter(Path(output_file).with_suffix('.csv'))
+    try:
+        for shard in shards:
+            _release_store_file(shard)
+            rows: List[ResultRow] = []
+            for row in iter_store_rows(shard):
+                key = (row.laptop_key, row.timestamp)
+                if key in seen:
+                    duplicates += 1
+                    continue
+                seen.add(key)
+                rows.append(row)
+            writer.write_rows(rows)
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+    return writer.rows_written, duplicates
@@ -0,0 +1,304 @@
+"""  python 模組文件名 : scan_manifest.py
+
+scan_manifest.py 提供增量处理用的扫描清单：以 SQLite 旁表记录每个 laptop_infers.json
+所在文件夹的文件指纹和解析结果，再次运行时未变化的文件夹直接复用缓存的结果行
+
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import archive_io
+from result_row import ResultRow, pack_folder_rows, unpack_folder_rows
+
+# 缓存内容格式版本，结果行结构变化时递增，旧清单会被清空
+MANIFEST_VERSION = "4"
+
+# 每条 SQL 携带的路径数量上限
+_CHUNK_SIZE = 500
+
+
+@dataclass(frozen=True)
+class FolderFingerprint:
+    """文件夹的文件指纹：文件名、修改时间与大小"""
+    qc_result_file: str
+    inference_file: str
+    json_mtime_ns: int
+    json_size: int
+    inference_mtime_ns: int = -1
+    inference_size: int = -1
+
+
+@dataclass
+class ManifestEntry:
+    """清单中的一条缓存记录"""
+    fingerprint: FolderFingerprint
+    content_hash: Optional[str]
+    laptop_name: str
+    # 缓存的结果行不含数据库字段（为 None），复用时重新查询，保证 db_gt 等信息是最新的
+    rows: List[ResultRow]
+
+
+def folder_fingerprint(json_file: Path, qc_result_file: str, inference_file: str) -> FolderFingerprint:
+    """
+    通过 stat 计算文件夹的文件指纹（不读取文件内容）
+
+    Args:
+        json_file (Path): laptop_infers.json 文件路径
+        qc_result_file (str): 对应的 QC 文件名
+        inference_file (str): inference_ 文件名
+
+    Returns:
+        FolderFingerprint: 文件指纹
+    """
+    json_stat = archive_io.stat(json_file)
+    inference_mtime_ns = inference_size = -1
+    if inference_file:
+        try:
+            inference_stat = archive_io.stat(json_file.parent / inference_file)
+            inference_mtime_ns, inference_size = inference_stat.st_mtime_ns, inference_stat.st_size
+        except OSError:
+            pass
+    return FolderFingerprint(qc_result_file, inference_file, json_stat.st_mtime_ns, json_stat.st_size,
+                             inference_mtime_ns, inference_size)
+
+
+def content_hash(json_file: Path, inference_file: str) -> str:
+    """
+    计算 laptop_infers.json 与 inference_ 文件内容的哈希
+
+    Args:
+        json_file (Path): laptop_infers.json 文件路径
+        inference_file (str): inference_ 文件名
+
+    Returns:
+        str: 十六进制哈希值
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    paths = [json_file]
+    if inference_file:
+        paths.append(json_file.parent / inference_file)
+    for path in paths:
+        digest.update(path.name.encode('utf-8'))
+        try:
+            if archive_io.in_archive(path):
+                digest.update(archive_io.read_bytes(path))
+                continue
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+        except OSError:
+            digest.update(b'\0missing')
+    return digest.hexdigest()
+
+
+class ScanManifest:
+    """
+    增量处理的扫描清单
+
+    判断文件夹是否变化时先比较 stat 指纹；只有指纹不同时才计算内容哈希，
+    内容未变（例如仅 touch）时仍复用缓存并更新指纹。
+    清单可以在多个线程中使用（例如流水线模式），数据库操作由锁串行化。
+    """
+
+    def __init__(self, manifest_path: Path, root: Path):
+        """
+        初始化清单
+
+        Args:
+            manifest_path (Path): 清单 SQLite 文件路径
+            root (Path): 输入根目录，清单中的路径相对于该目录保存，目录整体移动后清单仍然有效
+        """
+        self.manifest_path = Path(manifest_path)
+        self.root = Path(root)
+        self.logger = logging.getLogger(__name__)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._run_id = 0
+        self._lock = threading.Lock()
+
+    def open(self):
+        """
+        打开清单数据库，必要时创建表结构，并开始新的一轮运行
+        """
+        self._conn = sqlite3.connect(self.manifest_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+        CREATE TABLE IF NOT EXISTS folders (
+            json_path TEXT PRIMARY KEY,
+            qc_result_file TEXT,
+            inference_file TEXT,
+            json_mtime_ns INTEGER,
+            json_size INTEGER,
+            inference_mtime_ns INTEGER,
+            inference_size INTEGER,
+            content_hash TEXT,
+            laptop_name TEXT,
+            rows TEXT,
+            run_id INTEGER
+        );
+        """)
+        meta = dict(self._conn.execute("SELECT key, value FROM meta").fetchall())
+        if meta.get('version') != MANIFEST_VERSION:
+            if meta:
+                self.logger.warning(f"清单版本不一致，清空旧清单: {self.manifest_path}")
+            self._conn.execute("DELETE FROM folders")
+            self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (MANIFEST_VERSION,))
+        self._run_id = int(meta.get('run_id', 0)) + 1
+        self._conn.execute("INSERT OR REPLACE INTO meta VALUES ('run_id', ?)", (str(self._run_id),))
+        self._conn.commit()
+        self.logger.info(f"使用扫描清单: {self.manifest_path} (第 {self._run_id} 次运行)")
+
+    def _key(self, json_file: Path) -> str:
+        """
+        返回 laptop_infers.json 在清单中的键（相对于输入根目录的 POSIX 路径）
+
+        Args:
+            json_file (Path): laptop_infers.json 文件路径
+
+        Returns:
+            str: 清单键
+        """
+        try:
+            return json_file.relative_to(self.root).as_posix()
+        except ValueError:
+            return json_file.as_posix()
+
+    def close(self):
+        """
+        关闭清单数据库
+        """
+        if self._conn is not None:
+            self._conn.commit()
+            self._conn.close()
+            self._conn = None
+
+    def __enter__(self) -> "ScanManifest":
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def lookup_unchanged(self, file_tuples: List[Tuple[Path, str, str]]) -> Dict[Path, ManifestEntry]:
+        """
+        找出一批文件夹中未变化的部分，并标记本轮已看到这些路径
+
+        Args:
+            file_tuples (List[Tuple[Path, str, str]]): 文件元组列表
+
+        Returns:
+            Dict[Path, ManifestEntry]: 未变化文件夹的 laptop_infers.json 路径 -> 缓存记录
+        """
+        stored = {}
+        paths = [self._key(json_file) for json_file, _, _ in file_tuples]
+        with self._lock:
+            for start in range(0, len(paths), _CHUNK_SIZE):
+                chunk = paths[start:start + _CHUNK_SIZE]
+                placeholders = ", ".join("?" * len(chunk))
+                rows = self._conn.execute(f"""
+                SELECT json_path, qc_result_file, inference_file, json_mtime_ns, json_size,
+                       inference_mtime_ns, inference_size, content_hash, laptop_name, rows
+                FROM folders WHERE json_path IN ({placeholders})
+                """, chunk).fetchall()
+                for row in rows:
+                    stored[row[0]] = ManifestEntry(FolderFingerprint(*row[1:7]), row[7], row[8],
+                                                   unpack_folder_rows(json.loads(row[9])))
+
+        unchanged: Dict[Path, ManifestEntry] = {}
+        refreshed = []
+        for json_file, qc_result_file, inference_file in file_tuples:
+            entry = stored.get(self._key(json_file))
+            if entry is None:
+                continue
+            try:
+                fingerprint = folder_fingerprint(json_file, qc_result_file, inference_file)
+            except OSError:
+                continue
+            if fingerprint == entry.fingerprint:
+                unchanged[json_file] = entry
+                continue
+            if (fingerprint.qc_result_file, fingerprint.inference_file) != \
+                    (entry.fingerprint.qc_result_file, entry.fingerprint.inference_file):
+                continue
+            # 指纹变化但内容可能未变（例如复制或 touch），比较内容哈希
+            if entry.content_hash and entry.content_hash == content_hash(json_file, inference_file):
+                entry.fingerprint = fingerprint
+                unchanged[json_file] = entry
+                refreshed.append((*self._fingerprint_values(fingerprint), self._key(json_file)))
+
+        with self._lock:
+            if refreshed:
+                self._conn.executemany("""
+                UPDATE folders SET qc_result_file = ?, inference_file = ?, json_mtime_ns = ?, json_size = ?,
+                                   inference_mtime_ns = ?, inference_size = ?
+                WHERE json_path = ?
+                """, refreshed)
+            self._conn.executemany("UPDATE folders SET run_id = ? WHERE json_path = ?",
+                                   [(self._run_id, self._key(json_file)) for json_file in unchanged])
+            self._conn.commit()
+        return unchanged
+
+    @staticmethod
+    def _fingerprint_values(fingerprint: FolderFingerprint) -> Tuple:
+        return (fingerprint.qc_result_file, fingerprint.inference_file,
+                fingerprint.json_mtime_ns, fingerprint.json_size,
+                fingerprint.inference_mtime_ns, fingerprint.inference_size)
+
+    def store(self, entries: Iterable[Tuple[Path, str, str, str, List[ResultRow]]]):
+        """
+        保存一批新处理的文件夹及其结果行（不含数据库字段）
+
+        Args:
+            entries (Iterable[Tuple[Path, str, str, str, List[ResultRow]]]):
+                (laptop_infers.json 路径, QC 文件名, inference_ 文件名, laptop_name, 结果行)
+        """
+        records = []
+        for json_file, qc_result_file, inference_file, laptop_name, rows in entries:
+            try:
+                fingerprint = folder_fingerprint(json_file, qc_result_file, inference_file)
+                digest = content_hash(json_file, inference_file)
+            except OSError as e:
+                self.logger.warning(f"无法记录文件夹指纹 {json_file}: {str(e)}")
+                continue
+            records.append((self._key(json_file), *self._fingerprint_values(fingerprint), digest, laptop_name,
+                            json.dumps(pack_folder_rows(rows), ensure_ascii=False), self._run_id))
+        if records:
+            with self._lock:
+                self._conn.executemany("""
+                INSERT OR REPLACE INTO folders VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, records)
+                self._conn.commit()
+
+    def prune(self, owns: Optional[Callable[[str], bool]] = None) -> int:
+        """
+        删除本轮运行中未再出现的文件夹记录（文件夹已被删除或移动）
+
+        Args:
+            owns (Optional[Callable[[str], bool]]): 只删除该函数返回 True 的清单键（相对路径），
+                                                    分片运行时用于保留其他分片的记录
+
+        Returns:
+            int: 删除的记录数
+        """
+        with self._lock:
+            if owns is None:
+                deleted = self._conn.execute("DELETE FROM folders WHERE run_id != ?", (self._run_id,)).rowcount
+            else:
+                stale = [(key,) for (key,) in self._conn.execute(
+                    "SELECT json_path FROM folders WHERE run_id != ?", (self._run_id,)).fetchall() if owns(key)]
+                self._conn.executemany("DELETE FROM folders WHERE json_path = ?", stale)
+                deleted = len(stale)
+            self._conn.commit()
+        if deleted:
+            self.logger.info(f"从清单中删除 {deleted} 个已不存在的文件夹")
+        return deleted
@@ -6,7 +6,7 @@ schema.py 定義了 laptop_infers.json的資料結構
 
 
 from typing import List, Dict, Optional
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, model_validator
 
 
 class Labels(BaseModel):
@@ -74,6 +74,42 @@ class InferenceOutput(BaseModel):
     laptop_infers: List[LaptopInfers] = ...
 
 
+class ModelParamsWithDefaults(ModelParams):
+    """
+    The `ModelParamsWithDefaults` class is the lenient variant of `ModelParams` used when reading
+    laptop_infers.json files written by older inference versions. Missing thresholds fall back to
+    their defaults, and missing model/mask keys fall back to `model_version` (or "unknown").
+    """
+
+    score_thr: float = Field(0.0, example=0.0, ge=-10, title="score threshold")
+    box_size_thr: int = Field(1000, example=1000, ge=0, title="box size threshold")
+
+    @model_validator(mode="before")
+    @classmethod
+    def default_keys_from_model_version(cls, data):
+        if isinstance(data, dict) and ("model_key" not in data or "mask_key" not in data):
+            model_version = data.get("model_version", "unknown")
+            data = {"model_key": model_version, "mask_key": model_version, **data}
+        return data
+
+
+class LaptopInfersWithDefaults(LaptopInfers):
+    """
+    The `LaptopInfersWithDefaults` class is `LaptopInfers` with lenient `params`.
+    """
+
+    params: ModelParamsWithDefaults = ...
+
+
+class InferenceOutputWithDefaults(InferenceOutput):
+    """
+    The `InferenceOutputWithDefaults` class is `InferenceOutput` with lenient `params`, suitable for
+    validating laptop_infers.json bytes directly with `model_validate_json`.
+    """
+
+    laptop_infers: List[LaptopInfersWithDefaults] = ...
+
+
 class InferenceInput(BaseModel):
     """
     The `InferenceInput` class represents the input data for an inference process, including a laptop
@@ -0,0 +1,368 @@
+"""  python 模組文件名 : sharding.py
+
+sharding.py 支持将一次处理拆分到多个进程或多台机器上运行，并合并各分片的输出：
+    - ShardSpec：按文件夹相对路径的稳定哈希取模选取第 index / count 个分片，或直接指定子目录列表
+    - 每个分片写出带分片标记的输出文件，例如 laptop_infers_results.shard-0-of-4.csv，
+      以及失败记录摘要 laptop_infers_results.shard-0-of-4.failures.json
+    - merge_shards：合并各分片的 CSV / JSON / 列式输出和失败记录，按 (laptop_key, timestamp) 去重
+
+用法:
+    python sharding.py merge laptop_infers_results.csv --search-dir /mnt/line1 /mnt/line2
+
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import os
+import re
+from dataclasses import dataclass
+from itertools import batched
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from columnar_writer import COLUMNAR_FORMATS, HAS_PYARROW, read_columnar
+from result_row import ResultRow
+from result_writer import CSV_FIELDNAMES, PARTIAL_SUFFIX, StreamingResultWriter
+from results_store import STORE_SUFFIX, merge_stores
+
+# 输出文件名中的分片标记，例如 shard-0-of-4 或 shard-line1
+SHARD_TAG_PATTERN = re.compile(r'^shard-[\w-]+$')
+
+FAILURES_SUFFIX = '.failures.json'
+
+# 合并 JSON 时每次写入的行数
+MERGE_BATCH_SIZE = 1000
+
+DedupeKey = Tuple[str, str]
+
+
+def shard_of(relative_path: str, count: int) -> int:
+    """
+    文件夹相对路径的稳定哈希取模（与进程、机器、Python 版本无关）
+
+    Args:
+        relative_path (str): 文件夹相对于输入根目录的 POSIX 路径
+        count (int): 分片数量
+
+    Returns:
+        int: 分片序号，0 ~ count-1
+    """
+    digest = hashlib.blake2b(relative_path.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % count
+
+
+@dataclass(frozen=True)
+class ShardSpec:
+    """
+    分片定义
+
+    Attributes:
+        index (int): 本分片序号，0 ~ count-1
+        count (int): 分片总数，1 表示不按哈希拆分
+        roots (Tuple[str, ...]): 只遍历这些子目录（相对于输入目录或绝对路径），为空时遍历整个输入目录
+        name (Optional[str]): 输出文件中的分片标记，默认 shard-<index>-of-<count>
+    """
+    index: int = 0
+    count: int = 1
+    roots: Tuple[str, ...] = ()
+    name: Optional[str] = None
+
+    def __post_init__(self):
+        if self.count < 1 or not 0 <= self.index < self.count:
+            raise ValueError(f"无效的分片: {self.index}/{self.count}")
+        if self.count == 1 and not self.roots:
+            raise ValueError("分片需要指定 count > 1 或 roots")
+        if self.name is not None and not SHARD_TAG_PATTERN.match(f"shard-{self.name}"):
+            raise ValueError(f"无效的分片名称: {self.name}")
+
+    @classmethod
+    def parse(cls, text: str, roots: Sequence[str] = (), name: Optional[str] = None) -> "ShardSpec":
+        """
+        解析 "index/count" 形式的分片参数，例如 "0/4"
+
+        Args:
+            text (str): 分片参数
+            roots (Sequence[str]): 子目录列表
+            name (Optional[str]): 分片名称
+
+        Returns:
+            ShardSpec: 分片定义
+        """
+        try:
+            index, count = (int(part) for part in text.split('/'))
+        except ValueError:
+            raise ValueError(f"分片参数格式应为 index/count，例如 0/4: {text}") from None
+        return cls(index, count, tuple(roots), name)
+
+    @property
+    def tag(self) -> str:
+        """
+        输出文件名中的分片标记
+        """
+        if self.name:
+            return f"shard-{self.name}"
+        if self.count > 1:
+            return f"shard-{self.index}-of-{self.count}"
+        digest = hashlib.blake2b("\n".join(self.roots).encode('utf-8'), digest_size=4).hexdigest()
+        return f"shard-{digest}"
+
+    def contains(self, relative_folder: str) -> bool:
+        """
+        文件夹是否属于本分片
+
+        Args:
+            relative_folder (str): 文件夹相对于输入根目录的 POSIX 路径
+
+        Returns:
+            bool: 是否属于本分片
+        """
+        return self.count == 1 or shard_of(relative_folder, self.count) == self.index
+
+    def output_path(self, output_csv: Path) -> Path:
+        """
+        本分片的输出CSV路径，例如 laptop_infers_results.shard-0-of-4.csv
+        """
+        output_csv = Path(output_csv)
+        return output_csv.with_name(f"{output_csv.stem}.{self.tag}{output_csv.suffix}")
+
+
+def failures_path(output_csv: Path) -> Path:
+    """
+    失败记录摘要的路径，例如 laptop_infers_results.shard-0-of-4.failures.json
+    """
+    return Path(output_csv).with_suffix(FAILURES_SUFFIX)
+
+
+def write_failure_summary(path: Path, failures: List[Dict[str, Any]], found_files: int, processed_files: int):
+    """
+    写入失败记录摘要
+
+    Args:
+        path (Path): 摘要文件路径
+        failures (List[Dict[str, Any]]): 失败记录（json_file、qc_result_file、inference_file、reason、worker）
+        found_files (int): 找到的文件夹数量
+        processed_files (int): 成功处理的文件夹数量
+    """
+    summary = {
+        "found_files": found_files,
+        "processed_files": processed_files,
+        "error_files": len(failures),
+        "failures": failures,
+    }
+    partial = path.with_name(path.name + PARTIAL_SUFFIX)
+    with open(partial, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    os.replace(partial, path)
+
+
+def find_shard_outputs(output_path: Path, search_dirs: Sequence[Path] = ()) -> List[Path]:
+    """
+    查找某个输出文件对应的各分片文件，例如 laptop_infers_results.csv 对应
+    laptop_infers_results.shard-*.csv
+
+    Args:
+        output_path (Path): 合并后的输出文件路径
+        search_dirs (Sequence[Path]): 查找分片文件的目录，默认为输出文件所在目录
+
+    Returns:
+        List[Path]: 按文件名排序的分片文件
+    """
+    output_path = Path(output_path)
+    stem, suffix = output_path.stem, output_path.suffix
+    if output_path.name.endswith(FAILURES_SUFFIX):
+        stem, suffix = output_path.name[:-len(FAILURES_SUFFIX)], FAILURES_SUFFIX
+    shards = []
+    for directory in search_dirs or [output_path.parent]:
+        for path in Path(directory).glob(f"{stem}.shard-*{suffix}"):
+            tag = path.name[len(stem) + 1:-len(suffix)]
+            if SHARD_TAG_PATTERN.match(tag):
+                shards.append(path)
+    return sorted(shards, key=lambda path: (path.name, str(path)))
+
+
+class _Deduplicator:
+    """按 (laptop_key, timestamp) 保留第一次出现的结果行"""
+
+    def __init__(self):
+        self.seen: Set[DedupeKey] = set()
+        self.duplicates = 0
+
+    def keep(self, laptop_key: Any, timestamp: Any) -> bool:
+        key = (str(laptop_key), str(timestamp))
+        if key in self.seen:
+            self.duplicates += 1
+            return False
+        self.seen.add(key)
+        return True
+
+
+def merge_csv(shards: Sequence[Path], output_csv: Path) -> Tuple[int, int]:
+    """
+    合并 CSV 分片
+
+    Returns:
+        Tuple[int, int]: (写入行数, 去掉的重复行数)
+    """
+    dedupe = _Deduplicator()
+    rows = 0
+    partial = output_csv.with_name(output_csv.name + PARTIAL_SUFFIX)
+    with open(partial, 'w', newline='', encoding='utf-8-sig') as out:
+        writer = csv.writer(out)
+        writer.writerow(CSV_FIELDNAMES)
+        for shard in shards:
+            with open(shard, 'r', newline='', encoding='utf-8-sig') as f:
+                for row in csv.DictReader(f):
+                    if dedupe.keep(row['laptop_key'], row['timestamp']):
+                        writer.writerow([row.get(name, '') for name in CSV_FIELDNAMES])
+                        rows += 1
+    os.replace(partial, output_csv)
+    return rows, dedupe.duplicates
+
+
+def _iter_json_records(path: Path) -> Iterator[Dict[str, Any]]:
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.suffix == '.jsonl':
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from json.load(f)
+
+
+def merge_json(shards: Sequence[Path], output_json: Path) -> Tuple[int, int]:
+    """
+    合并 JSON / JSON Lines 分片，输出格式与单机运行相同
+
+    Returns:
+        Tuple[int, int]: (写入行数, 去掉的重复行数)
+    """
+    dedupe = _Deduplicator()
+    json_format = "jsonl" if output_json.suffix == '.jsonl' else "json"
+    writer = StreamingResultWriter(output_json.with_suffix('.csv'), json_format=json_format, write_csv=False)
+    writer.open()
+    try:
+        for shard in shards:
+            records = (ResultRow.from_dict(record) for record in _iter_json_records(shard)
+                       if dedupe.keep(record.get('laptop_key'), record.get('timestamp')))
+            for batch in batched(records, MERGE_BATCH_SIZE):
+                writer.write_rows(batch)
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+    return writer.rows_written, dedupe.duplicates
+
+
+def merge_columnar(shards: Sequence[Path], output_file: Path) -> Tuple[int, int]:
+    """
+    合并 Parquet / Arrow 分片
+
+    Returns:
+        Tuple[int, int]: (写入行数, 去掉的重复行数)
+    """
+    if not HAS_PYARROW:
+        raise ImportError("合并列式文件需要安装 pyarrow")
+    import pyarrow as pa
+    import pyarrow.ipc
+    import pyarrow.parquet as pq
+
+    dedupe = _Deduplicator()
+    tables = []
+    for shard in shards:
+        table = read_columnar(shard)
+        mask = [dedupe.keep(key, timestamp) for key, timestamp in
+                zip(table.column('laptop_key').to_pylist(), table.column('timestamp').to_pylist())]
+        tables.append(table.filter(pa.array(mask, type=pa.bool_())))
+    merged = pa.concat_tables(tables).unify_dictionaries().combine_chunks()
+
+    partial = output_file.with_name(output_file.name + PARTIAL_SUFFIX)
+    if output_file.suffix == COLUMNAR_FORMATS["arrow"]:
+        with pa.ipc.new_file(str(partial), merged.schema) as writer:
+            writer.write_table(merged)
+    else:
+        pq.write_table(merged, partial, compression='zstd')
+    os.replace(partial, output_file)
+    return merged.num_rows, dedupe.duplicates
+
+
+def merge_failures(shards: Sequence[Path], output_path: Path) -> int:
+    """
+    合并失败记录摘要，同一文件重复出现时只保留一条
+
+    Returns:
+        int: 合并后的失败记录数
+    """
+    found = processed = 0
+    failures: Dict[str, Dict[str, Any]] = {}
+    for shard in shards:
+        with open(shard, 'r', encoding='utf-8') as f:
+            summary = json.load(f)
+        found += summary.get("found_files", 0)
+        processed += summary.get("processed_files", 0)
+        for failure in summary.get("failures", []):
+            failures.setdefault(failure["json_file"], dict(failure, shard=shard.name))
+    write_failure_summary(output_path, list(failures.values()), found, processed)
+    return len(failures)
+
+
+def merge_shards(output_csv: Path, search_dirs: Sequence[Path] = (),
+                 formats: Iterable[str] = ("csv", "json", "jsonl", *COLUMNAR_FORMATS, "sqlite")) -> Dict[str, Any]:
+    """
+    合并各分片的全部输出：CSV、JSON / JSON Lines、列式文件、SQLite 结果库和失败记录摘要
+
+    Args:
+        output_csv (Path): 合并后的CSV路径，其他格式与其同名
+        search_dirs (Sequence[Path]): 查找分片文件的目录，默认为输出文件所在目录
+        formats (Iterable[str]): 要合并的格式
+
+    Returns:
+        Dict[str, Any]: 每种格式的 (分片数, 写入行数, 去重行数)，以及失败记录数
+    """
+    logger = logging.getLogger(__name__)
+    output_csv = Path(output_csv)
+    mergers = {"csv": ('.csv', merge_csv), "json": ('.json', merge_json), "jsonl": ('.jsonl', merge_json)}
+    for fmt, suffix in COLUMNAR_FORMATS.items():
+        mergers[fmt] = (suffix, merge_columnar)
+    mergers["sqlite"] = (STORE_SUFFIX, merge_stores)
+
+    summary: Dict[str, Any] = {}
+    for fmt in formats:
+        suffix, merge = mergers[fmt]
+        output = output_csv.with_suffix(suffix)
+        shards = find_shard_outputs(output, search_dirs)
+        if not shards:
+            continue
+        rows, duplicates = merge(shards, output)
+        summary[fmt] = {"shards": len(shards), "rows": rows, "duplicates": duplicates}
+        logger.info(f"合并 {len(shards)} 个分片到 {output}: {rows} 条记录，去掉重复 {duplicates} 条")
+
+    failure_output = failures_path(output_csv)
+    failure_shards = find_shard_outputs(failure_output, search_dirs)
+    if failure_shards:
+        summary["failures"] = merge_failures(failure_shards, failure_output)
+        logger.info(f"合并失败记录到 {failure_output}: {summary['failures']} 个文件")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="合并分片输出")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    merge_parser = subparsers.add_parser("merge", help="合并各分片的输出文件")
+    merge_parser.add_argument("output_csv", type=Path, help="合并后的CSV路径，其他格式与其同名")
+    merge_parser.add_argument("--search-dir", type=Path, nargs="+", default=[],
+                              help="查找分片文件的目录（默认为输出文件所在目录）")
+    merge_parser.add_argument("--formats", nargs="+", default=["csv", "json", "jsonl", *COLUMNAR_FORMATS, "sqlite"],
+                              help="要合并的格式")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    summary = merge_shards(args.output_csv, args.search_dir, args.formats)
+    if not summary:
+        logging.getLogger(__name__).warning(f"没有找到 {args.output_csv} 的分片文件")
+
+
+if __name__ == "__main__":
+    main()
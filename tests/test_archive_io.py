@@ -0,0 +1,64 @@
+"""  python 模組文件名 : tests/test_archive_io.py
+
+archive_io.py 的 .tar.gz 成员保存：小的 laptop_infers.json 留在内存中，较大的 inference_ 日志写入临时文件，
+两者读回的内容都与原文件相同
+
+"""
+
+import io
+import sys
+import tarfile
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import archive_io
+from archive_io import TAR_SPILL_MEMBER_BYTES, ArchiveReader
+
+FOLDER = "line0/LASA_02_SN000001_202502230901"
+
+
+class TarGzMembersTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self._tmp.name) / "line0.tar.gz"
+        self.contents = {
+            f"{FOLDER}/laptop_infers.json": b'{"laptop_key": "LASA_02_SN000001_20250223090100"}',
+            f"{FOLDER}/inference_20250223.log": b"[INFO] Front_04: Transformation not possible\n" * 4000,
+            f"{FOLDER}/qc_result_20250223.json": b"{}",
+            f"{FOLDER}/img_00.jpg": b"\xff" * 1000,
+        }
+        with tarfile.open(self.path, "w:gz") as tar:
+            for name, data in self.contents.items():
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+
+    def tearDown(self):
+        archive_io.close_archives()
+        self._tmp.cleanup()
+
+    def test_large_members_spilled(self):
+        reader = ArchiveReader(self.path)
+        try:
+            log = f"{FOLDER}/inference_20250223.log"
+            self.assertGreater(len(self.contents[log]), TAR_SPILL_MEMBER_BYTES)
+            self.assertEqual(reader.cached_bytes, len(self.contents[f"{FOLDER}/laptop_infers.json"]))
+            for name in (log, f"{FOLDER}/laptop_infers.json"):
+                self.assertEqual(reader.read(name), self.contents[name])
+            with self.assertRaises(FileNotFoundError):
+                reader.read(f"{FOLDER}/img_00.jpg")
+            self.assertEqual(reader.folders(), [(FOLDER, "qc_result_20250223.json", "inference_20250223.log")])
+        finally:
+            reader.close()
+
+    def test_read_through_virtual_path(self):
+        path = self.path / FOLDER / "inference_20250223.log"
+        self.assertEqual(archive_io.read_bytes(path), self.contents[f"{FOLDER}/inference_20250223.log"])
+
+
+if __name__ == "__main__":
+    unittest.main()
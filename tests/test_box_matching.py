@@ -0,0 +1,66 @@
+"""  python 模組文件名 : tests/test_box_matching.py
+
+box_matching.py 的框匹配：match_records 一次展平后的结果与逐条记录的 match_position 相同，
+LabelArrays.boxes 对格式不符的框填充 NaN
+
+"""
+
+import math
+import random
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from box_matching import HAS_NUMPY, LabelArrays, match_position, match_records
+from schema import Labels
+
+
+def _random_labels(rng: random.Random):
+    labels = {}
+    for a in range(rng.randint(0, 4)):
+        scores = [rng.choice([0.1, 0.5, rng.random()]) for _ in range(rng.randint(0, 5))]
+        boxes = [[rng.random() for _ in range(4)] for _ in scores]
+        labels[f"Front_{a:02d}"] = Labels(boxes=boxes, scores=scores)
+    return labels
+
+
+class MatchRecordsTest(unittest.TestCase):
+
+    def test_matches_python_loop(self):
+        rng = random.Random(0)
+        for _ in range(500):
+            label_sets = [_random_labels(rng) for _ in range(rng.randint(0, 6))]
+            targets = [rng.choice([0.1, 0.5, 0.3]) for _ in label_sets]
+            expected = [match_position(labels, target) for labels, target in zip(label_sets, targets)]
+            # min_scores=0 强制走向量化路径
+            self.assertEqual(match_records(label_sets, targets, min_scores=0), expected)
+            self.assertEqual(match_records(label_sets, targets), expected)
+
+    def test_first_match_across_areas(self):
+        labels = {"Front_00": Labels(boxes=[[0, 0, 1, 1]], scores=[0.2]),
+                  "Front_01": Labels(boxes=[[0, 0, 2, 2], [0, 0, 3, 3]], scores=[0.9, 0.5]),
+                  "Front_02": Labels(boxes=[[0, 0, 4, 4]], scores=[0.5])}
+        self.assertEqual(match_records([labels, labels, {}], [0.5, 0.7, 0.5], min_scores=0),
+                         [("Front_01", 1), None, None])
+
+
+@unittest.skipUnless(HAS_NUMPY, "需要 numpy")
+class LabelArraysBoxesTest(unittest.TestCase):
+
+    def test_well_formed_boxes(self):
+        labels = {"Front_00": Labels(boxes=[[1, 2, 3, 4]], scores=[0.2]),
+                  "Front_01": Labels(boxes=[[5, 6, 7, 8], [9, 10, 11, 12]], scores=[0.9, 0.5])}
+        self.assertEqual(LabelArrays(labels).boxes.tolist(), [[1, 2, 3, 4], [5, 6, 7, 8], [9, 10, 11, 12]])
+
+    def test_malformed_boxes_are_nan(self):
+        labels = {"Front_00": Labels(boxes=[[1, 2, 3]], scores=[0.2, 0.3]),
+                  "Front_01": Labels(boxes=[[5, 6, 7, 8]], scores=[0.9])}
+        boxes = LabelArrays(labels).boxes.tolist()
+        self.assertTrue(all(math.isnan(v) for v in boxes[0] + boxes[1]))
+        self.assertEqual(boxes[2], [5, 6, 7, 8])
+
+
+if __name__ == "__main__":
+    unittest.main()
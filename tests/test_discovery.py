@@ -0,0 +1,80 @@
+"""  python 模組文件名 : tests/test_discovery.py
+
+discovery.py 的图片目录判断：image_dir_threshold 不应跳过包含 laptop_infers.json 的检测文件夹
+
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import discovery
+from discovery import DiscoveryOptions, iter_json_files
+
+_scandir = os.scandir
+
+
+class _SortedScandir:
+    """按指定顺序返回条目的 os.scandir，用于固定列举顺序（图片在前）"""
+
+    def __init__(self, path):
+        with _scandir(path) as it:
+            entries = list(it)
+        # 图片排在最前，其余按名称排序
+        self.entries = sorted(entries, key=lambda e: (not e.name.endswith('.jpg'), e.name))
+
+    def __enter__(self):
+        return iter(self.entries)
+
+    def __exit__(self, *exc):
+        return False
+
+
+class ImageDirThresholdTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name)
+        folder = self.root / "line0" / "LASA_02_SN000001_202502230901"
+        folder.mkdir(parents=True)
+        for i in range(20):
+            (folder / f"img_{i:02d}.jpg").write_bytes(b"")
+        (folder / "laptop_infers.json").write_text("{}", encoding="utf-8")
+        (folder / "qc_result_20250223.json").write_text("{}", encoding="utf-8")
+        (folder / "inference_20250223.log").write_text("", encoding="utf-8")
+        images = self.root / "line0" / "images"
+        images.mkdir()
+        for i in range(20):
+            (images / f"img_{i:02d}.jpg").write_bytes(b"")
+        self.folder = folder
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _discover(self, threshold):
+        with mock.patch.object(discovery.os, "scandir", _SortedScandir):
+            return list(iter_json_files(self.root, DiscoveryOptions(image_dir_threshold=threshold)))
+
+    def test_images_before_json_keep_folder(self):
+        found = self._discover(10)
+        self.assertEqual(found, [(self.folder / "laptop_infers.json",
+                                  "qc_result_20250223.json", "inference_20250223.log")])
+
+    def test_image_only_directory_skipped(self):
+        with self.assertLogs(discovery.__name__, level="INFO") as logs:
+            self._discover(10)
+        skipped = [line for line in logs.output if "跳过图片目录" in line]
+        self.assertEqual(len(skipped), 1)
+        self.assertIn(str(self.root / "line0" / "images"), skipped[0])
+
+    def test_matches_without_threshold(self):
+        self.assertEqual(self._discover(10), self._discover(None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+"""  python 模組文件名 : tests/test_log_scanner.py
+
+log_scanner.py 的 mask_miss 提取：字面量查找与组合正则两条路径的区域名称都与原有正则相同
+
+"""
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from log_scanner import MASK_MISS_PATTERN, scan_inference_bytes, scan_inference_log
+
+LOG = (
+    b"[INFO][2025-02-23 09:47:39][inference_v2][LASA_02_SN000001] Front_04: Transformation not possible\n"
+    b"[INFO][2025-02-23 09:47:40][inference_v2] cam] Front_05: Transformation not possible\n"
+    b"[INFO][2025-02-23 09:47:41][inference_v2][LASA_02_SN000001] Front_06: inference time 0.125s\n"
+    b"[ERROR] ValueError: bad input\n"
+    b"[INFO][2025-02-23 09:47:42] a] b] Front_07: Transformation not possible\n"
+)
+
+
+def _expected(data: bytes):
+    return [area.decode("utf-8") for area in MASK_MISS_PATTERN.findall(data)]
+
+
+class MaskMissTest(unittest.TestCase):
+
+    def test_multiple_brackets_use_first_bracket(self):
+        scan = scan_inference_bytes(LOG)
+        self.assertEqual(scan.mask_miss_areas, ["Front_04", "cam] Front_05", "a] b] Front_07"])
+        self.assertEqual(scan.mask_miss_areas, _expected(LOG))
+
+    def test_signals_do_not_change_mask_miss(self):
+        plain = scan_inference_bytes(LOG)
+        signals = scan_inference_bytes(LOG, extract_signals=True)
+        self.assertEqual(signals.mask_miss_areas, plain.mask_miss_areas)
+        self.assertEqual(signals.area_timings, {"Front_06": [0.125]})
+        self.assertEqual(signals.exception_counts["ValueError"], 1)
+
+    def test_file_scan_matches_bytes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "inference_20250223.log"
+            path.write_bytes(LOG * 50)
+            for use_mmap in (True, False):
+                for extract_signals in (False, True):
+                    scan = scan_inference_log(path, extract_signals=extract_signals, use_mmap=use_mmap, chunk_size=256)
+                    self.assertEqual(scan.mask_miss_areas, _expected(LOG * 50))
+
+    def test_no_match(self):
+        self.assertEqual(scan_inference_bytes(b"]: Transformation not possible\n").mask_miss_result(), ["none"])
+
+
+if __name__ == "__main__":
+    unittest.main()
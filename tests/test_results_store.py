@@ -0,0 +1,90 @@
+"""  python 模組文件名 : tests/test_results_store.py
+
+results_store.py 的 upsert：重复写入同一 (laptop_key, timestamp) 时原地更新 results，
+并替换 result_mask_miss / result_boxes 子表，不留下旧的子记录
+
+"""
+
+import logging
+import sqlite3
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import results_store
+from result_row import ResultRow
+from results_store import HAS_STORE_SUPPORT, STORE_SUFFIX, ResultsStoreWriter, iter_store_rows
+
+
+def _row(laptop_key: str, score: float, mask_miss, boxes=(1.0, 2.0, 3.0, 4.0)) -> ResultRow:
+    return ResultRow(laptop_key, True, score, "Front_00", list(boxes) if boxes else None, score,
+                     "2025-02-23_09-00-00", "qc_result_20250223.json", list(mask_miss), laptop_key.split("_")[0],
+                     None, None, None)
+
+
+@unittest.skipUnless(HAS_STORE_SUPPORT, "需要 SQLite 3.38 及以上")
+class ResultsStoreUpsertTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self._tmp = tempfile.TemporaryDirectory()
+        self.output = Path(self._tmp.name) / "out.csv"
+        self.store = self.output.with_suffix(STORE_SUFFIX)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        self._tmp.cleanup()
+
+    def _write(self, rows, transaction_rows: int = 1000):
+        writer = ResultsStoreWriter(self.output, transaction_rows=transaction_rows)
+        writer.write_rows(rows)
+        writer.close()
+
+    def _query(self, sql: str):
+        conn = sqlite3.connect(self.store)
+        try:
+            return conn.execute(sql).fetchall()
+        finally:
+            conn.close()
+
+    def test_rewrite_replaces_row_and_children(self):
+        self._write([_row("LAPTOP0_1", 0.1, ["Front_01", "Front_02", "Front_03"]),
+                     _row("LAPTOP1_1", 0.2, ["none"])])
+        # 第二次运行：LAPTOP0_1 分数变化、mask_miss 变短、没有匹配的框
+        self._write([_row("LAPTOP0_1", 0.7, ["Front_02"], boxes=None)])
+
+        self.assertEqual(self._query("SELECT laptop_key, score FROM results ORDER BY id"),
+                         [("LAPTOP0_1", 0.7), ("LAPTOP1_1", 0.2)])
+        rows = {row.laptop_key: row for row in iter_store_rows(self.store)}
+        self.assertEqual(rows["LAPTOP0_1"].mask_miss, ["Front_02"])
+        self.assertIsNone(rows["LAPTOP0_1"].boxes)
+        self.assertEqual(rows["LAPTOP1_1"].mask_miss, ["none"])
+        self.assertEqual(rows["LAPTOP1_1"].boxes, [1.0, 2.0, 3.0, 4.0])
+        # 子表中没有指向不存在或旧结果的记录
+        self.assertEqual(self._query("SELECT result_id, position, area_name FROM result_mask_miss ORDER BY result_id"),
+                         [(1, 0, "Front_02"), (2, 0, "none")])
+        self.assertEqual(self._query("SELECT result_id FROM result_boxes"), [(2,)])
+        self.assertEqual(self._query("SELECT count(*) FROM result_mask_miss WHERE result_id NOT IN "
+                                     "(SELECT id FROM results)"), [(0,)])
+
+    def test_duplicates_within_one_run_keep_last(self):
+        self._write([_row("LAPTOP0_1", 0.1, ["Front_01", "Front_02"]),
+                     _row("LAPTOP0_1", 0.5, ["Front_03"])], transaction_rows=1)
+        self.assertEqual([(row.score, row.mask_miss) for row in iter_store_rows(self.store)], [(0.5, ["Front_03"])])
+        self.assertFalse(self.store.with_name(self.store.name + "-wal").exists())
+
+
+class StoreVersionTest(unittest.TestCase):
+
+    def test_old_sqlite_rejected(self):
+        with tempfile.TemporaryDirectory() as tmp, mock.patch.object(results_store, "HAS_STORE_SUPPORT", False):
+            with self.assertRaises(RuntimeError):
+                results_store.connect_store(Path(tmp) / "out.sqlite")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+"""  python 模組文件名 : tests/test_scan_manifest.py
+
+scan_manifest.py 的增量处理：未变化的文件夹复用缓存、修改与删除后的输出与完整运行相同、
+只改修改时间时按内容哈希复用、分片运行时只清理本分片的记录
+
+"""
+
+import json
+import logging
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+from process_laptop_infers import LaptopInfersProcessor
+from result_row import ResultRow
+from scan_manifest import ScanManifest
+from synth_tree import TreeSpec, generate_tree
+
+
+class ScanManifestTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self._tmp = tempfile.TemporaryDirectory()
+        self.base = Path(self._tmp.name)
+        self._cwd = os.getcwd()
+        # 处理器在当前目录下创建 logs/
+        os.chdir(self.base)
+        self.tree = generate_tree(self.base / "tree", TreeSpec(folders=30, areas=4, boxes=2, log_lines=20,
+                                                               annotation_rate=0, seed=3))
+        self.manifest = self.base / "manifest.sqlite"
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def _run(self, name: str, manifest: bool = True) -> LaptopInfersProcessor:
+        processor = LaptopInfersProcessor(str(self.tree.root), str(self.base / f"{name}.csv"), str(self.tree.db_path),
+                                          batch_size=7, log_mode="quiet", progress_interval=0,
+                                          manifest_path=str(self.manifest) if manifest else None)
+        processor.process()
+        return processor
+
+    def _csv(self, name: str) -> bytes:
+        return (self.base / f"{name}.csv").read_bytes()
+
+    def _json_files(self):
+        return sorted(self.tree.root.rglob("laptop_infers.json"))
+
+    def _valid_json_file(self) -> Path:
+        for json_file in self._json_files():
+            try:
+                json.loads(json_file.read_text(encoding="utf-8"))
+            except ValueError:
+                continue
+            return json_file
+        self.fail("没有可解析的 laptop_infers.json")
+
+    def test_second_run_reuses_cached_rows(self):
+        first = self._run("first")
+        self.assertEqual(first.metrics.counters.get("files_cached", 0), 0)
+        second = self._run("second")
+        self.assertEqual(second.metrics.counters["files_cached"], first.metrics.counters["files_processed"])
+        self.assertEqual(self._csv("second"), self._csv("first"))
+
+    def test_modify_and_delete_match_full_run(self):
+        self._run("first")
+        self._run("second")
+        modified = self._valid_json_file()
+        data = json.loads(modified.read_text(encoding="utf-8"))
+        data["laptop_infers"][-1]["timestamp"] = "2025-12-31_23-59-59"
+        modified.write_text(json.dumps(data, indent=2), encoding="utf-8")
+        deleted = next(path for path in self._json_files() if path != modified).parent
+        for child in deleted.iterdir():
+            child.unlink()
+        deleted.rmdir()
+
+        incremental = self._run("incremental")
+        self._run("full", manifest=False)
+        self.assertEqual(self._csv("incremental"), self._csv("full"))
+        self.assertIn(b"2025-12-31_23-59-59", self._csv("incremental"))
+        self.assertNotIn(b"2025-12-31_23-59-59", self._csv("second"))
+        with ScanManifest(self.manifest, self.tree.root) as manifest:
+            keys = {row[0] for row in manifest._conn.execute("SELECT json_path FROM folders")}
+        self.assertNotIn(deleted.relative_to(self.tree.root).joinpath("laptop_infers.json").as_posix(), keys)
+        self.assertLess(incremental.metrics.counters["files_cached"], incremental.metrics.counters["files_processed"])
+
+    def test_touch_reuses_by_content_hash(self):
+        first = self._run("first")
+        touched = self._valid_json_file()
+        stat = touched.stat()
+        os.utime(touched, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        second = self._run("second")
+        self.assertEqual(second.metrics.counters["files_cached"], first.metrics.counters["files_processed"])
+        self.assertEqual(self._csv("second"), self._csv("first"))
+        # 指纹已更新为新的修改时间
+        with ScanManifest(self.manifest, self.tree.root) as manifest:
+            (mtime,) = manifest._conn.execute(
+                "SELECT json_mtime_ns FROM folders WHERE json_path = ?",
+                (touched.relative_to(self.tree.root).as_posix(),)).fetchone()
+        self.assertEqual(mtime, touched.stat().st_mtime_ns)
+
+    def test_prune_respects_shard_ownership(self):
+        json_files = self._json_files()[:2]
+        row = ResultRow("k", True, 0.5, "Front_00", [1.0, 2.0, 3.0, 4.0], 0.5, "2025-01-01_00-00-00",
+                        "qc.json", ["none"], "LASA", None, None, None)
+        with ScanManifest(self.manifest, self.tree.root) as manifest:
+            manifest.store((json_file, "", "", "LASA", [row]) for json_file in json_files)
+        keys = [json_file.relative_to(self.tree.root).as_posix() for json_file in json_files]
+        with ScanManifest(self.manifest, self.tree.root) as manifest:
+            # 新一轮运行中两条记录都未出现，只有属于本分片的记录被删除
+            self.assertEqual(manifest.prune(lambda key: key == keys[0]), 1)
+            remaining = [key for (key,) in manifest._conn.execute("SELECT json_path FROM folders")]
+            self.assertEqual(remaining, [keys[1]])
+            cached = manifest.lookup_unchanged([(json_files[1], "", "")])
+            self.assertEqual(cached[json_files[1]].rows[0].boxes, [1.0, 2.0, 3.0, 4.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+"""  python 模組文件名 : tests/test_sharding.py
+
+sharding.py 的分片合并：两个有重叠的分片合并后按 (laptop_key, timestamp) 去重并保留分片顺序中第一次出现的行，
+失败记录摘要按文件去重并累加文件数
+
+"""
+
+import csv
+import json
+import logging
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from result_row import ResultRow
+from result_writer import StreamingResultWriter
+from results_store import ResultsStoreWriter, iter_store_rows
+from sharding import failures_path, merge_shards, write_failure_summary
+
+
+def _row(laptop_key: str, timestamp: str, score: float) -> ResultRow:
+    return ResultRow(laptop_key, True, score, "Front_00", [1.0, 2.0, 3.0, 4.0], score, timestamp,
+                     "qc_result_20250223.json", ["none"], laptop_key.split("_")[0], None, None, None)
+
+
+def _failure(json_file: str) -> dict:
+    return {"json_file": json_file, "qc_result_file": "", "inference_file": "", "reason": "parse", "worker": "w0"}
+
+
+class MergeShardsTest(unittest.TestCase):
+
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+        self._tmp = tempfile.TemporaryDirectory()
+        self.base = Path(self._tmp.name)
+        self.output = self.base / "out.csv"
+        # 两个分片都包含 LAPTOP1 在 09-00-01 的记录（例如分片规则变化后重复处理了同一文件夹）
+        self._write_shard("shard-0-of-2", [_row("LAPTOP0_1", "2025-02-23_09-00-00", 0.1),
+                                           _row("LAPTOP1_1", "2025-02-23_09-00-01", 0.2)],
+                          [_failure("a/laptop_infers.json"), _failure("b/laptop_infers.json")], found=4, processed=2)
+        self._write_shard("shard-1-of-2", [_row("LAPTOP1_1", "2025-02-23_09-00-01", 0.9),
+                                           _row("LAPTOP2_1", "2025-02-23_09-00-02", 0.3)],
+                          [_failure("b/laptop_infers.json")], found=3, processed=2)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        self._tmp.cleanup()
+
+    def _write_shard(self, tag: str, rows, failures, found: int, processed: int):
+        shard_csv = self.base / f"out.{tag}.csv"
+        writer = StreamingResultWriter(shard_csv)
+        writer.open()
+        writer.write_rows(rows)
+        writer.close()
+        store = ResultsStoreWriter(shard_csv)
+        store.write_rows(rows)
+        store.close()
+        write_failure_summary(failures_path(shard_csv), failures, found, processed)
+
+    def test_merge_keeps_first_row_in_shard_order(self):
+        summary = merge_shards(self.output, formats=("csv", "json", "sqlite"))
+        for fmt in ("csv", "json", "sqlite"):
+            self.assertEqual(summary[fmt], {"shards": 2, "rows": 3, "duplicates": 1})
+
+        with open(self.output, newline="", encoding="utf-8-sig") as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual([(row["laptop_key"], float(row["score"])) for row in rows],
+                         [("LAPTOP0_1", 0.1), ("LAPTOP1_1", 0.2), ("LAPTOP2_1", 0.3)])
+        records = json.loads(self.output.with_suffix(".json").read_text(encoding="utf-8"))
+        self.assertEqual([record["score"] for record in records], [0.1, 0.2, 0.3])
+        stored = list(iter_store_rows(self.output.with_suffix(".sqlite")))
+        self.assertEqual([(row.laptop_key, row.score) for row in stored],
+                         [("LAPTOP0_1", 0.1), ("LAPTOP1_1", 0.2), ("LAPTOP2_1", 0.3)])
+        self.assertEqual(list(self.base.glob("*-wal")), [])
+
+    def test_merge_failure_summary(self):
+        summary = merge_shards(self.output, formats=("csv",))
+        self.assertEqual(summary["failures"], 2)
+        merged = json.loads(failures_path(self.output).read_text(encoding="utf-8"))
+        self.assertEqual((merged["found_files"], merged["processed_files"], merged["error_files"]), (7, 4, 2))
+        # 重复的失败记录保留第一个分片中的一条
+        self.assertEqual([(failure["json_file"], failure["shard"]) for failure in merged["failures"]],
+                         [("a/laptop_infers.json", "out.shard-0-of-2.failures.json"),
+                          ("b/laptop_infers.json", "out.shard-0-of-2.failures.json")])
+
+
+if __name__ == "__main__":
+    unittest.main()
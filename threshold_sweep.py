@@ -0,0 +1,282 @@
+"""  python 模組文件名 : threshold_sweep.py
+
+threshold_sweep.py 对 score_thr × box_size_thr 的阈值网格做假设分析：在一次处理中，
+由已解析的 Labels（boxes / scores）计算每台笔记本在所有阈值组合下的判定，并与数据库中的 db_gt 对比，
+输出每个网格点的 TP/FP/FN/TN、precision/recall 和 ROC 点，不需要对每组阈值重新运行整个流程
+
+判定规则：存在分数 >= score_thr 且面积 (x2 - x1) * (y2 - y1) >= box_size_thr 的框时，该笔记本判为瑕疵
+
+每台笔记本只计算一次：框按面积降序排序并求分数的累计最大值，每个 box_size_thr 用二分查找得到
+“面积不小于该阈值的框中的最高分”；多台笔记本的最高分再对 score_thr 二分查找并按区间计数，
+累计计数的后缀和即为各网格点的判定数量。内存占用与笔记本数量无关
+
+numpy 为必需依赖（未安装时处理器跳过阈值扫描）
+
+"""
+
+import csv
+import math
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from schema import Labels
+
+# 数据库 gt 字段中表示“是/否”的取值
+_POSITIVE = frozenset(("1", "True", "true"))
+_NEGATIVE = frozenset(("0", "False", "false"))
+
+# 多台笔记本的最高分累计到一定数量后再统一计数
+_FLUSH_SIZE = 4096
+
+SWEEP_CSV_FIELDNAMES = ['box_size_thr', 'score_thr', 'tp', 'fp', 'fn', 'tn', 'precision', 'recall', 'fpr', 'f1']
+
+
+def parse_thresholds(text: str) -> Tuple[float, ...]:
+    """
+    解析阈值列表：逗号分隔的数值（"0.3,0.5,0.7"）或 start:stop:step 区间（"0:1:0.05"，包含 stop）
+
+    Args:
+        text (str): 阈值参数
+
+    Returns:
+        Tuple[float, ...]: 升序排列、去重的阈值
+    """
+    try:
+        if ':' in text:
+            start, stop, step = (float(part) for part in text.split(':'))
+            if step <= 0:
+                raise ValueError
+            count = int(math.floor((stop - start) / step + 1e-9)) + 1
+            values = [round(start + i * step, 10) for i in range(count)]
+        else:
+            values = [float(part) for part in text.split(',') if part.strip()]
+    except ValueError:
+        raise ValueError(f"无效的阈值参数: {text}，应为逗号分隔的数值或 start:stop:step") from None
+    if not values:
+        raise ValueError(f"无效的阈值参数: {text}")
+    return tuple(sorted(set(values)))
+
+
+@dataclass(frozen=True)
+class SweepGrid:
+    """
+    阈值网格
+
+    Attributes:
+        score_thresholds (Tuple[float, ...]): score_thr 取值（升序）
+        box_size_thresholds (Tuple[float, ...]): box_size_thr 取值（升序）
+    """
+    score_thresholds: Tuple[float, ...] = tuple(round(i * 0.05, 2) for i in range(21))
+    box_size_thresholds: Tuple[float, ...] = (0, 250, 500, 1000, 2000, 4000, 8000)
+
+    def __post_init__(self):
+        for name in ("score_thresholds", "box_size_thresholds"):
+            values = tuple(getattr(self, name))
+            if not values or list(values) != sorted(set(values)):
+                raise ValueError(f"{name} 需要至少一个升序且不重复的取值")
+            object.__setattr__(self, name, values)
+
+
+def ground_truth(db_gt: Optional[str]) -> Optional[int]:
+    """
+    将 db_gt 转换为 1 / 0，哨兵值（no-sn、no-db、error）或空值返回 None
+    """
+    if db_gt in _POSITIVE:
+        return 1
+    if db_gt in _NEGATIVE:
+        return 0
+    return None
+
+
+class ThresholdSweep:
+    """
+    阈值网格的流式评估
+
+    add_laptop 每次接收一台笔记本所有推理记录的 labels 和它的 db_gt；
+    db_gt 不是 0/1 的笔记本不参与统计（计入 unlabeled）。
+    """
+
+    def __init__(self, grid: Optional[SweepGrid] = None):
+        """
+        初始化评估
+
+        Args:
+            grid (Optional[SweepGrid]): 阈值网格，为 None 时使用默认网格
+        """
+        import numpy as np
+
+        self.grid = grid or SweepGrid()
+        self._scores = np.asarray(self.grid.score_thresholds, dtype=np.float64)
+        self._box_sizes = np.asarray(self.grid.box_size_thresholds, dtype=np.float64)
+        rows, columns = len(self._box_sizes), len(self._scores) + 1
+        # _hist[gt][b, k]: 最高分介于第 k-1 与第 k 个 score_thr 之间的笔记本数量
+        self._hist = {0: np.zeros((rows, columns), dtype=np.int64), 1: np.zeros((rows, columns), dtype=np.int64)}
+        self._pending: Dict[int, List[Any]] = {0: [], 1: []}
+        self.laptops = {0: 0, 1: 0}
+        self.unlabeled = 0
+        # 增量模式下复用缓存、没有 labels 的笔记本
+        self.skipped = 0
+
+    def max_scores(self, labels_list: Iterable[Dict[str, Labels]]) -> "np.ndarray":
+        """
+        每个 box_size_thr 下、面积不小于该阈值的框中的最高分（没有这样的框时为 -inf）
+
+        Args:
+            labels_list (Iterable[Dict[str, Labels]]): 一台笔记本各推理记录的 labels
+
+        Returns:
+            np.ndarray: 形状为 (len(box_size_thresholds),) 的数组
+        """
+        import numpy as np
+
+        from box_matching import LabelArrays
+
+        score_parts, area_parts = [], []
+        for labels in labels_list:
+            if not labels:
+                continue
+            arrays = LabelArrays(labels)
+            score_parts.append(arrays.scores)
+            area_parts.append(arrays.box_areas)
+        scores = np.concatenate(score_parts) if score_parts else np.zeros(0)
+        if not scores.size:
+            return np.full(len(self._box_sizes), -np.inf)
+        # 缺失或格式不符的框面积为 NaN，不满足任何 box_size_thr
+        areas = np.nan_to_num(np.concatenate(area_parts), nan=-np.inf)
+        order = np.argsort(-areas, kind='stable')
+        best = np.maximum.accumulate(scores[order])
+        # 面积不小于阈值的框数量 = 降序排列中的前缀长度
+        ascending = areas[order][::-1]
+        counts = len(areas) - np.searchsorted(ascending, self._box_sizes, side='left')
+        return np.where(counts > 0, best[np.maximum(counts - 1, 0)], -np.inf)
+
+    def add_laptop(self, labels_list: Iterable[Dict[str, Labels]], db_gt: Optional[str]):
+        """
+        统计一台笔记本
+
+        Args:
+            labels_list (Iterable[Dict[str, Labels]]): 该笔记本各推理记录的 labels
+            db_gt (Optional[str]): 数据库中的 gt
+        """
+        gt = ground_truth(db_gt)
+        if gt is None:
+            self.unlabeled += 1
+            return
+        self.laptops[gt] += 1
+        self._pending[gt].append(self.max_scores(labels_list))
+        if len(self._pending[gt]) >= _FLUSH_SIZE:
+            self._flush(gt)
+
+    def skip(self):
+        """
+        记录一台无法参与评估的笔记本（例如复用扫描清单缓存、没有 labels）
+        """
+        self.skipped += 1
+
+    def _flush(self, gt: int):
+        """
+        将累积的最高分按 score_thr 区间计数
+        """
+        import numpy as np
+
+        if not self._pending[gt]:
+            return
+        best = np.vstack(self._pending[gt])
+        self._pending[gt] = []
+        # 最高分 >= 前 k 个 score_thr，即在前 k 个网格点判为瑕疵
+        k = np.searchsorted(self._scores, best, side='right')
+        columns = len(self._scores) + 1
+        flat = k + columns * np.arange(len(self._box_sizes))
+        self._hist[gt] += np.bincount(flat.ravel(), minlength=self._hist[gt].size).reshape(self._hist[gt].shape)
+
+    def confusion(self) -> Dict[str, "np.ndarray"]:
+        """
+        各网格点的混淆矩阵
+
+        Returns:
+            Dict[str, np.ndarray]: tp / fp / fn / tn，形状均为 (len(box_size_thresholds), len(score_thresholds))
+        """
+        for gt in (0, 1):
+            self._flush(gt)
+        # 判为瑕疵的数量：最高分区间序号 k > s 的笔记本数（后缀和）
+        predicted = {gt: hist[:, ::-1].cumsum(axis=1)[:, ::-1][:, 1:] for gt, hist in self._hist.items()}
+        tp, fp = predicted[1], predicted[0]
+        return {"tp": tp, "fp": fp, "fn": self.laptops[1] - tp, "tn": self.laptops[0] - fp}
+
+    def points(self) -> List[Dict[str, Any]]:
+        """
+        每个网格点的计数与 precision / recall / fpr / f1
+
+        Returns:
+            List[Dict[str, Any]]: 按 box_size_thr、score_thr 排列的网格点
+        """
+        counts = self.confusion()
+        points = []
+        for b, box_size in enumerate(self.grid.box_size_thresholds):
+            for s, score in enumerate(self.grid.score_thresholds):
+                tp, fp, fn, tn = (int(counts[name][b, s]) for name in ("tp", "fp", "fn", "tn"))
+                precision = tp / (tp + fp) if tp + fp else None
+                recall = tp / (tp + fn) if tp + fn else None
+                f1 = 2 * precision * recall / (precision + recall) if precision and recall else None
+                points.append({"box_size_thr": box_size, "score_thr": score, "tp": tp, "fp": fp, "fn": fn, "tn": tn,
+                               "precision": precision, "recall": recall,
+                               "fpr": fp / (fp + tn) if fp + tn else None, "f1": f1})
+        return points
+
+    def roc_auc(self) -> Dict[float, Optional[float]]:
+        """
+        每个 box_size_thr 下以 score_thr 为变量的 ROC 曲线下面积（梯形法，补上 (0, 0) 与 (1, 1) 两端）
+
+        Returns:
+            Dict[float, Optional[float]]: box_size_thr -> AUC，缺少正例或负例时为 None
+        """
+        import numpy as np
+
+        if not (self.laptops[0] and self.laptops[1]):
+            return {box_size: None for box_size in self.grid.box_size_thresholds}
+        counts = self.confusion()
+        tpr = counts["tp"] / self.laptops[1]
+        fpr = counts["fp"] / self.laptops[0]
+        auc = {}
+        for b, box_size in enumerate(self.grid.box_size_thresholds):
+            x = np.concatenate(([0.0], fpr[b][::-1], [1.0]))
+            y = np.concatenate(([0.0], tpr[b][::-1], [1.0]))
+            auc[box_size] = float(np.sum(np.diff(x) * (y[1:] + y[:-1]) / 2))
+        return auc
+
+    def summary_lines(self) -> List[str]:
+        """
+        日志中输出的汇总：每个 box_size_thr 的 AUC 与 F1 最高的 score_thr
+        """
+        lines = [f"阈值扫描: 正例 {self.laptops[1]} 台，负例 {self.laptops[0]} 台，"
+                 f"无 gt {self.unlabeled} 台，未参与 {self.skipped} 台"]
+        auc = self.roc_auc()
+        best: Dict[float, Dict[str, Any]] = {}
+        for point in self.points():
+            current = best.get(point["box_size_thr"])
+            if point["f1"] is not None and (current is None or point["f1"] > current["f1"]):
+                best[point["box_size_thr"]] = point
+        lines.append(f"{'box_size_thr':>12} {'AUC':>6} {'best score_thr':>14} {'precision':>9} {'recall':>7} {'F1':>6}")
+        for box_size in self.grid.box_size_thresholds:
+            point = best.get(box_size)
+            auc_text = f"{auc[box_size]:.3f}" if auc[box_size] is not None else "-"
+            if point is None:
+                lines.append(f"{box_size:>12g} {auc_text:>6} {'-':>14}")
+            else:
+                lines.append(f"{box_size:>12g} {auc_text:>6} {point['score_thr']:>14g} "
+                             f"{point['precision']:>9.3f} {point['recall']:>7.3f} {point['f1']:>6.3f}")
+        return lines
+
+    def write_csv(self, path: Path):
+        """
+        将网格点写入 CSV（每行一个 box_size_thr × score_thr 组合，recall 与 fpr 即 ROC 点）
+
+        Args:
+            path (Path): 输出路径
+        """
+        with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.DictWriter(f, fieldnames=SWEEP_CSV_FIELDNAMES)
+            writer.writeheader()
+            for point in self.points():
+                writer.writerow({key: '' if value is None else value for key, value in point.items()})
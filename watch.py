@@ -0,0 +1,377 @@
+"""  python 模組文件名 : watch.py
+
+watch.py 为 LaptopInfersProcessor 的监视模式（LaptopInfersProcessor.watch）提供新文件夹的检测：
+
+    - InotifyWatcher: Linux 上通过 ctypes 调用 inotify（不需要额外依赖），递归监视输入目录，
+      新建的子目录自动加入监视；事件队列溢出时要求调用方重新遍历一次
+    - PollingWatcher: inotify 不可用（非 Linux、监视数量超过 fs.inotify.max_user_watches）时的回退方式，
+      每隔 poll_interval 秒按 DiscoveryOptions 重新遍历目录树
+    - SettleTracker: 去抖动，文件夹中的 laptop_infers.json、qc_result_*、inference_* 在 settle_seconds 秒内
+      没有变化（大小与修改时间）才视为写入完成，避免处理写到一半的文件夹；
+      qc_result_* 或 inference_* 尚未出现时继续等待，超过 incomplete_grace 秒仍未出现才按现有文件处理
+
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from discovery import DiscoveryOptions, FileTuple, iter_dirs
+
+WATCH_MODES = ("auto", "inotify", "poll")
+
+# 监视循环每次等待事件的最长时间（秒），同时也是检查去抖动与停止标志的间隔
+WATCH_TICK = 1.0
+
+# inotify 事件掩码（见 <sys/inotify.h>）
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_ISDIR = 0x40000000
+_WATCH_MASK = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_ONLYDIR
+
+# struct inotify_event: int wd; uint32_t mask, cookie, len; char name[len]
+_EVENT = struct.Struct("iIII")
+_READ_SIZE = 64 * 1024
+
+
+@dataclass(frozen=True)
+class WatchOptions:
+    """
+    监视模式选项
+
+    Attributes:
+        mode (str): "auto" 优先使用 inotify，不可用时回退为轮询；"inotify" 只使用 inotify；"poll" 只使用轮询
+        poll_interval (float): 轮询方式重新遍历目录树的间隔（秒）
+        settle_seconds (float): 文件夹内容保持不变多少秒后才处理
+        process_existing (bool): 启动时是否先完整处理一次已有的文件夹（重新生成输出文件），
+                                 否则已有的文件夹视为已处理，只追加新文件夹的结果
+        idle_timeout (Optional[float]): 连续多少秒没有新文件夹时退出，None 表示一直运行直到中断
+        incomplete_grace (float): 文件夹中已有 laptop_infers.json、但还没有 qc_result_* 或 inference_* 时，
+                                  从发现起最多再等待多少秒（超过后按现有文件处理，结果为空 qc_result_file / no_log）
+    """
+    mode: str = "auto"
+    poll_interval: float = 10.0
+    settle_seconds: float = 5.0
+    process_existing: bool = False
+    idle_timeout: Optional[float] = None
+    incomplete_grace: float = 60.0
+
+    def __post_init__(self):
+        if self.mode not in WATCH_MODES:
+            raise ValueError(f"不支持的 watch mode: {self.mode}")
+        if self.poll_interval <= 0 or self.settle_seconds < 0:
+            raise ValueError("poll_interval 必须大于 0，settle_seconds 不能为负数")
+        if self.incomplete_grace < 0:
+            raise ValueError("incomplete_grace 不能为负数")
+
+
+def _load_libc() -> Optional[ctypes.CDLL]:
+    """
+    加载提供 inotify 的 libc，非 Linux 或不支持时返回 None
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    except OSError:
+        return None
+    if not hasattr(libc, "inotify_init1") or not hasattr(libc, "inotify_add_watch"):
+        return None
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    return libc
+
+
+class InotifyWatcher:
+    """
+    基于 inotify 的递归目录监视
+
+    poll() 返回有文件写入完成、移入或新建的目录；新建（或移入）的子目录会递归加入监视，
+    其中已有的目录也一并返回，避免漏掉注册监视之前写入的文件。
+    """
+
+    def __init__(self, roots: Sequence[Path], discovery: Optional[DiscoveryOptions] = None):
+        """
+        初始化并注册全部目录的监视
+
+        Args:
+            roots (Sequence[Path]): 监视的根目录（深度、排除通配符按相对于各自根目录计算）
+            discovery (Optional[DiscoveryOptions]): 查找选项
+
+        Raises:
+            OSError: 系统不支持 inotify，或监视数量超过 fs.inotify.max_user_watches
+        """
+        self.discovery = discovery or DiscoveryOptions()
+        self.logger = logging.getLogger(__name__)
+        self._libc = _load_libc()
+        if self._libc is None:
+            raise OSError(errno.ENOSYS, "当前系统不支持 inotify")
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        # wd -> (目录, 所属根目录, 深度)
+        self._watches: Dict[int, Tuple[str, Path, int]] = {}
+        # 事件队列溢出后置为 True，调用方需要重新遍历一次
+        self.needs_rescan = False
+        try:
+            for root in roots:
+                self._add_tree(Path(root), Path(root), 0)
+        except OSError:
+            self.close()
+            raise
+        self.logger.info(f"inotify 已监视 {len(self._watches)} 个目录")
+
+    def _add_tree(self, root: Path, start: Path, depth: int) -> List[str]:
+        """
+        递归注册目录及其子目录
+
+        Returns:
+            List[str]: 注册的目录
+        """
+        added = []
+        for path, path_depth in iter_dirs(root, self.discovery, start=start, depth=depth):
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), _WATCH_MASK)
+            if wd < 0:
+                code = ctypes.get_errno()
+                if code == errno.ENOSPC:
+                    raise OSError(code, "inotify 监视数量超过上限 fs.inotify.max_user_watches")
+                # 目录在注册前被删除或没有权限
+                self.logger.debug(f"无法监视目录 {path}: {os.strerror(code)}")
+                continue
+            self._watches[wd] = (path, root, path_depth)
+            added.append(path)
+        return added
+
+    def poll(self, timeout: float) -> Set[str]:
+        """
+        等待事件并返回有变化的目录
+
+        Args:
+            timeout (float): 最长等待时间（秒）
+
+        Returns:
+            Set[str]: 目录路径
+        """
+        changed: Set[str] = set()
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return changed
+        while True:
+            try:
+                data = os.read(self._fd, _READ_SIZE)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b"\0")
+                offset += _EVENT.size + length
+                self._handle_event(wd, mask, os.fsdecode(name), changed)
+        return changed
+
+    def _handle_event(self, wd: int, mask: int, name: str, changed: Set[str]):
+        if mask & _IN_Q_OVERFLOW:
+            self.logger.warning("inotify 事件队列溢出，将重新遍历目录")
+            self.needs_rescan = True
+            return
+        watch = self._watches.get(wd)
+        if watch is None:
+            return
+        if mask & _IN_IGNORED:
+            # 目录已删除或被移出
+            del self._watches[wd]
+            return
+        path, root, depth = watch
+        if mask & _IN_ISDIR and mask & (_IN_CREATE | _IN_MOVED_TO):
+            max_depth = self.discovery.max_depth
+            if max_depth is None or depth < max_depth:
+                changed.update(self._add_tree(root, Path(path) / name, depth + 1))
+            return
+        changed.add(path)
+
+    def close(self):
+        """
+        关闭 inotify 文件描述符
+        """
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def __enter__(self) -> "InotifyWatcher":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class PollingWatcher:
+    """
+    定期重新遍历目录树的监视方式
+
+    poll() 每隔 interval 秒返回一次当前全部包含 laptop_infers.json 的文件夹，其余时间只等待；
+    已处理的文件夹由调用方过滤。
+    """
+
+    def __init__(self, discover: Callable[[], Iterable[FileTuple]], interval: float):
+        """
+        初始化
+
+        Args:
+            discover (Callable[[], Iterable[FileTuple]]): 遍历目录树的函数（如 LaptopInfersProcessor.iter_json_files）
+            interval (float): 遍历间隔（秒）
+        """
+        self.discover = discover
+        self.interval = interval
+        self.needs_rescan = False
+        self._next_scan = time.monotonic() + interval
+
+    def poll(self, timeout: float) -> Set[str]:
+        """
+        到达遍历时间时返回全部文件夹，否则等待至多 timeout 秒后返回空集合
+        """
+        now = time.monotonic()
+        if now < self._next_scan:
+            time.sleep(min(timeout, self._next_scan - now))
+            return set()
+        self._next_scan = now + self.interval
+        return {str(file_tuple[0].parent) for file_tuple in self.discover()}
+
+    def close(self):
+        pass
+
+    def __enter__(self) -> "PollingWatcher":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def open_watcher(options: WatchOptions, roots: Sequence[Path], discovery: Optional[DiscoveryOptions],
+                 discover: Callable[[], Iterable[FileTuple]]):
+    """
+    按 options.mode 创建监视器，"auto" 模式下 inotify 不可用时回退为轮询
+
+    Args:
+        options (WatchOptions): 监视模式选项
+        roots (Sequence[Path]): 监视的根目录
+        discovery (Optional[DiscoveryOptions]): 查找选项
+        discover (Callable[[], Iterable[FileTuple]]): 轮询时遍历目录树的函数
+
+    Returns:
+        InotifyWatcher | PollingWatcher: 监视器
+
+    Raises:
+        OSError: mode="inotify" 且 inotify 不可用
+    """
+    logger = logging.getLogger(__name__)
+    if options.mode != "poll":
+        try:
+            return InotifyWatcher(roots, discovery)
+        except OSError as e:
+            if options.mode == "inotify":
+                raise
+            logger.warning(f"无法使用 inotify（{e.strerror or str(e)}），改为每 {options.poll_interval:g} 秒轮询一次")
+    return PollingWatcher(discover, options.poll_interval)
+
+
+def folder_signature(file_tuple: FileTuple) -> Optional[Tuple]:
+    """
+    文件夹中 laptop_infers.json、qc_result_*、inference_* 的文件名、大小与修改时间，任一文件无法读取时返回 None
+    """
+    json_file, qc_result_file, inference_file = file_tuple
+    signature = []
+    for name in (json_file.name, qc_result_file, inference_file):
+        if not name:
+            signature.append(None)
+            continue
+        try:
+            stat = os.stat(json_file.parent / name)
+        except OSError:
+            return None
+        signature.append((name, stat.st_size, stat.st_mtime_ns))
+    return tuple(signature)
+
+
+class SettleTracker:
+    """
+    去抖动：候选文件夹的内容在 settle_seconds 秒内保持不变后才返回
+
+    laptop_infers.json 往往先于 qc_result_* / inference_* 写入，文件夹处理后不会再次检查，
+    因此缺少这两类文件的文件夹继续等待，从发现起超过 incomplete_grace 秒仍未出现才返回
+    """
+
+    def __init__(self, settle_seconds: float, scan: Callable[[str], Optional[FileTuple]],
+                 incomplete_grace: float = 0.0):
+        """
+        初始化
+
+        Args:
+            settle_seconds (float): 内容需要保持不变的时间（秒）
+            scan (Callable[[str], Optional[FileTuple]]): 检查单个文件夹、返回文件元组的函数，
+                                                         不需要处理的文件夹返回 None
+            incomplete_grace (float): 缺少 qc_result_* 或 inference_* 的文件夹从发现起最多等待的时间（秒）
+        """
+        self.settle_seconds = settle_seconds
+        self.scan = scan
+        self.incomplete_grace = incomplete_grace
+        self.logger = logging.getLogger(__name__)
+        # 文件夹 -> (上次的内容签名, 内容开始保持不变的时间, 发现的时间，None 表示尚未检查)
+        self.pending: Dict[str, Tuple[Optional[Tuple], float, Optional[float]]] = {}
+
+    def add(self, folders: Iterable[str]):
+        """
+        加入候选文件夹（已在等待中的文件夹不重复加入）
+        """
+        for folder in folders:
+            self.pending.setdefault(folder, (None, 0.0, None))
+
+    def ready(self, now: float) -> List[FileTuple]:
+        """
+        检查等待中的文件夹，返回已写入完成的文件元组（返回后不再跟踪）
+
+        Args:
+            now (float): 当前时间（time.monotonic()）
+
+        Returns:
+            List[FileTuple]: 写入完成的文件夹
+        """
+        ready = []
+        for folder, (previous, since, found) in list(self.pending.items()):
+            file_tuple = self.scan(folder)
+            if file_tuple is None:
+                # 还没有 laptop_infers.json（或不需要处理），之后的事件会再次加入
+                del self.pending[folder]
+                continue
+            if found is None:
+                found = now
+            signature = folder_signature(file_tuple)
+            if signature is None or signature != previous:
+                self.pending[folder] = (signature, now, found)
+                continue
+            if now - since < self.settle_seconds:
+                continue
+            _, qc_result_file, inference_file = file_tuple
+            if not (qc_result_file and inference_file):
+                if now - found < self.incomplete_grace:
+                    continue
+                missing = [name for name, present in (("qc_result_*", qc_result_file), ("inference_*", inference_file))
+                           if not present]
+                self.logger.warning(f"文件夹 {folder} 在 {self.incomplete_grace:g} 秒内没有出现 {'、'.join(missing)}，"
+                                    f"按现有文件处理")
+            del self.pending[folder]
+            ready.append(file_tuple)
+        return ready